@@ -0,0 +1,127 @@
+import time
+import numpy as np
+from typing import List, Dict, Set, Tuple
+
+from .supabase_client import get_candles_bulk
+from .candle_store import get_candle_store
+from .scanner import insight_modules, load_module
+from .insights_engine.panel import CandlePanel
+from .insights_engine.features import FeatureStore
+
+HORIZONS = (5, 10, 20)
+
+def forward_returns(close: np.ndarray, horizon: int) -> np.ndarray:
+    """Return from each bar's close to the close `horizon` bars later; NaN past the end"""
+    out = np.full_like(close, np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out[:, :-horizon] = close[:, horizon:] / close[:, :-horizon] - 1
+    return out
+
+def signal_series(features: FeatureStore) -> Tuple[Dict[str, np.ndarray], Set[str]]:
+    """
+    Every insight rule evaluated at every bar: +1 BUY, -1 SELL, 0 no signal,
+    and the insight types whose hits carry no direction (NEUTRAL)
+    """
+    signals, neutral = {}, set()
+    for module_path in insight_modules():
+        module = load_module(module_path)
+        if not hasattr(module, 'run_signals'):
+            continue
+        features.prepare(getattr(module, 'FEATURES', []))
+        signals.update(module.run_signals(features, {}))
+        neutral.update(getattr(module, 'NEUTRAL_SIGNALS', ()))
+    return signals, neutral
+
+def summarize(signals: Dict[str, np.ndarray], returns: Dict[int, np.ndarray],
+              neutral: Set[str] = frozenset()) -> Dict[str, Dict]:
+    """
+    Per insight type: signal counts and direction-adjusted forward return
+    stats. NEUTRAL types are counted apart and report the mean absolute
+    forward move instead, since they predict a move but not its sign.
+    """
+    summary = {}
+    for insight_type, signal in signals.items():
+        fired = signal != 0
+        directional = insight_type not in neutral
+        stats = {
+            'signals': int(fired.sum()),
+            'buy': int((signal > 0).sum()) if directional else 0,
+            'sell': int((signal < 0).sum()) if directional else 0,
+            'neutral': 0 if directional else int(fired.sum()),
+            'symbols': int(fired.any(axis=1).sum())
+        }
+        for horizon, forward in returns.items():
+            hit = fired & ~np.isnan(forward)
+            if directional:
+                outcome = (signal * forward)[hit]
+                stats[f'avg_return_{horizon}d'] = float(outcome.mean()) if len(outcome) else None
+                stats[f'hit_rate_{horizon}d'] = float((outcome > 0).mean()) if len(outcome) else None
+            else:
+                move = np.abs(forward[hit])
+                stats[f'avg_return_{horizon}d'] = None
+                stats[f'hit_rate_{horizon}d'] = None
+                stats[f'avg_move_{horizon}d'] = float(move.mean()) if len(move) else None
+        summary[insight_type] = stats
+    return summary
+
+def backtest_panel(panel: CandlePanel, horizons=HORIZONS) -> Dict:
+    """
+    Walk-forward backtest of every insight rule over a candle panel. Each
+    step runs over all symbols at once; recursive indicators (EMAs) still
+    step through the bars.
+    """
+    features = FeatureStore(panel)
+    signals, neutral = signal_series(features)
+    close = features.get('close')
+    returns = {horizon: forward_returns(close, horizon) for horizon in horizons}
+
+    return {
+        'signals': signals,
+        'forward_returns': returns,
+        'neutral': neutral,
+        'summary': summarize(signals, returns, neutral)
+    }
+
+def signal_events(panel: CandlePanel, result: Dict, symbol: str) -> List[Dict]:
+    """List one symbol's historical signals with their forward returns"""
+    row = panel.symbols.index(symbol)
+    events = []
+    for insight_type, signal in result['signals'].items():
+        neutral = insight_type in result['neutral']
+        for t in np.flatnonzero(signal[row]):
+            events.append({
+                'date': panel.ts[row, t],
+                'insight_type': insight_type,
+                'signal_type': 'NEUTRAL' if neutral else 'BUY' if signal[row, t] > 0 else 'SELL',
+                'price': float(panel.close[row, t]),
+                **{
+                    f'return_{horizon}d': None if np.isnan(forward[row, t]) else float(forward[row, t])
+                    for horizon, forward in result['forward_returns'].items()
+                }
+            })
+    return sorted(events, key=lambda e: e['date'])
+
+def run_backtest(symbols: List[str], bars: int = 750, horizons=HORIZONS, source: str = "db") -> Dict:
+    """Backtest every insight rule over the last `bars` candles, from the database or the local store"""
+    started = time.perf_counter()
+    if source == "store":
+        panel = get_candle_store().panel(symbols, bars=bars)
+    else:
+        panel = CandlePanel.from_candles(get_candles_bulk(symbols, days=bars), bars=bars)
+    loaded = time.perf_counter()
+
+    result = backtest_panel(panel, horizons)
+    finished = time.perf_counter()
+
+    print(f"Backtested {len(symbols)} symbols x {bars} bars "
+          f"(load {loaded - started:.2f}s, evaluate {finished - loaded:.2f}s)")
+
+    response = {
+        'symbols': len(symbols),
+        'bars': bars,
+        'horizons': list(horizons),
+        'summary': result['summary']
+    }
+    if len(symbols) == 1:
+        response['events'] = signal_events(panel, result, symbols[0])
+    return response
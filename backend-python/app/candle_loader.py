@@ -0,0 +1,253 @@
+import io
+import os
+import time
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future, wait
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .insights_engine.panel import FIELDS
+from .supabase_client import upsert_chunk, CANDLE_KEYS
+
+# Rows per upsert / COPY batch; bounds request size and loader memory
+CANDLE_CHUNK_ROWS = int(os.getenv("CANDLE_CHUNK_ROWS", "2000"))
+CANDLE_LOAD_WORKERS = int(os.getenv("CANDLE_LOAD_WORKERS", "4"))
+
+# Direct Postgres connection string (Supabase: Settings > Database); enables COPY
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+COLUMNS = ('symbol', 'ts') + FIELDS
+
+STAGE_TABLE = """
+create temp table if not exists candle_stage (like daily_candles including defaults)
+on commit delete rows
+"""
+COPY_STAGE = f"copy candle_stage ({', '.join(COLUMNS)}) from stdin with (format binary)"
+MERGE_STAGE = f"""
+insert into daily_candles ({', '.join(COLUMNS)})
+select distinct on (symbol, ts) {', '.join(COLUMNS)} from candle_stage
+on conflict (symbol, ts) do update set
+{', '.join(f'{field} = excluded.{field}' for field in FIELDS)}
+"""
+
+# PostgreSQL binary COPY framing; dates are days since 2000-01-01
+PGCOPY_HEADER = b'PGCOPY\n\xff\r\n\x00' + struct.pack('!ii', 0, 0)
+PGCOPY_TRAILER = struct.pack('!h', -1)
+PG_EPOCH_DAYS = 10957
+
+class CandleLoadError(Exception):
+    """Raised when some of a symbol's candles could not be written after retries"""
+
+def candle_columns(df) -> Dict[str, np.ndarray]:
+    """
+    Column arrays from a fetched candle frame ('date' or 'ts' plus FIELDS):
+    'ts' as datetime64[D], prices and volume as float64 with NaN for gaps.
+    """
+    dates = df['ts'] if 'ts' in df.columns else df['date']
+    columns = {'ts': pd.to_datetime(dates).to_numpy().astype('datetime64[D]')}
+    for field in FIELDS:
+        columns[field] = np.asarray(df[field], dtype=np.float64)
+    return columns
+
+def _column_values(values: np.ndarray) -> list:
+    """Python values for a column slice: dates as ISO strings, NaN as None (NULL)"""
+    if values.dtype.kind == 'M':
+        return np.datetime_as_string(values, unit='D').tolist()
+    missing = np.isnan(values)
+    if missing.any():
+        values = values.astype(object)
+        values[missing] = None
+    return values.tolist()
+
+def row_chunks(symbol: str, columns: Dict[str, np.ndarray], chunk_rows: int = CANDLE_CHUNK_ROWS) -> Iterator[List[tuple]]:
+    """
+    Rows ordered as COLUMNS, chunk_rows at a time. Each chunk is built from
+    array slices when it is requested, so only the chunks in flight exist
+    as Python objects.
+    """
+    rows = len(columns['ts'])
+    for start in range(0, rows, chunk_rows):
+        end = min(start + chunk_rows, rows)
+        values = [_column_values(columns[column][start:end]) for column in COLUMNS[1:]]
+        yield [(symbol,) + row for row in zip(*values)]
+
+def _copy_row(name: bytes, day: int, prices: np.ndarray) -> bytes:
+    """One binary COPY tuple with NULLs, for the rare row that has gaps"""
+    parts = [struct.pack('!hi', len(COLUMNS), len(name)), name, struct.pack('!ii', 4, day)]
+    for value in prices.tolist():
+        parts.append(struct.pack('!i', -1) if value != value else struct.pack('!id', 8, value))
+    return b''.join(parts)
+
+def copy_chunks(symbol: str, columns: Dict[str, np.ndarray],
+                chunk_rows: int = CANDLE_CHUNK_ROWS) -> Iterator[Tuple[int, bytes]]:
+    """
+    (rows, payload) binary COPY chunks: header, chunk_rows tuples, trailer.
+
+    Every tuple of a symbol has the same layout, so a chunk is one
+    big-endian record array written with tobytes(); only rows with NaN
+    fields, which COPY must send as NULL, are packed one at a time.
+    """
+    name = symbol.encode()
+    record = np.dtype([('fields', '>i2'), ('symbol_len', '>i4'), ('symbol', f'S{len(name)}'),
+                       ('ts_len', '>i4'), ('ts', '>i4')] +
+                      [item for field in FIELDS for item in ((f'{field}_len', '>i4'), (field, '>f8'))])
+    rows = len(columns['ts'])
+    for start in range(0, rows, chunk_rows):
+        end = min(start + chunk_rows, rows)
+        days = columns['ts'][start:end].astype(np.int64) - PG_EPOCH_DAYS
+        prices = np.stack([columns[field][start:end] for field in FIELDS], axis=1)
+        gaps = np.isnan(prices).any(axis=1)
+
+        tuples = np.zeros(end - start, dtype=record)
+        tuples['fields'] = len(COLUMNS)
+        tuples['symbol_len'] = len(name)
+        tuples['symbol'] = name
+        tuples['ts_len'] = 4
+        tuples['ts'] = days
+        for i, field in enumerate(FIELDS):
+            tuples[f'{field}_len'] = 8
+            tuples[field] = prices[:, i]
+
+        yield end - start, b''.join([PGCOPY_HEADER, tuples[~gaps].tobytes()] +
+                                    [_copy_row(name, int(days[i]), prices[i]) for i in np.flatnonzero(gaps)] +
+                                    [PGCOPY_TRAILER])
+
+def copy_available() -> bool:
+    try:
+        import psycopg2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+class CandleLoader:
+    """
+    Bulk writer for daily_candles.
+
+    Each symbol's columns are cut into size-bounded chunks that a thread
+    pool writes concurrently. With DATABASE_URL set (and psycopg2
+    installed) chunks are streamed with COPY into a temp table and merged
+    with one INSERT ... ON CONFLICT; otherwise they go through PostgREST
+    upserts. At most 2 x workers chunks exist at once, so memory is bounded
+    however long the history.
+    """
+
+    def __init__(self, chunk_rows: int = CANDLE_CHUNK_ROWS, workers: int = CANDLE_LOAD_WORKERS,
+                 database_url: Optional[str] = DATABASE_URL, retries: int = 3, backoff: float = 0.5):
+        self.chunk_rows = chunk_rows
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+        self.method = 'copy' if database_url and copy_available() else 'rest'
+        if database_url and self.method == 'rest':
+            print("DATABASE_URL is set but psycopg2 is not installed; loading candles through PostgREST")
+
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+        self._slots = threading.BoundedSemaphore(workers * 2)
+        self._lock = threading.Lock()
+        self._futures: set = set()
+        self._connections = None
+        if self.method == 'copy':
+            from psycopg2.pool import ThreadedConnectionPool
+            self._connections = ThreadedConnectionPool(1, workers, database_url)
+        self.stats = {'symbols': 0, 'rows': 0, 'chunks': 0, 'retries': 0, 'failed_rows': 0, 'write_time': 0.0}
+
+    def submit(self, symbol: str, columns: Dict[str, np.ndarray]) -> List[Future]:
+        """Queue a symbol's candles; blocks only while the in-flight chunk limit is reached"""
+        futures = []
+        chunks = copy_chunks if self.method == 'copy' else row_chunks
+        for chunk in chunks(symbol, columns, self.chunk_rows):
+            self._slots.acquire()
+            future = self._pool.submit(self._write_chunk, chunk)
+            with self._lock:
+                self._futures.add(future)
+            future.add_done_callback(self._release)
+            futures.append(future)
+
+        with self._lock:
+            self.stats['symbols'] += 1
+        return futures
+
+    def load(self, symbol: str, columns: Dict[str, np.ndarray]) -> int:
+        """
+        Write a symbol's candles and wait for them; returns the rows written.
+        Raises CandleLoadError if any chunk still failed after its retries.
+        """
+        results = [future.result() for future in self.submit(symbol, columns)]
+        failed = sum(result.get('failed_rows', 0) for result in results)
+        if failed:
+            raise CandleLoadError(f"{failed} of {len(columns['ts'])} candles for {symbol} were not written")
+        return sum(result.get('rows', 0) for result in results)
+
+    def _release(self, future: Future):
+        self._slots.release()
+        with self._lock:
+            self._futures.discard(future)
+
+    def _write_chunk(self, chunk) -> Dict:
+        """Write one chunk; returns its rows, retries and failed_rows"""
+        stats = {}
+        if self.method == 'copy':
+            self._copy_chunk(chunk, stats)
+        else:
+            upsert_chunk('daily_candles', [dict(zip(COLUMNS, row)) for row in chunk],
+                         CANDLE_KEYS, self.retries, self.backoff, stats)
+
+        with self._lock:
+            for key, value in stats.items():
+                self.stats[key] += value
+        return stats
+
+    def _copy_chunk(self, chunk: Tuple[int, bytes], stats: Dict):
+        """COPY one payload into the session's stage table and merge it, retrying with backoff"""
+        rows, payload = chunk
+        started = time.perf_counter()
+
+        for attempt in range(self.retries + 1):
+            conn = self._connections.getconn()
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute(STAGE_TABLE)
+                    cursor.copy_expert(COPY_STAGE, io.BytesIO(payload))
+                    cursor.execute(MERGE_STAGE)
+                conn.commit()
+                stats['rows'] = rows
+                stats['chunks'] = 1
+                break
+            except Exception as e:
+                if not conn.closed:
+                    conn.rollback()
+                if attempt == self.retries:
+                    print(f"Error copying {rows} candles: {e}")
+                    stats['failed_rows'] = rows
+                    break
+                stats['retries'] = stats.get('retries', 0) + 1
+                time.sleep(self.backoff * 2 ** attempt)
+            finally:
+                # A dropped connection is discarded so the retry gets a fresh one
+                self._connections.putconn(conn, close=bool(conn.closed))
+
+        stats['write_time'] = time.perf_counter() - started
+
+    def close(self) -> Dict:
+        """Wait for every queued chunk, release the workers and report throughput"""
+        with self._lock:
+            pending = list(self._futures)
+        wait(pending)
+        self._pool.shutdown(wait=True)
+        if self._connections is not None:
+            self._connections.closeall()
+
+        rate = self.stats['rows'] / self.stats['write_time'] if self.stats['write_time'] else 0.0
+        print(f"Loaded {self.stats['rows']} candles for {self.stats['symbols']} symbols via {self.method} "
+              f"in {self.stats['chunks']} chunks ({rate:.0f} rows/s per worker, "
+              f"{self.stats['retries']} retries, {self.stats['failed_rows']} failed)")
+        return {**self.stats, 'method': self.method}
+
+    def __enter__(self) -> 'CandleLoader':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
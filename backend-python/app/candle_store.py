@@ -0,0 +1,383 @@
+import os
+import json
+import time
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+
+from .insights_engine.panel import CandlePanel, FIELDS
+from .supabase_client import get_candles_bulk, get_last_candle_dates
+
+CANDLE_STORE_DIR = os.getenv(
+    "CANDLE_STORE_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "candles")
+)
+STORE_VERSION = 1
+
+# Row layout of every symbol file: a day-number time index, then the price fields
+COLUMNS = ('ts',) + FIELDS
+
+# Bars requested for a symbol the store has never seen (covers the 2-year backfill)
+FULL_HISTORY_BARS = 1000
+
+def to_days(dates) -> np.ndarray:
+    """Dates (ISO strings, date objects or datetime64) as float days since 1970-01-01"""
+    values = np.asarray(dates)
+    if values.dtype.kind == 'U':
+        # Truncating to 10 characters drops any time part of an ISO timestamp
+        values = values.astype('<U10')
+    elif values.dtype.kind != 'M':
+        values = np.array([str(d)[:10] for d in dates])
+    return values.astype('datetime64[D]').astype(np.int64).astype(np.float64)
+
+def to_dates(days: np.ndarray) -> np.ndarray:
+    """Day numbers back to ISO date strings"""
+    return np.datetime_as_string(np.asarray(days, dtype=np.int64).astype('datetime64[D]'), unit='D')
+
+class CandleStore:
+    """
+    Local columnar copy of daily_candles: one memory-mapped .npy per symbol.
+
+    Each file is a (6 x bars) float64 array whose rows are COLUMNS, sorted
+    by date, so a symbol's history is one contiguous block and every column
+    is a zero-copy view of the mapping. Files are replaced atomically on
+    write; readers holding an older mapping keep a consistent snapshot. A
+    JSON manifest records rows and date range per symbol. Another process
+    (the sync CLI) may rewrite files under a running server, so last dates
+    are read from the files themselves and the manifest is merged on save.
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or CANDLE_STORE_DIR
+        os.makedirs(self.root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._maps: Dict[str, tuple] = {}
+        self.stats = {'opens': 0, 'reads': 0, 'writes': 0}
+        self.manifest = self._load_manifest()
+        # Symbols this process wrote or dropped since the last save, with the
+        # file version it left behind (None once dropped)
+        self._changed: Dict[str, Optional[tuple]] = {}
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.root, 'manifest.json')
+
+    def _load_manifest(self) -> Dict:
+        try:
+            with open(self.manifest_path) as f:
+                manifest = json.load(f)
+            if manifest.get('version') == STORE_VERSION:
+                return manifest
+        except (OSError, ValueError):
+            pass
+        return {'version': STORE_VERSION, 'symbols': {}}
+
+    def save_manifest(self):
+        """
+        Write this process's changes into the manifest on disk. A symbol whose
+        file has since been rewritten by another process keeps that process's
+        entry.
+        """
+        with self._lock:
+            manifest = self._load_manifest()
+            for symbol, version in self._changed.items():
+                if self.version(symbol) != version:
+                    continue
+                if symbol in self.manifest['symbols']:
+                    manifest['symbols'][symbol] = self.manifest['symbols'][symbol]
+                else:
+                    manifest['symbols'].pop(symbol, None)
+            self._changed.clear()
+            self.manifest = manifest
+            data = json.dumps(manifest, separators=(',', ':'))
+        tmp = f"{self.manifest_path}.tmp"
+        with open(tmp, 'w') as f:
+            f.write(data)
+        os.replace(tmp, self.manifest_path)
+
+    def path(self, symbol: str) -> str:
+        return os.path.join(self.root, f"{symbol.replace('/', '_')}.npy")
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self.manifest['symbols'] or os.path.exists(self.path(symbol))
+
+    def symbols(self) -> List[str]:
+        return sorted(self.manifest['symbols'])
+
+    def last_date(self, symbol: str) -> Optional[str]:
+        """The last stored date, from the file rather than the manifest, which may be another process's"""
+        data = self.read(symbol)
+        if data is None or not data.shape[1]:
+            return None
+        return str(to_dates(data[0, -1:])[0])
+
+    def read(self, symbol: str, bars: Optional[int] = None) -> Optional[np.ndarray]:
+        """
+        A symbol's (6 x bars) array, memory-mapped read-only; the last `bars`
+        columns when given. The mapping is reused until the file changes.
+        """
+        path = self.path(symbol)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+
+        # Writes replace the file, so a new inode or mtime means a new version
+        version = (stat.st_ino, stat.st_mtime_ns)
+        cached = self._maps.get(symbol)
+        if cached is None or cached[0] != version:
+            cached = (version, np.load(path, mmap_mode='r').view(np.ndarray))
+            self._maps[symbol] = cached
+            self.stats['opens'] += 1
+        self.stats['reads'] += 1
+
+        data = cached[1]
+        return data[:, -bars:] if bars else data
+
+    def columns(self, symbol: str, bars: Optional[int] = None) -> Optional[Dict[str, np.ndarray]]:
+        """Zero-copy column views keyed by COLUMNS ('ts' as day numbers)"""
+        data = self.read(symbol, bars)
+        if data is None:
+            return None
+        return {column: data[i] for i, column in enumerate(COLUMNS)}
+
+    def version(self, symbol: str) -> Optional[tuple]:
+        """An identifier that changes whenever the symbol's file is rewritten (by any process)"""
+        try:
+            stat = os.stat(self.path(symbol))
+        except OSError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns)
+
+    def block(self, symbol: str, from_date: Optional[str] = None, to_date: Optional[str] = None,
+              bars: Optional[int] = None) -> Optional[np.ndarray]:
+        """The (6 x n) slice of a symbol's array between two dates, inclusive"""
+        data = self.read(symbol, bars)
+        if data is None:
+            return None
+        start = np.searchsorted(data[0], to_days([from_date])[0]) if from_date else 0
+        end = np.searchsorted(data[0], to_days([to_date])[0], side='right') if to_date else data.shape[1]
+        return np.asarray(data[:, start:end])
+
+    def candles(self, symbol: str, from_date: Optional[str] = None, to_date: Optional[str] = None,
+                bars: Optional[int] = None) -> List[dict]:
+        """Candle rows in the shape daily_candles returns, oldest first"""
+        block = self.block(symbol, from_date, to_date, bars)
+        if block is None:
+            return []
+        dates = to_dates(block[0])
+        return [
+            {'symbol': symbol, 'ts': str(dates[i]), **{field: float(block[j + 1, i]) for j, field in enumerate(FIELDS)}}
+            for i in range(block.shape[1])
+        ]
+
+    def write(self, symbol: str, data: np.ndarray):
+        """Replace a symbol's history with a (6 x bars) array sorted by date"""
+        data = np.ascontiguousarray(data, dtype=np.float64)
+        path = self.path(symbol)
+        tmp = f"{path}.tmp.npy"
+        np.save(tmp, data)
+        os.replace(tmp, path)
+
+        with self._lock:
+            self.stats['writes'] += 1
+            self._changed[symbol] = self.version(symbol)
+            self.manifest['symbols'][symbol] = {
+                'rows': int(data.shape[1]),
+                'first': str(to_dates(data[0, :1])[0]) if data.shape[1] else None,
+                'last': str(to_dates(data[0, -1:])[0]) if data.shape[1] else None,
+                'synced_at': datetime.now().isoformat(timespec='seconds')
+            }
+
+    def drop(self, symbol: str):
+        """Remove a symbol's history, so readers fall back to the database until sync() rebuilds it"""
+        try:
+            os.remove(self.path(symbol))
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            self.manifest['symbols'].pop(symbol, None)
+            self._maps.pop(symbol, None)
+            self._changed[symbol] = None
+
+    def merge(self, symbol: str, candles: Union[List[dict], Dict[str, np.ndarray]]) -> int:
+        """
+        Fold new candles into a symbol's history: rows keyed 'ts' or 'date',
+        or column arrays keyed by COLUMNS. A new candle replaces a stored one
+        for the same date, as an upsert does. Returns the number of stored bars.
+        """
+        if not len(candles['ts'] if isinstance(candles, dict) else candles):
+            existing = self.read(symbol)
+            return 0 if existing is None else existing.shape[1]
+
+        if isinstance(candles, dict):
+            incoming = np.empty((len(COLUMNS), len(candles['ts'])))
+            incoming[0] = to_days(candles['ts'])
+            for i, field in enumerate(FIELDS, start=1):
+                incoming[i] = candles[field]
+        else:
+            incoming = np.empty((len(COLUMNS), len(candles)))
+            incoming[0] = to_days([c['ts'] if 'ts' in c else c['date'] for c in candles])
+            for i, field in enumerate(FIELDS, start=1):
+                incoming[i] = [c[field] for c in candles]
+
+        existing = self.read(symbol)
+        if existing is not None:
+            keep = ~np.isin(existing[0], incoming[0])
+            incoming = np.concatenate([existing[:, keep], incoming], axis=1)
+
+        # Sort by date; for duplicate dates within the batch the last row wins
+        order = np.argsort(incoming[0], kind='stable')
+        incoming = incoming[:, order]
+        last = np.append(incoming[0, 1:] != incoming[0, :-1], True)
+        incoming = incoming[:, last]
+
+        self.write(symbol, incoming)
+        return incoming.shape[1]
+
+    def extend(self, symbol: str, candles: Union[List[dict], Dict[str, np.ndarray]], after: Optional[str] = None) -> bool:
+        """
+        Apply an ingest batch: the full history when `after` is None, otherwise
+        the candles following date `after`. The batch is only applied when the
+        store holds exactly the history it continues. Otherwise the symbol is
+        dropped rather than written with a gap or left stale, and False is
+        returned; sync() fetches its full history again.
+        """
+        if after is None:
+            self.write(symbol, np.empty((len(COLUMNS), 0)))
+        elif self.last_date(symbol) != after[:10]:
+            self.drop(symbol)
+            return False
+        self.merge(symbol, candles)
+        return True
+
+    def panel(self, symbols: List[str], bars: int = 100) -> CandlePanel:
+        """Build a right-aligned CandlePanel straight from the mapped files"""
+        block = np.full((len(COLUMNS), len(symbols), bars), np.nan)
+        lengths = np.zeros(len(symbols), dtype=np.int64)
+
+        for i, symbol in enumerate(symbols):
+            data = self.read(symbol, bars)
+            n = 0 if data is None else data.shape[1]
+            lengths[i] = n
+            if n:
+                block[:, i, bars - n:] = data
+
+        # Symbols share one trading calendar, so each distinct date is formatted once
+        days = block[0]
+        observed = ~np.isnan(days)
+        unique_days, index = np.unique(days[observed], return_inverse=True)
+        ts = np.full((len(symbols), bars), None, dtype=object)
+        ts[observed] = to_dates(unique_days).astype(object)[index]
+        last_ts = [ts[i, -1] if lengths[i] else None for i in range(len(symbols))]
+
+        arrays = {field: block[j] for j, field in enumerate(FIELDS, start=1)}
+        return CandlePanel(list(symbols), arrays, lengths, last_ts, ts)
+
+    def sync(self, symbols: List[str], full_history: int = FULL_HISTORY_BARS) -> Dict:
+        """
+        Bring the store up to date with daily_candles.
+
+        One bulk last-date query finds the symbols that are behind; each is
+        fetched for just the sessions it is missing (plus a few bars of
+        overlap) through the bulk candle RPC, grouped by gap length.
+        """
+        started = time.perf_counter()
+        db_last = get_last_candle_dates(symbols)
+        gaps: Dict[int, List[str]] = {}
+        up_to_date = 0
+
+        for symbol, last in db_last.items():
+            if last is None:
+                continue
+            local = self.last_date(symbol)
+            if local == last[:10]:
+                up_to_date += 1
+            elif local is None:
+                gaps.setdefault(full_history, []).append(symbol)
+            elif local < last[:10]:
+                missing = int(np.busday_count(local, np.datetime64(last[:10]) + 1))
+                gaps.setdefault(min(full_history, missing + 5), []).append(symbol)
+
+        synced = 0
+        for days, group in sorted(gaps.items()):
+            for symbol, rows in get_candles_bulk(group, days=days).items():
+                self.merge(symbol, rows)
+                synced += 1
+        self.save_manifest()
+
+        summary = {
+            'symbols': len(symbols),
+            'synced': synced,
+            'up_to_date': up_to_date,
+            'not_in_db': sum(1 for last in db_last.values() if last is None),
+            'elapsed': time.perf_counter() - started
+        }
+        print(f"Candle store sync: {summary['synced']} symbols updated, {summary['up_to_date']} up to date "
+              f"({summary['elapsed']:.1f}s)")
+        return summary
+
+    def verify(self, symbols: List[str], sample: int = 5) -> Dict:
+        """
+        Compare the store against daily_candles: latest date for every symbol
+        and the values of the last `sample` candles.
+        """
+        db_last = get_last_candle_dates(symbols)
+        recent = get_candles_bulk(symbols, days=sample)
+        report = {'checked': len(symbols), 'missing': [], 'behind': [], 'ahead': [], 'mismatched': []}
+
+        for symbol in symbols:
+            last = db_last.get(symbol)
+            local = self.last_date(symbol)
+            if last is None and local is None:
+                continue
+            if local is None:
+                report['missing'].append(symbol)
+                continue
+            if last is None or local > last[:10]:
+                report['ahead'].append(symbol)
+                continue
+            if local < last[:10]:
+                report['behind'].append(symbol)
+                continue
+
+            stored = {c['ts']: c for c in self.candles(symbol, bars=sample)}
+            for row in recent.get(symbol, []):
+                candle = stored.get(str(row['ts'])[:10])
+                if candle is None or any(not np.isclose(candle[f], float(row[f]), rtol=1e-9)
+                                         for f in FIELDS if row.get(f) is not None):
+                    report['mismatched'].append(symbol)
+                    break
+
+        report['ok'] = not (report['missing'] or report['behind'] or report['ahead'] or report['mismatched'])
+        print(f"Candle store verify: {len(symbols)} symbols, {len(report['missing'])} missing, "
+              f"{len(report['behind'])} behind, {len(report['ahead'])} ahead, "
+              f"{len(report['mismatched'])} mismatched")
+        return report
+
+_candle_store: Optional[CandleStore] = None
+
+def get_candle_store() -> CandleStore:
+    """Get candle store singleton"""
+    global _candle_store
+
+    if _candle_store is None:
+        _candle_store = CandleStore()
+
+    return _candle_store
+
+if __name__ == "__main__":
+    import sys
+    from .supabase_client import get_supabase_client
+
+    # python -m app.candle_store sync|verify [SYMBOL ...]
+    command = sys.argv[1] if len(sys.argv) > 1 else "verify"
+    symbols = sys.argv[2:] or [
+        row['symbol'] for row in get_supabase_client().table('screened_stocks').select('symbol').execute().data
+    ]
+    store = get_candle_store()
+    if command == "sync":
+        store.sync(symbols)
+    else:
+        sys.exit(0 if store.verify(symbols)['ok'] else 1)
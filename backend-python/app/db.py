@@ -0,0 +1,101 @@
+import os
+import time
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from .supabase_client import DB_POOL_SIZE
+
+# Threads running database calls for request handlers. Fewer than
+# DB_POOL_SIZE, so background jobs querying from their own threads still
+# find a free connection
+DB_WORKERS = int(os.getenv("DB_WORKERS", str(max(1, DB_POOL_SIZE // 2))))
+
+class DBStats:
+    """Calls, errors, time queued for a worker and time running, across the pool"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.calls = 0
+            self.errors = 0
+            self.in_flight = 0
+            self.max_in_flight = 0
+            self.wait_time = 0.0
+            self.run_time = 0.0
+
+    def started(self, waited: float):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            self.wait_time += waited
+
+    def finished(self, seconds: float, failed: bool):
+        with self._lock:
+            self.in_flight -= 1
+            self.calls += 1
+            self.errors += failed
+            self.run_time += seconds
+
+    def summary(self) -> Dict:
+        with self._lock:
+            return {
+                'workers': DB_WORKERS,
+                'pool_size': DB_POOL_SIZE,
+                'calls': self.calls,
+                'errors': self.errors,
+                'in_flight': self.in_flight,
+                'max_in_flight': self.max_in_flight,
+                'mean_wait_ms': round(1000 * self.wait_time / self.calls, 2) if self.calls else 0.0,
+                'mean_run_ms': round(1000 * self.run_time / self.calls, 2) if self.calls else 0.0
+            }
+
+_stats = DBStats()
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+def get_db_executor() -> ThreadPoolExecutor:
+    """Get the database thread pool singleton"""
+    global _executor
+
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=DB_WORKERS, thread_name_prefix='db')
+        return _executor
+
+def _timed(call: Callable[[], Any], queued: float) -> Any:
+    started = time.perf_counter()
+    _stats.started(started - queued)
+    failed = True
+    try:
+        result = call()
+        failed = False
+        return result
+    finally:
+        _stats.finished(time.perf_counter() - started, failed)
+
+async def run_db(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Run a blocking database call on the database thread pool and await it,
+    so the event loop keeps serving other requests meanwhile. Independent
+    calls can be awaited together with asyncio.gather.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_db_executor(), _timed, functools.partial(fn, *args, **kwargs), time.perf_counter()
+    )
+
+async def fetch(query) -> list:
+    """Execute a postgrest query builder off the event loop and return its rows"""
+    return (await run_db(query.execute)).data
+
+def db_stats() -> Dict:
+    return _stats.summary()
+
+def reset_db_stats():
+    _stats.reset()
@@ -1,31 +1,41 @@
+import os
+import json
+import base64
+import asyncio
 import pandas as pd
 import yfinance as yf
-import time
-from typing import List, Dict, Optional
-from .supabase_client import get_supabase_client
+from typing import AsyncIterator, Callable, Iterable, List, Dict, Optional, Tuple
+from .supabase_client import get_supabase_client, get_fundamentals_page, notify_write, FUNDAMENTALS_COLUMNS
+from .db import run_db
+from .http_pool import get_http_session
+
+def fetch_info(symbol: str) -> Dict:
+    """Raw yfinance info for an NSE symbol; raises on request errors"""
+    return yf.Ticker(f"{symbol}.NS", session=get_http_session("yfinance")).info
+
+def fundamentals_from_info(symbol: str, info: Dict) -> Dict:
+    """Map a yfinance info dict onto a fundamentals row"""
+    return {
+        "symbol": symbol,
+        "company_name": info.get("longName"),
+        "market_cap": info.get("marketCap"),
+        "roe": info.get("returnOnEquity"),
+        "pe_ratio": info.get("trailingPE"),
+        "pb_ratio": info.get("priceToBook"),
+        "eps": info.get("trailingEps"),
+        "industry": info.get("industry"),
+        "sector": info.get("sector"),
+        "meta": {
+            "dividend_yield": info.get("dividendYield"),
+            "book_value": info.get("bookValue"),
+            "price_to_sales": info.get("priceToSalesTrailing12Months")
+        }
+    }
 
 def fetch_fundamentals(symbol: str) -> Dict:
     """Fetch fundamental data for a symbol using yfinance"""
     try:
-        ticker = yf.Ticker(f"{symbol}.NS")
-        info = ticker.info
-
-        return {
-            "symbol": symbol,
-            "company_name": info.get("longName"),
-            "market_cap": info.get("marketCap"),
-            "roe": info.get("returnOnEquity"),
-            "pe_ratio": info.get("trailingPE"),
-            "pb_ratio": info.get("priceToBook"),
-            "eps": info.get("trailingEps"),
-            "industry": info.get("industry"),
-            "sector": info.get("sector"),
-            "meta": {
-                "dividend_yield": info.get("dividendYield"),
-                "book_value": info.get("bookValue"),
-                "price_to_sales": info.get("priceToSalesTrailing12Months")
-            }
-        }
+        return fundamentals_from_info(symbol, fetch_info(symbol))
     except Exception as e:
         print(f"Error fetching {symbol}: {e}")
         return {"symbol": symbol, "error": str(e)}
@@ -39,49 +49,57 @@ def upsert_fundamentals(fundamentals_data: List[Dict]) -> Dict:
     
     if valid_data:
         result = supabase.table('fundamentals').upsert(valid_data).execute()
+        notify_write('fundamentals', valid_data)
         return result
     
     return {"data": []}
 
-async def load_equity_list_and_fetch_fundamentals(csv_path: str = "EQUITY_L.csv"):
-    """Load EQUITY_L.csv and fetch fundamentals for all symbols"""
-    
-    # Load CSV
+def load_equity_list(csv_path: str = "EQUITY_L.csv") -> List[str]:
+    """Symbols from an NSE EQUITY_L.csv listing"""
     df = pd.read_csv(csv_path)
-    symbols = df["SYMBOL"].tolist()
-    
-    print(f"Loading fundamentals for {len(symbols)} symbols...")
-    
-    # First, add all symbols to screened_stocks
-    supabase = get_supabase_client()
-    stocks_data = [{"symbol": sym, "exchange": "NSE"} for sym in symbols]
-    supabase.table('screened_stocks').upsert(stocks_data).execute()
-    
-    # Fetch fundamentals in batches
-    batch_size = 50
-    all_fundamentals = []
-    
-    for i in range(0, len(symbols), batch_size):
-        batch = symbols[i:i + batch_size]
-        print(f"Processing batch {i//batch_size + 1}/{(len(symbols)-1)//batch_size + 1}")
-        
-        batch_fundamentals = []
-        for symbol in batch:
-            fundamentals = fetch_fundamentals(symbol)
-            if "error" not in fundamentals:
-                batch_fundamentals.append(fundamentals)
-            time.sleep(0.1)  # Rate limiting
-        
-        # Upsert batch
-        if batch_fundamentals:
-            upsert_fundamentals(batch_fundamentals)
-            all_fundamentals.extend(batch_fundamentals)
-        
-        time.sleep(1)  # Batch delay
-    
-    print(f"Completed: {len(all_fundamentals)} fundamentals stored")
-    return all_fundamentals
+    return df["SYMBOL"].tolist()
+
+# Rows per /api/fundamentals page; PostgREST caps a response at 1000 rows
+FUNDAMENTALS_PAGE_SIZE = int(os.getenv("FUNDAMENTALS_PAGE_SIZE", "500"))
+MAX_PAGE_SIZE = 1000
+
+def fundamentals_columns(fields: Optional[Iterable[str]] = None) -> str:
+    """Select list for the requested fields (all by default); symbol and market_cap always come along for the cursor"""
+    if not fields:
+        return '*'
+    fields = list(fields)
+    unknown = set(fields) - set(FUNDAMENTALS_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown fundamentals fields: {', '.join(sorted(unknown))}")
+    return ','.join(dict.fromkeys(['symbol', 'market_cap', *fields]))
+
+def encode_cursor(row: Dict) -> str:
+    """Opaque keyset cursor for the row after which the next page starts"""
+    raw = json.dumps([row.get('market_cap'), row['symbol']], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor: str) -> Tuple:
+    try:
+        market_cap, symbol = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return market_cap, symbol
 
-if __name__ == "__main__":
-    import asyncio
-    asyncio.run(load_equity_list_and_fetch_fundamentals())
+async def stream_fundamentals(columns: str = '*', after: Optional[Tuple] = None, symbol: Optional[str] = None,
+                              sector: Optional[str] = None, page_size: int = MAX_PAGE_SIZE,
+                              fetch_page: Callable[..., list] = get_fundamentals_page) -> AsyncIterator[bytes]:
+    """
+    Every matching fundamentals row as NDJSON, one keyset page per chunk.
+    The next page is requested while the current one is written, and only
+    those two pages are ever held, whatever the size of the result.
+    """
+    pending = asyncio.ensure_future(run_db(fetch_page, columns, after, page_size, symbol, sector))
+    while pending is not None:
+        rows = await pending
+        pending = None
+        if len(rows) == page_size:
+            last = rows[-1]
+            pending = asyncio.ensure_future(run_db(fetch_page, columns, (last['market_cap'], last['symbol']),
+                                                   page_size, symbol, sector))
+        if rows:
+            yield ''.join(json.dumps(row, separators=(',', ':')) + '\n' for row in rows).encode()
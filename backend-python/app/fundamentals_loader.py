@@ -0,0 +1,368 @@
+import os
+import json
+import time
+import zlib
+import random
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from .ratelimit import AdaptiveTokenBucket
+from .fundamentals import fetch_info, fundamentals_from_info, load_equity_list
+from .supabase_client import upsert_chunk, upsert_stock_meta
+
+# Yahoo has no published limit; start gently and let the bucket find the ceiling
+FUNDAMENTALS_WORKERS = int(os.getenv("FUNDAMENTALS_WORKERS", "8"))
+FUNDAMENTALS_REQUESTS_PER_SEC = float(os.getenv("FUNDAMENTALS_REQUESTS_PER_SEC", "2"))
+FUNDAMENTALS_MAX_REQUESTS_PER_SEC = float(os.getenv("FUNDAMENTALS_MAX_REQUESTS_PER_SEC", "8"))
+FUNDAMENTALS_CHECKPOINT = os.getenv(
+    "FUNDAMENTALS_CHECKPOINT",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "fundamentals_checkpoint.json")
+)
+FUNDAMENTALS_ERROR_LEDGER = os.getenv(
+    "FUNDAMENTALS_ERROR_LEDGER",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "fundamentals_errors.json")
+)
+CHECKPOINT_VERSION = 1
+
+# A symbol that failed is not retried for ERROR_BACKOFF, doubling per failure
+ERROR_BACKOFF = timedelta(hours=6)
+MAX_ERROR_BACKOFF = timedelta(days=14)
+
+# Rows per fundamentals upsert; the checkpoint is saved after each one
+WRITE_BATCH = 50
+
+def is_throttled(error: Exception) -> bool:
+    """Yahoo answers bursts with HTTP 429 Too Many Requests"""
+    text = f"{type(error).__name__} {error}"
+    return '429' in text or 'Too Many Requests' in text or 'RateLimit' in text
+
+class StubFetcher:
+    """
+    Offline stand-in for yfinance info requests, used by dry runs.
+
+    Each call sleeps latency +/- jitter seconds and returns a synthetic info
+    dict derived from the symbol. Like Yahoo, it answers 429 once more than
+    `limit` requests arrive within one second, and fails `error_rate` of
+    calls with a connection error.
+    """
+
+    def __init__(self, latency: float = 1.0, jitter: float = 0.5, limit: float = 6.0,
+                 error_rate: float = 0.02, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.limit = limit
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._recent: deque = deque()
+        self._lock = threading.Lock()
+        self.stats = {'calls': 0, 'throttled': 0, 'errors': 0}
+
+    def __call__(self, symbol: str) -> Dict:
+        with self._lock:
+            now = time.monotonic()
+            while self._recent and now - self._recent[0] >= 1.0:
+                self._recent.popleft()
+            self.stats['calls'] += 1
+            if len(self._recent) >= self.limit:
+                self.stats['throttled'] += 1
+                raise ConnectionError("429 Client Error: Too Many Requests")
+            self._recent.append(now)
+            delay = max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter))
+            failed = self._rng.random() < self.error_rate
+            if failed:
+                self.stats['errors'] += 1
+
+        time.sleep(delay)
+        if failed:
+            raise ConnectionError(f"Connection reset while fetching {symbol}")
+
+        seed = zlib.crc32(symbol.encode())
+        return {
+            "longName": f"{symbol} Limited",
+            "marketCap": (seed % 10_000 + 1) * 10_000_000,
+            "returnOnEquity": (seed % 400) / 1000,
+            "trailingPE": 5 + seed % 60,
+            "priceToBook": 0.5 + (seed % 90) / 10,
+            "trailingEps": (seed % 2000) / 10,
+            "industry": "Stub Industry",
+            "sector": "Stub Sector"
+        }
+
+class Checkpoint:
+    """
+    Progress of an interrupted fundamentals load: the symbols already
+    written, plus the last error of each failure. It is saved after every
+    write batch and removed once a run has attempted every symbol. Without
+    a path it is kept in memory only.
+    """
+
+    def __init__(self, path: Optional[str], done: Optional[Set[str]] = None, failed: Optional[Dict[str, str]] = None,
+                 started_at: Optional[str] = None):
+        self.path = path
+        self.done = done or set()
+        self.failed = failed or {}
+        self.started_at = started_at or datetime.now().isoformat(timespec='seconds')
+
+    @classmethod
+    def load(cls, path: str) -> Optional['Checkpoint']:
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get('version') != CHECKPOINT_VERSION:
+            return None
+        return cls(path, set(data['done']), data.get('failed', {}), data.get('started_at'))
+
+    def save(self):
+        if self.path is None:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump({'version': CHECKPOINT_VERSION, 'started_at': self.started_at,
+                       'saved_at': datetime.now().isoformat(timespec='seconds'),
+                       'done': sorted(self.done), 'failed': self.failed}, f)
+        os.replace(tmp, self.path)
+
+    def clear(self):
+        if self.path is None:
+            return
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+def dry_run_path(path: str) -> str:
+    """Sibling file for dry-run state, so a dry run never touches real progress"""
+    root, ext = os.path.splitext(path)
+    return f"{root}.dry_run{ext}"
+
+class ErrorLedger:
+    """
+    Symbols whose last fetch failed and when each may be tried again.
+    Consecutive failures double the wait from ERROR_BACKOFF up to
+    MAX_ERROR_BACKOFF; a successful fetch clears the entry.
+    """
+
+    def __init__(self, path: str = FUNDAMENTALS_ERROR_LEDGER, entries: Optional[Dict[str, dict]] = None):
+        self.path = path
+        self.entries = entries or {}
+
+    @classmethod
+    def load(cls, path: str = FUNDAMENTALS_ERROR_LEDGER) -> 'ErrorLedger':
+        try:
+            with open(path) as f:
+                return cls(path, json.load(f))
+        except (OSError, ValueError):
+            return cls(path)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(self.entries, f)
+        os.replace(tmp, self.path)
+
+    def record(self, symbol: str, error: str, now: Optional[datetime] = None):
+        now = now or datetime.now(timezone.utc)
+        failures = self.entries.get(symbol, {}).get('failures', 0) + 1
+        wait = min(MAX_ERROR_BACKOFF, ERROR_BACKOFF * 2 ** (failures - 1))
+        self.entries[symbol] = {'failures': failures, 'error': error[:200],
+                                'retry_after': (now + wait).isoformat(timespec='seconds')}
+
+    def clear(self, symbol: str):
+        self.entries.pop(symbol, None)
+
+    def backing_off(self, symbol: str, now: Optional[datetime] = None) -> bool:
+        entry = self.entries.get(symbol)
+        return entry is not None and datetime.fromisoformat(entry['retry_after']) > (now or datetime.now(timezone.utc))
+
+class FundamentalsLoader:
+    """
+    Fetch fundamentals on a thread pool under one adaptive rate limit.
+
+    Every request takes a token from an AdaptiveTokenBucket, which halves
+    its rate when Yahoo throttles and creeps back up while requests succeed.
+    Failed fetches are retried with jittered exponential backoff. Rows are
+    upserted WRITE_BATCH at a time and each write is checkpointed, so a
+    crash loses at most one batch and the next run resumes from the
+    checkpoint. With checkpoint=False the caller tracks progress itself and
+    no checkpoint file is read or written. With a ledger, failures are
+    recorded for backoff and successes clear them. A dry run fetches
+    through StubFetcher and writes nothing.
+    """
+
+    def __init__(self, workers: int = FUNDAMENTALS_WORKERS,
+                 requests_per_sec: float = FUNDAMENTALS_REQUESTS_PER_SEC,
+                 max_requests_per_sec: float = FUNDAMENTALS_MAX_REQUESTS_PER_SEC,
+                 retries: int = 3, backoff: float = 1.0, batch_size: int = WRITE_BATCH,
+                 checkpoint_path: Optional[str] = None, dry_run: bool = False,
+                 fetcher: Optional[Callable[[str], Dict]] = None, ledger: Optional[ErrorLedger] = None,
+                 checkpoint: bool = True):
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.fetcher = fetcher or (StubFetcher() if dry_run else fetch_info)
+        if checkpoint_path is None:
+            checkpoint_path = dry_run_path(FUNDAMENTALS_CHECKPOINT) if dry_run else FUNDAMENTALS_CHECKPOINT
+        self.checkpoint_path = checkpoint_path if checkpoint else None
+        self.ledger = ledger
+        self.limiter = AdaptiveTokenBucket(requests_per_sec, max_rate=max_requests_per_sec,
+                                           capacity=max(1.0, requests_per_sec))
+        self._lock = threading.Lock()
+        self.stats = {'fetched': 0, 'failed': 0, 'retries': 0, 'written': 0, 'write_failed': 0}
+
+    def fetch(self, symbol: str) -> Tuple[Optional[Dict], Optional[str]]:
+        """(row, None) on success, (None, last error) once retries are exhausted"""
+        for attempt in range(self.retries + 1):
+            self.limiter.acquire()
+            try:
+                info = self.fetcher(symbol)
+            except Exception as e:
+                if is_throttled(e):
+                    self.limiter.throttled()
+                if attempt == self.retries:
+                    return None, str(e)
+                with self._lock:
+                    self.stats['retries'] += 1
+                time.sleep(self.backoff * 2 ** attempt * random.uniform(0.5, 1.5))
+                continue
+
+            self.limiter.succeeded()
+            row = fundamentals_from_info(symbol, info)
+            # The column default only applies on insert; staleness checks need every fetch stamped
+            row['updated_at'] = datetime.now(timezone.utc).isoformat(timespec='seconds')
+            return row, None
+
+    def _write(self, rows: List[Dict], checkpoint: Checkpoint):
+        """Upsert a batch, then record it in the checkpoint"""
+        if not rows:
+            return
+        written = self.dry_run or upsert_chunk('fundamentals', rows, ('symbol',))
+        symbols = [row['symbol'] for row in rows]
+        if written:
+            checkpoint.done.update(symbols)
+            self.stats['written'] += len(rows)
+            if self.ledger is not None:
+                for symbol in symbols:
+                    self.ledger.clear(symbol)
+        else:
+            checkpoint.failed.update({symbol: "upsert failed" for symbol in symbols})
+            self.stats['write_failed'] += len(rows)
+        checkpoint.save()
+
+    def run(self, symbols: List[str], resume: bool = True, max_symbols: Optional[int] = None,
+            progress: Optional[Callable[[int, int], None]] = None) -> Dict:
+        """
+        Load fundamentals for symbols, skipping those an interrupted earlier
+        run already wrote (unless resume is False). max_symbols caps this
+        run; the checkpoint keeps the rest for the next one. progress(done,
+        total) is called per symbol; if it raises, the run stops with the
+        checkpoint saved.
+        """
+        started = time.perf_counter()
+        checkpoint = Checkpoint.load(self.checkpoint_path) if resume and self.checkpoint_path else None
+        resumed = checkpoint is not None
+        if checkpoint is None:
+            checkpoint = Checkpoint(self.checkpoint_path)
+        checkpoint.failed = {}
+
+        todo = [symbol for symbol in symbols if symbol not in checkpoint.done]
+        skipped = len(symbols) - len(todo)
+        if max_symbols is not None:
+            todo = todo[:max_symbols]
+        print(f"Loading fundamentals for {len(todo)} symbols ({skipped} already done"
+              f"{', resumed from ' + checkpoint.started_at if resumed else ''}): {self.workers} workers, "
+              f"{self.limiter.rate:g}-{self.limiter.max_rate:g} requests/s{' [dry run]' if self.dry_run else ''}")
+
+        pool = ThreadPoolExecutor(max_workers=self.workers)
+        batch: List[Dict] = []
+        attempted = 0
+        try:
+            futures = {pool.submit(self.fetch, symbol): symbol for symbol in todo}
+            for future in as_completed(futures):
+                symbol = futures[future]
+                row, error = future.result()
+                attempted += 1
+                if row is None:
+                    checkpoint.failed[symbol] = error
+                    self.stats['failed'] += 1
+                    if self.ledger is not None:
+                        self.ledger.record(symbol, error)
+                else:
+                    batch.append(row)
+                    self.stats['fetched'] += 1
+                if len(batch) >= self.batch_size:
+                    self._write(batch, checkpoint)
+                    batch = []
+                if progress:
+                    progress(attempted, len(todo))
+                if attempted % 100 == 0:
+                    elapsed = time.perf_counter() - started
+                    print(f"  {attempted}/{len(todo)} symbols ({attempted / elapsed * 60:.0f} symbols/min, "
+                          f"{self.limiter.rate:.1f} requests/s)")
+        finally:
+            # On interrupt, drop queued fetches but keep what has been fetched
+            pool.shutdown(wait=False, cancel_futures=True)
+            self._write(batch, checkpoint)
+            if self.ledger is not None:
+                self.ledger.save()
+
+        remaining = [s for s in symbols if s not in checkpoint.done and s not in checkpoint.failed]
+        if remaining:
+            checkpoint.save()
+        else:
+            checkpoint.clear()
+
+        elapsed = time.perf_counter() - started
+        summary = {
+            **self.stats,
+            'symbols': len(symbols),
+            'skipped': skipped,
+            'remaining': len(remaining),
+            'resumed': resumed,
+            'dry_run': self.dry_run,
+            'elapsed': elapsed,
+            'symbols_per_min': attempted / elapsed * 60 if elapsed else 0.0,
+            'final_rate': self.limiter.rate,
+            'throttled': self.limiter.stats['throttled'],
+            'failures': dict(list(checkpoint.failed.items())[:20])
+        }
+        print(f"Fundamentals: {summary['written']} written, {summary['failed']} failed, "
+              f"{summary['remaining']} remaining in {elapsed:.1f}s ({summary['symbols_per_min']:.0f} symbols/min, "
+              f"{summary['retries']} retries, {summary['throttled']} throttled, "
+              f"rate settled at {self.limiter.rate:.1f}/s)")
+        return summary
+
+async def load_equity_list_and_fetch_fundamentals(csv_path: str = "EQUITY_L.csv", workers: int = FUNDAMENTALS_WORKERS,
+                                                  dry_run: bool = False, resume: bool = True) -> Dict:
+    """Load EQUITY_L.csv and fetch fundamentals for all symbols, off the event loop"""
+    loop = asyncio.get_running_loop()
+    symbols = load_equity_list(csv_path)
+
+    if not dry_run:
+        # Fundamentals reference screened_stocks, so every symbol is registered first
+        await loop.run_in_executor(None, upsert_stock_meta, [{"symbol": s, "exchange": "NSE"} for s in symbols])
+
+    loader = FundamentalsLoader(workers=workers, dry_run=dry_run)
+    return await loop.run_in_executor(None, loader.run, symbols, resume)
+
+if __name__ == "__main__":
+    import sys
+
+    # python -m app.fundamentals_loader [EQUITY_L.csv] [--dry-run] [--restart] [--workers=N]
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    flags = dict(a[2:].partition('=')[::2] for a in sys.argv[1:] if a.startswith('--'))
+    asyncio.run(load_equity_list_and_fetch_fundamentals(
+        args[0] if args else "EQUITY_L.csv",
+        workers=int(flags.get('workers') or FUNDAMENTALS_WORKERS),
+        dry_run='dry-run' in flags,
+        resume='restart' not in flags
+    ))
@@ -0,0 +1,190 @@
+import os
+import zlib
+import asyncio
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterable, List, Optional
+
+from .fundamentals import load_equity_list
+from .fundamentals_loader import (
+    FundamentalsLoader,
+    ErrorLedger,
+    FUNDAMENTALS_WORKERS,
+    FUNDAMENTALS_ERROR_LEDGER,
+    dry_run_path
+)
+from .supabase_client import get_supabase_client, upsert_stock_meta
+
+# How long each stored field stays good. Ratios move with the price; the
+# rest change with quarterly results or hardly at all.
+FIELD_TTLS: Dict[str, timedelta] = {
+    'market_cap': timedelta(days=7),
+    'pe_ratio': timedelta(days=7),
+    'pb_ratio': timedelta(days=7),
+    'eps': timedelta(days=45),
+    'roe': timedelta(days=45),
+    'meta': timedelta(days=45),
+    'company_name': timedelta(days=180),
+    'industry': timedelta(days=180),
+    'sector': timedelta(days=180),
+}
+
+# A field Yahoo returned empty is asked for again sooner than its TTL
+NULL_TTL = timedelta(days=3)
+
+# Each symbol's TTLs are shortened by a fixed share of up to this much, so
+# rows loaded together do not all expire on the same day
+TTL_JITTER = 0.3
+
+# Symbols refreshed ahead of the market-cap order (comma separated)
+FUNDAMENTALS_WATCHLIST = [s.strip() for s in os.getenv("FUNDAMENTALS_WATCHLIST", "").split(",") if s.strip()]
+
+def ttl_fields(fields: Optional[Iterable[str]] = None) -> List[str]:
+    """The requested fields (all by default), rejecting any without a TTL"""
+    fields = list(fields or FIELD_TTLS)
+    unknown = set(fields) - set(FIELD_TTLS)
+    if unknown:
+        raise ValueError(f"No TTL for fields: {', '.join(sorted(unknown))}")
+    return fields
+
+def get_fundamentals_state(fields: Iterable[str] = FIELD_TTLS) -> Dict[str, dict]:
+    """symbol -> updated_at, market_cap and the given fields for every stored row"""
+    supabase = get_supabase_client()
+    columns = ', '.join(dict.fromkeys(['symbol', 'updated_at', 'market_cap', *fields]))
+    state = {}
+    offset = 0
+    while True:
+        result = supabase.table('fundamentals')\
+            .select(columns)\
+            .order('symbol')\
+            .range(offset, offset + 999)\
+            .execute()
+        for row in result.data:
+            state[row['symbol']] = row
+        if len(result.data) < 1000:
+            return state
+        offset += 1000
+
+def row_expiry(row: dict, fields: Iterable[str]) -> Optional[datetime]:
+    """
+    When a stored row goes stale for the given fields: updated_at plus the
+    shortest of their TTLs (an empty field counting NULL_TTL), less the
+    symbol's jitter. None if the row has never been fetched.
+    """
+    if not row.get('updated_at'):
+        return None
+    updated_at = datetime.fromisoformat(row['updated_at'])
+    if updated_at.tzinfo is None:
+        updated_at = updated_at.replace(tzinfo=timezone.utc)
+    ttl = min(FIELD_TTLS[f] if row.get(f) is not None else min(NULL_TTL, FIELD_TTLS[f]) for f in fields)
+    jitter = TTL_JITTER * (zlib.crc32(row['symbol'].encode()) % 1000) / 1000
+    return updated_at + ttl * (1 - jitter)
+
+@dataclass
+class RefreshPlan:
+    """
+    Which symbols a fundamentals refresh must fetch, in priority order:
+    watchlist first, then by stored market cap (largest first), then the
+    symbols with no market cap yet. Symbols still within their TTLs are
+    `fresh`; those whose last fetch failed recently are `backing_off`.
+    """
+    as_of: str
+    to_fetch: List[str] = field(default_factory=list)
+    missing: List[str] = field(default_factory=list)
+    fresh: List[str] = field(default_factory=list)
+    backing_off: List[str] = field(default_factory=list)
+
+    def summary(self) -> Dict:
+        total = len(self.to_fetch) + len(self.fresh) + len(self.backing_off)
+        avoided = len(self.fresh) + len(self.backing_off)
+        return {
+            'as_of': self.as_of,
+            'symbols': total,
+            'to_fetch': len(self.to_fetch),
+            'missing': len(self.missing),
+            'fresh': len(self.fresh),
+            'backing_off': len(self.backing_off),
+            'avoided': avoided,
+            'avoided_pct': round(100 * avoided / total, 1) if total else 0.0
+        }
+
+def build_refresh_plan(symbols: List[str], state: Dict[str, dict], fields: Optional[Iterable[str]] = None,
+                       watchlist: Optional[Iterable[str]] = None, ledger: Optional[ErrorLedger] = None,
+                       now: Optional[datetime] = None, force: bool = False) -> RefreshPlan:
+    """Pick the stale symbols from stored fundamentals rows; force selects every symbol"""
+    fields = ttl_fields(fields)
+    now = now or datetime.now(timezone.utc)
+    watchlist = set(watchlist or ())
+    plan = RefreshPlan(as_of=now.isoformat(timespec='seconds'))
+
+    stale = []
+    for symbol in dict.fromkeys(symbols):
+        row = state.get(symbol)
+        if ledger is not None and not force and ledger.backing_off(symbol, now):
+            plan.backing_off.append(symbol)
+            continue
+        expiry = row_expiry(row, fields) if row else None
+        if expiry is None:
+            plan.missing.append(symbol)
+        elif expiry > now and not force:
+            plan.fresh.append(symbol)
+            continue
+        stale.append(symbol)
+
+    def priority(symbol: str):
+        market_cap = (state.get(symbol) or {}).get('market_cap')
+        return (symbol not in watchlist, market_cap is None, -(market_cap or 0))
+
+    plan.to_fetch = sorted(stale, key=priority)
+    return plan
+
+def plan_refresh(symbols: List[str], fields: Optional[Iterable[str]] = None, watchlist: Optional[Iterable[str]] = None,
+                 ledger: Optional[ErrorLedger] = None, force: bool = False) -> RefreshPlan:
+    """Plan a refresh against the stored fundamentals with one paged query"""
+    fields = ttl_fields(fields)
+    plan = build_refresh_plan(symbols, get_fundamentals_state(fields), fields,
+                              FUNDAMENTALS_WATCHLIST if watchlist is None else watchlist, ledger, force=force)
+    summary = plan.summary()
+    print(f"Fundamentals refresh as of {summary['as_of']}: {summary['to_fetch']} to fetch "
+          f"({summary['missing']} never fetched), {summary['fresh']} fresh, "
+          f"{summary['backing_off']} backing off after errors ({summary['avoided_pct']:g}% avoided)")
+    return plan
+
+async def refresh_fundamentals(csv_path: str = "EQUITY_L.csv", fields: Optional[Iterable[str]] = None,
+                               watchlist: Optional[Iterable[str]] = None, max_symbols: Optional[int] = None,
+                               workers: int = FUNDAMENTALS_WORKERS, force: bool = False,
+                               dry_run: bool = False,
+                               progress: Optional[Callable[[int, int], None]] = None) -> Dict:
+    """
+    Fetch fundamentals only for the symbols whose stored rows are stale,
+    highest priority first; max_symbols caps the fetches of one call. Each
+    write stamps updated_at, so the plan itself records progress: an
+    interrupted or capped refresh continues with whatever is still stale,
+    and the loader's checkpoint is not used.
+    """
+    loop = asyncio.get_running_loop()
+    symbols = load_equity_list(csv_path)
+    ledger = ErrorLedger.load(dry_run_path(FUNDAMENTALS_ERROR_LEDGER) if dry_run else FUNDAMENTALS_ERROR_LEDGER)
+    plan = await loop.run_in_executor(None, plan_refresh, symbols, fields, watchlist, ledger, force)
+
+    if plan.missing and not dry_run:
+        # Fundamentals reference screened_stocks, so new symbols are registered first
+        await loop.run_in_executor(None, upsert_stock_meta, [{"symbol": s, "exchange": "NSE"} for s in plan.missing])
+
+    loader = FundamentalsLoader(workers=workers, dry_run=dry_run, ledger=ledger, checkpoint=False)
+    result = await loop.run_in_executor(None, loader.run, plan.to_fetch, False, max_symbols, progress)
+    return {'plan': plan.summary(), **result}
+
+if __name__ == "__main__":
+    import sys
+
+    # python -m app.fundamentals_refresh [EQUITY_L.csv] [--force] [--dry-run] [--max=N] [--fields=eps,roe]
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    flags = dict(a[2:].partition('=')[::2] for a in sys.argv[1:] if a.startswith('--'))
+    asyncio.run(refresh_fundamentals(
+        args[0] if args else "EQUITY_L.csv",
+        fields=flags['fields'].split(',') if flags.get('fields') else None,
+        max_symbols=int(flags['max']) if flags.get('max') else None,
+        force='force' in flags,
+        dry_run='dry-run' in flags
+    ))
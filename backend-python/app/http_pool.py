@@ -0,0 +1,192 @@
+import os
+import time
+import threading
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+# Applied to every request that does not set its own timeout
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "30"))
+
+# Keep-alive connections per host; callers beyond it wait for a free one
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))
+
+# Distinct hosts a session keeps pools for
+HTTP_POOL_HOSTS = 16
+
+# Connection failures are retried with backoff; a request that reached the
+# server is never resent, so POSTs are safe
+HTTP_CONNECT_RETRIES = 2
+
+class ConnectionStats:
+    """
+    Per-host request and connection counters. Every request is timed by the
+    session; every new connection (TCP connect plus TLS handshake) by the
+    connection class, so requests minus connections is the reuse count.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hosts: Dict[str, Dict[str, float]] = {}
+
+    def _host(self, host: str) -> Dict[str, float]:
+        if host not in self._hosts:
+            self._hosts[host] = {'requests': 0, 'errors': 0, 'request_time': 0.0,
+                                 'connections': 0, 'handshake_time': 0.0}
+        return self._hosts[host]
+
+    def connected(self, host: str, seconds: float):
+        with self._lock:
+            stats = self._host(host)
+            stats['connections'] += 1
+            stats['handshake_time'] += seconds
+
+    def requested(self, host: str, seconds: float, failed: bool = False):
+        with self._lock:
+            stats = self._host(host)
+            stats['requests'] += 1
+            stats['errors'] += failed
+            stats['request_time'] += seconds
+
+    def summary(self) -> Dict[str, Dict]:
+        with self._lock:
+            hosts = {host: dict(stats) for host, stats in self._hosts.items()}
+        summary = {}
+        for host, stats in hosts.items():
+            requests_made = stats['requests']
+            reused = max(0, requests_made - stats['connections'])
+            summary[host] = {
+                'requests': int(requests_made),
+                'errors': int(stats['errors']),
+                'connections': int(stats['connections']),
+                'reused': int(reused),
+                'reuse_pct': round(100 * reused / requests_made, 1) if requests_made else 0.0,
+                'handshake_ms': round(1000 * stats['handshake_time'] / stats['connections'], 2)
+                                if stats['connections'] else 0.0,
+                'request_ms': round(1000 * stats['request_time'] / requests_made, 2) if requests_made else 0.0,
+                'handshake_share_pct': round(100 * stats['handshake_time'] / stats['request_time'], 1)
+                                       if stats['request_time'] else 0.0
+            }
+        return summary
+
+    def reset(self):
+        with self._lock:
+            self._hosts.clear()
+
+_stats = ConnectionStats()
+
+class _TimedConnect:
+    def connect(self):
+        started = time.perf_counter()
+        super().connect()
+        _stats.connected(self.host, time.perf_counter() - started)
+
+class TimedHTTPConnection(_TimedConnect, HTTPConnection):
+    pass
+
+class TimedHTTPSConnection(_TimedConnect, HTTPSConnection):
+    pass
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+class PooledAdapter(HTTPAdapter):
+    """HTTPAdapter whose pools open timed connections"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': TimedHTTPConnectionPool,
+            'https': TimedHTTPSConnectionPool
+        }
+
+class PooledSession(requests.Session):
+    """
+    requests.Session with keep-alive pools of `pool_size` connections per
+    host (blocking when all are busy rather than opening throwaway ones),
+    a default (connect, read) timeout, connect-only retries, and per-host
+    request and handshake timing in http_stats().
+    """
+
+    def __init__(self, pool_size: int = HTTP_POOL_SIZE,
+                 timeout: Tuple[float, float] = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT),
+                 connect_retries: int = HTTP_CONNECT_RETRIES):
+        super().__init__()
+        self.timeout = timeout
+        retries = Retry(total=connect_retries, read=False, redirect=False, status=0, backoff_factor=0.3)
+        adapter = PooledAdapter(pool_connections=HTTP_POOL_HOSTS, pool_maxsize=pool_size,
+                                pool_block=True, max_retries=retries)
+        self.mount('https://', adapter)
+        self.mount('http://', adapter)
+
+    def request(self, method, url, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+        started = time.perf_counter()
+        failed = True
+        try:
+            response = super().request(method, url, **kwargs)
+            failed = response.status_code >= 500
+            return response
+        finally:
+            _stats.requested(urlsplit(url).hostname or '', time.perf_counter() - started, failed)
+
+class CachedToken:
+    """
+    An auth token shared by every caller until `margin` seconds before it
+    expires. login() returns (token, lifetime in seconds) or None on
+    failure; concurrent callers wait for one login instead of each logging in.
+    """
+
+    def __init__(self, login: Callable[[], Optional[Tuple[str, float]]], margin: float = 60.0):
+        self._login = login
+        self.margin = margin
+        self._lock = threading.Lock()
+        self._token: Optional[str] = None
+        self._expires = 0.0
+        self.stats = {'logins': 0, 'hits': 0}
+
+    def get(self) -> Optional[str]:
+        with self._lock:
+            if self._token is not None and time.monotonic() < self._expires - self.margin:
+                self.stats['hits'] += 1
+                return self._token
+            result = self._login()
+            self.stats['logins'] += 1
+            if result is None:
+                self._token = None
+                return None
+            self._token, lifetime = result
+            self._expires = time.monotonic() + lifetime
+            return self._token
+
+    def invalidate(self):
+        """Drop the token, e.g. after the server reports the session expired"""
+        with self._lock:
+            self._token = None
+
+_sessions: Dict[str, PooledSession] = {}
+_sessions_lock = threading.Lock()
+
+def get_http_session(name: str = "default") -> PooledSession:
+    """Get a named pooled session singleton; names keep cookies of different vendors apart"""
+    with _sessions_lock:
+        if name not in _sessions:
+            _sessions[name] = PooledSession()
+        return _sessions[name]
+
+def http_stats() -> Dict[str, Dict]:
+    """Requests, connection reuse and handshake time per host since start (or reset)"""
+    return _stats.summary()
+
+def reset_http_stats():
+    _stats.reset()
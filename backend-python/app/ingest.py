@@ -1,11 +1,32 @@
 import os
+import asyncio
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, date, timedelta
-from typing import List, Optional
+from typing import Callable, List, Dict, Optional
 from ShoonyaApi import NorenApi
 import time
 
-from .supabase_client import get_supabase_client, upsert_daily_candles, get_last_candle_date
+from .ratelimit import TokenBucket
+from .ingest_planner import plan_ingest, IngestPlan
+from .scrip_master import get_scrip_master
+from .supabase_client import (
+    delete_indicator_states,
+    upsert_stock_meta
+)
+from .metadata_cache import get_metadata_cache
+from .candle_store import get_candle_store
+from .ohlc_cache import get_ohlc_cache
+from .candle_loader import CandleLoader, candle_columns
+
+# Shoonya request budget shared by every ingest worker
+SHOONYA_REQUESTS_PER_SEC = float(os.getenv("SHOONYA_REQUESTS_PER_SEC", "5"))
+SHOONYA_BURST = float(os.getenv("SHOONYA_BURST", "5"))
+
+# Concurrent ingest defaults
+INGEST_CONCURRENCY = int(os.getenv("INGEST_CONCURRENCY", "8"))
+DB_WORKERS = 4
+TARGET_SYMBOLS_PER_MIN = 250
 
 class ShoonyaClient:
     def __init__(self):
@@ -37,18 +58,30 @@ class ShoonyaClient:
             return False
     
     def get_token_for_symbol(self, symbol: str, exchange: str = "NSE") -> Optional[str]:
-        """Get Shoonya token for a symbol"""
+        """Get Shoonya token for a symbol, searching the API only when the scrip master misses"""
+        return self.lookup_token(symbol, exchange) or self.search_token(symbol, exchange)
+    
+    def lookup_token(self, symbol: str, exchange: str = "NSE") -> Optional[str]:
+        """Resolve a token from the local scrip-master index, without a network call"""
+        master = get_scrip_master(exchange)
+        return master.resolve(symbol) if master else None
+    
+    def search_token(self, symbol: str, exchange: str = "NSE") -> Optional[str]:
+        """Search Shoonya for a symbol's token, accepting only an exact trading-symbol match"""
         try:
             result = self.api.searchscrip(exchange=exchange, searchtext=symbol)
             
             if result and isinstance(result, list) and len(result) > 0:
-                # Find exact match
-                for item in result:
-                    if item.get('tsym') == symbol:
-                        return item.get('token')
+                # Find exact match, on the bare symbol or its equity series
+                for tsym in (symbol, f"{symbol}-EQ"):
+                    for item in result:
+                        if item.get('tsym') == tsym and item.get('token'):
+                            master = get_scrip_master(exchange)
+                            if master:
+                                master.add(tsym, item['token'])
+                            return item['token']
                 
-                # If no exact match, return first result
-                return result[0].get('token')
+                print(f"No exact searchscrip match for {symbol}: {[item.get('tsym') for item in result[:5]]}")
             
             return None
             
@@ -100,41 +133,50 @@ class ShoonyaClient:
             print(f"Error fetching daily data: {e}")
             return None
 
-async def ingest_daily_data(symbols: List[str]):
-    """Ingest daily data for given symbols"""
+def store_candles(symbol: str, columns: Dict, from_date: str, full_backfill: bool):
+    """Mirror freshly upserted candles into the local candle store and drop their cached chart responses"""
+    store = get_candle_store()
+    try:
+        after = None if full_backfill else \
+            (datetime.strptime(from_date, '%Y-%m-%d').date() - timedelta(days=1)).isoformat()
+        if not store.extend(symbol, columns, after):
+            print(f"Candle store history for {symbol} does not end on {after}; dropped until the next sync")
+    except Exception as e:
+        # The database stays authoritative; `python -m app.candle_store sync` rebuilds the symbol
+        print(f"Error updating candle store for {symbol}: {e}")
+        store.drop(symbol)
+    finally:
+        get_ohlc_cache().invalidate(symbol)
+
+async def ingest_daily_data(symbols: List[str], progress: Optional[Callable[[int, int], None]] = None):
+    """Ingest daily data for given symbols; progress(done, total) is called per symbol"""
     shoonya = ShoonyaClient()
     
     if not shoonya.login():
         raise Exception("Failed to login to Shoonya")
     
-    supabase = get_supabase_client()
+    metadata = get_metadata_cache()
+    resolved = {}
     
-    for symbol in symbols:
+    # One bulk last-date query decides what every symbol still needs
+    plan = plan_ingest(symbols)
+    if plan.backfill:
+        # Any stored indicator state predates this history
+        delete_indicator_states(plan.backfill)
+    
+    loader = CandleLoader()
+    for done, (symbol, from_date, to_date, full_backfill) in enumerate(plan):
+        if progress:
+            progress(done, len(plan))
         try:
             print(f"Processing {symbol}...")
             
-            # Get token for symbol
-            token = shoonya.get_token_for_symbol(symbol)
+            # Get token for symbol: scrip master, then the stored token, then a Shoonya search
+            token = shoonya.lookup_token(symbol) or metadata.token(symbol) or shoonya.search_token(symbol)
             if not token:
                 print(f"Could not find token for {symbol}")
                 continue
-            
-            # Update token in screened_stocks
-            supabase.table('screened_stocks').update({
-                'meta': {'token': token}
-            }).eq('symbol', symbol).execute()
-            
-            # Get last candle date
-            last_date = get_last_candle_date(symbol)
-            
-            if last_date:
-                # Incremental update
-                from_date = (datetime.strptime(last_date, '%Y-%m-%d').date() + timedelta(days=1)).strftime('%Y-%m-%d')
-            else:
-                # Full backfill (2 years)
-                from_date = (date.today() - timedelta(days=730)).strftime('%Y-%m-%d')
-            
-            to_date = date.today().strftime('%Y-%m-%d')
+            resolved[symbol] = token
             
             print(f"Fetching data for {symbol} from {from_date} to {to_date}")
             
@@ -142,12 +184,13 @@ async def ingest_daily_data(symbols: List[str]):
             df = shoonya.fetch_daily_data(token, from_date, to_date)
             
             if df is not None and not df.empty:
-                # Convert to list of dicts
-                candles_data = df.to_dict('records')
+                # Column arrays feed both the chunked database load and the local candle store
+                columns = candle_columns(df)
                 
-                # Upsert to database
-                result = upsert_daily_candles(symbol, candles_data)
-                print(f"Upserted {len(candles_data)} candles for {symbol}")
+                # Upsert to database, then to the local candle store
+                loaded = loader.load(symbol, columns)
+                store_candles(symbol, columns, from_date, full_backfill)
+                print(f"Upserted {loaded} candles for {symbol}")
             else:
                 print(f"No data found for {symbol}")
             
@@ -157,6 +200,174 @@ async def ingest_daily_data(symbols: List[str]):
         except Exception as e:
             print(f"Error processing {symbol}: {e}")
             continue
+    loader.close()
+    
+    # Store newly resolved tokens in screened_stocks in one bulk write
+    changed = metadata.set_tokens(resolved)
+    if changed:
+        upsert_stock_meta(changed)
+    get_candle_store().save_manifest()
+    
+    stats = metadata.stats['stock_meta']
+    print(f"Token cache: {stats['hits']} hits, {stats['misses']} misses, {stats['absent']} without a stored token, "
+          f"{len(changed)} tokens stored")
+
+def latency_summary(samples: List[float]) -> Dict:
+    """Count, mean, p50, p95 and max of stage latencies, in milliseconds"""
+    if not samples:
+        return {'count': 0}
+    ordered = sorted(samples)
+    
+    def percentile(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+    
+    return {
+        'count': len(ordered),
+        'mean_ms': sum(ordered) / len(ordered) * 1000,
+        'p50_ms': percentile(0.5),
+        'p95_ms': percentile(0.95),
+        'max_ms': ordered[-1] * 1000
+    }
+
+async def ingest_concurrent(symbols: List[str], concurrency: int = INGEST_CONCURRENCY,
+                            requests_per_sec: float = SHOONYA_REQUESTS_PER_SEC,
+                            burst: float = SHOONYA_BURST,
+                            target_per_min: float = TARGET_SYMBOLS_PER_MIN,
+                            shoonya: Optional[ShoonyaClient] = None,
+                            plan: Optional[IngestPlan] = None,
+                            progress: Optional[Callable[[int, int], None]] = None) -> Dict:
+    """
+    Ingest daily data with the token lookup, fetch and upsert stages overlapped.
+    
+    Up to `concurrency` symbols are in flight in a thread pool; every Shoonya
+    call takes a token from one shared bucket, so the pool as a whole stays
+    within the broker's request rate. Database reads and upserts run in their
+    own small pool, so a symbol's write overlaps the next symbols' fetches.
+    The event loop is never blocked. Date ranges come from `plan`, built
+    with one bulk query when not given; up-to-date symbols are skipped.
+    progress(done, total) is called as symbols finish; if it raises, the
+    symbols still in flight are cancelled.
+    
+    Returns per-stage latency stats and the achieved symbols/min.
+    """
+    if shoonya is None:
+        shoonya = ShoonyaClient()
+        if not shoonya.login():
+            raise Exception("Failed to login to Shoonya")
+    
+    loop = asyncio.get_running_loop()
+    bucket = TokenBucket(requests_per_sec, burst)
+    metadata = get_metadata_cache()
+    in_flight = asyncio.Semaphore(concurrency)
+    resolved = {}
+    latencies = {'token': [], 'fetch': [], 'upsert': []}
+    counts = {'symbols': len(symbols), 'up_to_date': 0, 'ingested': 0, 'candles': 0,
+              'no_data': 0, 'no_token': 0, 'errors': 0}
+    
+    def limited(call, *args):
+        bucket.acquire()
+        return call(*args)
+    
+    async def timed(stage: str, pool: ThreadPoolExecutor, call, *args):
+        started = time.perf_counter()
+        try:
+            return await loop.run_in_executor(pool, call, *args)
+        finally:
+            latencies[stage].append(time.perf_counter() - started)
+    
+    async def ingest_symbol(symbol: str, from_date: str, to_date: str, full_backfill: bool):
+        try:
+            async with in_flight:
+                # Only a scrip-master and stored-token miss costs a Shoonya request. The
+                # scrip master may still be downloading, so it is read off the event loop
+                token = await loop.run_in_executor(api_pool, shoonya.lookup_token, symbol) or metadata.token(symbol)
+                if not token:
+                    token = await timed('token', api_pool, limited, shoonya.search_token, symbol)
+                if not token:
+                    print(f"Could not find token for {symbol}")
+                    counts['no_token'] += 1
+                    return
+                resolved[symbol] = token
+                
+                df = await timed('fetch', api_pool, limited, shoonya.fetch_daily_data, token, from_date, to_date)
+            
+            # The upsert runs outside the in-flight limit so the next fetch can start
+            if df is None or df.empty:
+                counts['no_data'] += 1
+                return
+            columns = candle_columns(df)
+            loaded = await timed('upsert', db_pool, loader.load, symbol, columns)
+            await loop.run_in_executor(db_pool, store_candles, symbol, columns, from_date, full_backfill)
+            counts['ingested'] += 1
+            counts['candles'] += loaded
+        except Exception as e:
+            print(f"Error processing {symbol}: {e}")
+            counts['errors'] += 1
+    
+    print(f"Concurrent ingest of {len(symbols)} symbols: {concurrency} in flight, "
+          f"{requests_per_sec:g} Shoonya requests/s (burst {burst:g})")
+    started = time.perf_counter()
+    
+    with ThreadPoolExecutor(max_workers=concurrency) as api_pool, \
+            ThreadPoolExecutor(max_workers=DB_WORKERS) as db_pool, \
+            CandleLoader() as loader:
+        # Load the token maps off the event loop before the workers start reading them
+        await loop.run_in_executor(db_pool, get_scrip_master, "NSE")
+        await loop.run_in_executor(db_pool, metadata.warm, 'stock_meta')
+        
+        # One bulk last-date query decides what every symbol still needs
+        if plan is None:
+            plan = await loop.run_in_executor(db_pool, plan_ingest, symbols)
+        counts['up_to_date'] = len(plan.up_to_date)
+        if plan.backfill:
+            # Any stored indicator state predates this history
+            await loop.run_in_executor(db_pool, delete_indicator_states, plan.backfill)
+        
+        done = 0
+        pending = [asyncio.ensure_future(ingest_symbol(*window)) for window in plan]
+        try:
+            for finished in asyncio.as_completed(pending):
+                await finished
+                done += 1
+                if progress:
+                    progress(done, len(pending))
+                if done % 100 == 0 or done == len(pending):
+                    elapsed = time.perf_counter() - started
+                    print(f"  {done}/{len(pending)} symbols ({done / elapsed * 60:.0f} symbols/min)")
+        except BaseException:
+            for task in pending:
+                task.cancel()
+            raise
+        
+        # Store newly resolved tokens in screened_stocks in one bulk write
+        changed = metadata.set_tokens(resolved)
+        if changed:
+            await loop.run_in_executor(db_pool, upsert_stock_meta, changed)
+        await loop.run_in_executor(db_pool, get_candle_store().save_manifest)
+    
+    elapsed = time.perf_counter() - started
+    throughput = len(symbols) / elapsed * 60 if elapsed else 0.0
+    stages = {stage: latency_summary(samples) for stage, samples in latencies.items()}
+    
+    print(f"Ingested {counts['ingested']} symbols, {counts['candles']} candles in {elapsed:.1f}s "
+          f"({throughput:.0f} symbols/min, target {target_per_min:g})")
+    for stage, summary in stages.items():
+        if summary['count']:
+            print(f"  {stage}: {summary['count']} calls, mean {summary['mean_ms']:.0f} ms, "
+                  f"p95 {summary['p95_ms']:.0f} ms")
+    if throughput < target_per_min:
+        print(f"Below target throughput; the {requests_per_sec:g} requests/s budget allows about "
+              f"{requests_per_sec * 60:.0f} Shoonya calls/min")
+    
+    return {
+        **counts,
+        'tokens_stored': len(changed),
+        'elapsed': elapsed,
+        'symbols_per_min': throughput,
+        'target_per_min': target_per_min,
+        'stages': stages,
+        'rate_limiter': dict(bucket.stats)
+    }
 
 if __name__ == "__main__":
     import asyncio
@@ -0,0 +1,86 @@
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from .supabase_client import get_last_candle_dates
+
+# Full backfill depth for symbols with no candles yet (2 years)
+BACKFILL_DAYS = 730
+
+# NSE closes at 15:30 IST; today's daily candle exists only after that
+MARKET_TZ = ZoneInfo("Asia/Kolkata")
+MARKET_CLOSE = time(15, 30)
+
+def latest_session(now: Optional[datetime] = None) -> date:
+    """Most recent weekday whose daily candle should be available"""
+    now = now or datetime.now(MARKET_TZ)
+    day = now.date() if now.time() >= MARKET_CLOSE else now.date() - timedelta(days=1)
+    while day.weekday() >= 5:
+        day -= timedelta(days=1)
+    return day
+
+@dataclass
+class IngestPlan:
+    """
+    What each symbol still needs, worked out from one bulk last-date query.
+
+    Symbols sharing a date range are grouped under one (from_date, to_date)
+    window; `backfill` lists the symbols with no candles at all, whose
+    window is the full backfill depth.
+    """
+    as_of: str
+    windows: Dict[Tuple[str, str], List[str]] = field(default_factory=dict)
+    backfill: List[str] = field(default_factory=list)
+    up_to_date: List[str] = field(default_factory=list)
+
+    def __iter__(self) -> Iterator[Tuple[str, str, str, bool]]:
+        """(symbol, from_date, to_date, full_backfill) for every symbol to fetch"""
+        backfill = set(self.backfill)
+        for (from_date, to_date), symbols in self.windows.items():
+            for symbol in symbols:
+                yield symbol, from_date, to_date, symbol in backfill
+
+    def __len__(self):
+        return sum(len(symbols) for symbols in self.windows.values())
+
+    def summary(self) -> Dict:
+        return {
+            'as_of': self.as_of,
+            'to_fetch': len(self),
+            'backfill': len(self.backfill),
+            'up_to_date': len(self.up_to_date),
+            'windows': len(self.windows)
+        }
+
+def build_plan(last_dates: Dict[str, Optional[str]], session: Optional[date] = None,
+               today: Optional[date] = None) -> IngestPlan:
+    """Work out each symbol's missing date range from its last stored candle date"""
+    session = session or latest_session()
+    to_date = (today or date.today()).strftime('%Y-%m-%d')
+    plan = IngestPlan(as_of=session.isoformat())
+
+    for symbol, last_date in last_dates.items():
+        if last_date is None:
+            # Full backfill
+            from_date = (session - timedelta(days=BACKFILL_DAYS)).strftime('%Y-%m-%d')
+            plan.backfill.append(symbol)
+        elif last_date[:10] >= plan.as_of:
+            plan.up_to_date.append(symbol)
+            continue
+        else:
+            # Incremental update
+            from_date = (datetime.strptime(last_date[:10], '%Y-%m-%d').date() + timedelta(days=1)).strftime('%Y-%m-%d')
+
+        plan.windows.setdefault((from_date, to_date), []).append(symbol)
+
+    return plan
+
+def plan_ingest(symbols: List[str], session: Optional[date] = None) -> IngestPlan:
+    """Plan an ingest run for the given symbols with a single last-date query"""
+    plan = build_plan(get_last_candle_dates(symbols), session)
+    summary = plan.summary()
+    print(f"Ingest plan as of {summary['as_of']}: {summary['to_fetch']} to fetch "
+          f"({summary['backfill']} full backfills) in {summary['windows']} windows, "
+          f"{summary['up_to_date']} already up to date")
+    return plan
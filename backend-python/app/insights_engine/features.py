@@ -0,0 +1,109 @@
+import re
+import time
+import numpy as np
+from typing import Dict, List, Tuple
+
+from . import panel as pnl
+from . import kernels
+from .panel import CandlePanel, FIELDS
+
+_SPEC = re.compile(r'^\s*(\w+)\s*(?:\((.*)\))?\s*$')
+
+def _bars(store: 'FeatureStore') -> np.ndarray:
+    """Number of candles seen up to and including each bar"""
+    return np.cumsum(~np.isnan(store.get('close')), axis=1)
+
+def _ema(store: 'FeatureStore', window: int) -> np.ndarray:
+    return pnl.ema(store.get('close'), window)
+
+def _rsi(store: 'FeatureStore', window: int) -> np.ndarray:
+    return pnl.rsi(store.get('close'), window)
+
+def _rolling_max(store: 'FeatureStore', column: str, window: int) -> np.ndarray:
+    return pnl.rolling_max(store.get(column), window)
+
+def _rolling_min(store: 'FeatureStore', column: str, window: int) -> np.ndarray:
+    return pnl.rolling_min(store.get(column), window)
+
+def _rolling_mean(store: 'FeatureStore', column: str, window: int) -> np.ndarray:
+    return pnl.rolling_mean(store.get(column), window)
+
+# Derived features; each pulls its inputs through the store, so the
+# dependency graph is resolved and memoized on first use. Specs listed in
+# kernels.OUTPUTS are all computed together by the fused kernel instead.
+FEATURES = {
+    'bars': _bars,
+    'ema': _ema,
+    'rsi': _rsi,
+    'rolling_max': _rolling_max,
+    'rolling_min': _rolling_min,
+    'rolling_mean': _rolling_mean,
+}
+
+def parse_spec(spec: str) -> Tuple[str, tuple]:
+    """Split 'rolling_max(high, 20)' into ('rolling_max', ('high', 20))"""
+    match = _SPEC.match(spec)
+    if not match:
+        raise ValueError(f"Invalid feature spec: {spec}")
+    name, args = match.group(1), match.group(2)
+    parsed = tuple(
+        int(arg) if arg.lstrip('-').isdigit() else arg
+        for arg in (a.strip() for a in (args or '').split(','))
+        if arg
+    )
+    return name, parsed
+
+def canonical(spec: str) -> str:
+    name, args = parse_spec(spec)
+    return f"{name}({','.join(str(a) for a in args)})" if args else name
+
+class FeatureStore:
+    """
+    Memoized, read-only features over a candle panel for one scan.
+
+    Modules declare the specs they need (e.g. 'rsi(14)') and read them with
+    get(); every feature is computed at most once and handed out as a
+    non-writeable array so no module can alter what another one sees.
+    """
+
+    def __init__(self, panel: CandlePanel):
+        self.panel = panel
+        self._cache: Dict[str, np.ndarray] = {}
+        self.stats: Dict[str, Dict] = {}
+
+        for field in FIELDS:
+            self._cache[field] = self._freeze(getattr(panel, field))
+
+    @staticmethod
+    def _freeze(values: np.ndarray) -> np.ndarray:
+        view = values.view()
+        view.flags.writeable = False
+        return view
+
+    def get(self, spec: str) -> np.ndarray:
+        key = canonical(spec)
+        stats = self.stats.setdefault(key, {'computed': 0, 'hits': 0, 'time': 0.0})
+
+        if key in self._cache:
+            stats['hits'] += 1
+            return self._cache[key]
+
+        started = time.perf_counter()
+        if key in kernels.OUTPUTS:
+            computed = kernels.fused_indicators(self.get('close'), self.get('high'), self.get('volume'))
+        else:
+            name, args = parse_spec(spec)
+            if name not in FEATURES:
+                raise KeyError(f"Unknown feature: {name}")
+            computed = {key: FEATURES[name](self, *args)}
+        stats['time'] += time.perf_counter() - started
+
+        for output, values in computed.items():
+            self._cache[output] = self._freeze(values)
+            self.stats.setdefault(output, {'computed': 0, 'hits': 0, 'time': 0.0})['computed'] += 1
+        return self._cache[key]
+
+    def prepare(self, specs: List[str]):
+        """Compute every declared feature up front"""
+        for spec in specs:
+            self.get(spec)
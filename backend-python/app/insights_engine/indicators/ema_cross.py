@@ -1,31 +1,55 @@
-import pandas as pd
-import ta
-from typing import Optional, Dict
+import numpy as np
+from typing import Optional, Dict, List
 
-def run(df: pd.DataFrame, symbol: str, meta: dict) -> Optional[Dict]:
-    """
-    EMA Crossover indicator
-    Returns BUY signal when short EMA crosses above long EMA
-    Returns SELL signal when short EMA crosses below long EMA
-    """
-    if len(df) < 50:  # Need enough data for 50-period EMA
-        return None
+from .. import panel as pnl
+from ..features import FeatureStore
+from ..state import IndicatorState
+
+FEATURES = ['ema(12)', 'ema(26)']
+
+def run_panel(features: FeatureStore, meta: dict) -> List[Optional[Dict]]:
+    """Evaluate the EMA crossover rule for every symbol in a candle panel at once"""
+    panel = features.panel
+    ema_12 = features.get('ema(12)')
+    ema_26 = features.get('ema(26)')
+    current_12, prev_12 = ema_12[:, -1], ema_12[:, -2]
+    current_26, prev_26 = ema_26[:, -1], ema_26[:, -2]
     
-    # Calculate EMAs
-    df['ema_12'] = ta.trend.EMAIndicator(df['close'], window=12).ema_indicator()
-    df['ema_26'] = ta.trend.EMAIndicator(df['close'], window=26).ema_indicator()
+    crossed = ((prev_12 <= prev_26) & (current_12 > current_26)) | \
+              ((prev_12 >= prev_26) & (current_12 < current_26))
     
-    # Check for crossover
-    current_12 = df['ema_12'].iloc[-1]
-    current_26 = df['ema_26'].iloc[-1]
-    prev_12 = df['ema_12'].iloc[-2]
-    prev_26 = df['ema_26'].iloc[-2]
+    latest_close = features.get('close')[:, -1]
     
-    if pd.isna(current_12) or pd.isna(current_26) or pd.isna(prev_12) or pd.isna(prev_26):
-        return None
+    results = [None] * len(panel)
+    for i in np.flatnonzero((panel.lengths >= 50) & crossed):
+        results[i] = signal(prev_12[i], prev_26[i], current_12[i], current_26[i], latest_close[i])
+    
+    return results
+
+def run_signals(features: FeatureStore, meta: dict) -> Dict[str, np.ndarray]:
+    """EMA crossover at every bar: +1 bullish cross, -1 bearish cross, 0 otherwise"""
+    ema_12 = features.get('ema(12)')
+    ema_26 = features.get('ema(26)')
+    prev_12 = pnl.shift(ema_12)
+    prev_26 = pnl.shift(ema_26)
+    warm = features.get('bars') >= 50
     
-    latest_close = df['close'].iloc[-1]
+    bullish = warm & (prev_12 <= prev_26) & (ema_12 > ema_26)
+    bearish = warm & (prev_12 >= prev_26) & (ema_12 < ema_26)
     
+    return {"EMA_CROSS": (bullish.astype(np.int8) - bearish.astype(np.int8))}
+
+def run_state(state: IndicatorState, meta: dict) -> Optional[Dict]:
+    """Evaluate the EMA crossover rule from incrementally maintained indicator state"""
+    if state.bars < 50:
+        return None
+    
+    return signal(state.ema(12, previous=True), state.ema(26, previous=True),
+                  state.ema(12), state.ema(26), state.last_close)
+
+def signal(prev_12: float, prev_26: float, current_12: float, current_26: float,
+           latest_close: float) -> Optional[Dict]:
+    """Build the insight for a pair of consecutive EMA readings, if they cross"""
     # Bullish crossover: 12 EMA crosses above 26 EMA
     if prev_12 <= prev_26 and current_12 > current_26:
         distance = (current_12 - current_26) / current_26
@@ -0,0 +1,65 @@
+import numpy as np
+from typing import Optional, Dict, List
+
+from .. import panel as pnl
+from ..features import FeatureStore
+from ..state import IndicatorState
+
+FEATURES = ['macd(12,26)', 'macd_signal(12,26,9)']
+
+def run_panel(features: FeatureStore, meta: dict) -> List[Optional[Dict]]:
+    """Evaluate the MACD crossover rule for every symbol in a candle panel at once"""
+    panel = features.panel
+    macd = features.get('macd(12,26)')
+    signal_line = features.get('macd_signal(12,26,9)')
+    current_macd, prev_macd = macd[:, -1], macd[:, -2]
+    current_signal, prev_signal = signal_line[:, -1], signal_line[:, -2]
+
+    crossed = (prev_macd <= prev_signal) & (current_macd > current_signal)
+
+    latest_close = features.get('close')[:, -1]
+
+    results = [None] * len(panel)
+    for i in np.flatnonzero((panel.lengths >= 35) & crossed):
+        results[i] = signal(prev_macd[i], prev_signal[i], current_macd[i], current_signal[i], latest_close[i])
+
+    return results
+
+def run_signals(features: FeatureStore, meta: dict) -> Dict[str, np.ndarray]:
+    """MACD crossover at every bar: +1 where the MACD line crosses above its signal line"""
+    macd = features.get('macd(12,26)')
+    signal_line = features.get('macd_signal(12,26,9)')
+    warm = features.get('bars') >= 35
+
+    with np.errstate(invalid='ignore'):
+        bullish = warm & (pnl.shift(macd) <= pnl.shift(signal_line)) & (macd > signal_line)
+
+    return {"MACD_BULLISH": bullish.astype(np.int8)}
+
+def run_state(state: IndicatorState, meta: dict) -> Optional[Dict]:
+    """Evaluate the MACD crossover rule from incrementally maintained indicator state"""
+    if state.signal_line(previous=True) is None:
+        return None
+
+    return signal(state.macd(previous=True), state.signal_line(previous=True),
+                  state.macd(), state.signal_line(), state.last_close)
+
+def signal(prev_macd: float, prev_signal: float, current_macd: float, current_signal: float,
+           latest_close: float) -> Optional[Dict]:
+    """Build the insight for a pair of consecutive MACD readings, if they cross upwards"""
+    if prev_macd <= prev_signal and current_macd > current_signal:
+        histogram = current_macd - current_signal
+        return {
+            "insight_type": "MACD_BULLISH",
+            "signal_type": "BUY",
+            "price": latest_close,
+            "score": min(histogram / latest_close * 100, 1.0),  # Histogram as % of price
+            "attributes": {
+                "macd": current_macd,
+                "signal_line": current_signal,
+                "histogram": histogram,
+                "below_zero": bool(current_macd < 0)
+            }
+        }
+
+    return None
@@ -1,26 +1,42 @@
-import pandas as pd
-import ta
-from typing import Optional, Dict
+import numpy as np
+from typing import Optional, Dict, List
 
-def run(df: pd.DataFrame, symbol: str, meta: dict) -> Optional[Dict]:
-    """
-    RSI Oversold/Overbought indicator
-    Returns BUY signal when RSI < 30 (oversold)
-    Returns SELL signal when RSI > 70 (overbought)
-    """
-    if len(df) < 14:  # Need at least 14 periods for RSI
-        return None
+from ..features import FeatureStore
+from ..state import IndicatorState
+
+FEATURES = ['rsi(14)']
+
+def run_panel(features: FeatureStore, meta: dict) -> List[Optional[Dict]]:
+    """Evaluate the RSI rule for every symbol in a candle panel at once"""
+    latest_rsi = features.get('rsi(14)')[:, -1]
+    latest_close = features.get('close')[:, -1]
     
-    # Calculate RSI
-    df['rsi'] = ta.momentum.RSIIndicator(df['close'], window=14).rsi()
+    results = [None] * len(features.panel)
+    hits = (features.panel.lengths >= 14) & ((latest_rsi < 30) | (latest_rsi > 70))
+    for i in np.flatnonzero(hits):
+        results[i] = signal(latest_rsi[i], latest_close[i])
     
-    latest_rsi = df['rsi'].iloc[-1]
-    latest_close = df['close'].iloc[-1]
+    return results
+
+def run_signals(features: FeatureStore, meta: dict) -> Dict[str, np.ndarray]:
+    """RSI rule at every bar: +1 oversold (BUY), -1 overbought (SELL), 0 otherwise"""
+    rsi = features.get('rsi(14)')
+    warm = features.get('bars') >= 14
     
-    if pd.isna(latest_rsi):
+    return {
+        "RSI_OVERSOLD": np.where(warm & (rsi < 30), 1, 0).astype(np.int8),
+        "RSI_OVERBOUGHT": np.where(warm & (rsi > 70), -1, 0).astype(np.int8)
+    }
+
+def run_state(state: IndicatorState, meta: dict) -> Optional[Dict]:
+    """Evaluate the RSI rule from incrementally maintained indicator state"""
+    if state.rsi is None:
         return None
     
-    # Determine signal
+    return signal(state.rsi, state.last_close)
+
+def signal(latest_rsi: float, latest_close: float) -> Optional[Dict]:
+    """Build the insight for a given RSI reading, if any"""
     if latest_rsi < 30:
         return {
             "insight_type": "RSI_OVERSOLD",
@@ -0,0 +1,107 @@
+import numpy as np
+from typing import Dict
+
+from .panel import span_to_alpha, wilder_alpha
+
+EMA_FAST = 12
+EMA_SLOW = 26
+MACD_SIGNAL = 9
+RSI_WINDOW = 14
+HIGH_WINDOW = 20
+VOLUME_WINDOW = 20
+BOLLINGER_WINDOW = 20
+BOLLINGER_DEV = 2
+
+# Feature specs produced by one call of fused_indicators()
+OUTPUTS = (
+    f'ema({EMA_FAST})',
+    f'ema({EMA_SLOW})',
+    f'macd({EMA_FAST},{EMA_SLOW})',
+    f'macd_signal({EMA_FAST},{EMA_SLOW},{MACD_SIGNAL})',
+    f'rsi({RSI_WINDOW})',
+    f'rolling_max(high,{HIGH_WINDOW})',
+    f'rolling_mean(volume,{VOLUME_WINDOW})',
+    f'bollinger_width({BOLLINGER_WINDOW},{BOLLINGER_DEV})',
+)
+
+def _ewm_step(weighted: np.ndarray, cur: np.ndarray, is_obs: np.ndarray, alpha: float) -> np.ndarray:
+    """One adjust=False EWM step per row, written exactly as pandas computes it"""
+    old_wt = 1.0 - alpha
+    started = weighted == weighted
+    step = (old_wt * weighted + alpha * cur) / (old_wt + alpha)
+    weighted = np.where(started & is_obs & (weighted != cur), step, weighted)
+    return np.where(~started & is_obs, cur, weighted)
+
+def fused_indicators(close: np.ndarray, high: np.ndarray, volume: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    EMA(12/26), MACD and its signal line, RSI(14), the 20-bar high, the
+    20-bar average volume and Bollinger width in one pass over the bars.
+
+    Inputs are (symbols x bars) panels, left-padded with NaN. They are
+    transposed to contiguous (bars x symbols) arrays so every step reads and
+    writes whole rows. The recursive averages follow pandas' EWM update step
+    for step, so EMAs, MACD and RSI match `ta` exactly; the windowed values
+    agree with pandas' rolling results to within rounding.
+
+    Returns one (symbols x bars) array per spec in OUTPUTS, as a transposed
+    view of the bar-major result.
+    """
+    c = np.ascontiguousarray(np.asarray(close, dtype=np.float64).T)
+    h = np.ascontiguousarray(np.asarray(high, dtype=np.float64).T)
+    v = np.ascontiguousarray(np.asarray(volume, dtype=np.float64).T)
+    n, rows = c.shape
+
+    out = {key: np.full((n, rows), np.nan) for key in OUTPUTS}
+    ema_fast, ema_slow, macd, macd_signal, rsi, high_max, avg_volume, width = (out[key] for key in OUTPUTS)
+
+    fast = np.full(rows, np.nan)
+    slow = np.full(rows, np.nan)
+    signal = np.full(rows, np.nan)
+    gain = np.full(rows, np.nan)
+    loss = np.full(rows, np.nan)
+    prev_close = np.full(rows, np.nan)
+    nobs = np.zeros(rows, dtype=np.int64)
+    macd_obs = np.zeros(rows, dtype=np.int64)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for t in range(n):
+            cur = c[t]
+            is_obs = cur == cur
+            nobs += is_obs
+
+            # EMAs and MACD; the MACD line only exists once the slow EMA has warmed up
+            fast = _ewm_step(fast, cur, is_obs, span_to_alpha(EMA_FAST))
+            slow = _ewm_step(slow, cur, is_obs, span_to_alpha(EMA_SLOW))
+            ema_fast[t] = np.where(nobs >= EMA_FAST, fast, np.nan)
+            ema_slow[t] = np.where(nobs >= EMA_SLOW, slow, np.nan)
+            macd[t] = ema_fast[t] - ema_slow[t]
+
+            macd_ok = macd[t] == macd[t]
+            macd_obs += macd_ok
+            signal = _ewm_step(signal, macd[t], macd_ok, span_to_alpha(MACD_SIGNAL))
+            macd_signal[t] = np.where(macd_obs >= MACD_SIGNAL, signal, np.nan)
+
+            # Wilder RSI; the first bar has no change, which ta counts as zero gain and loss
+            delta = cur - prev_close
+            up = np.where(is_obs, np.where(delta > 0, delta, 0.0), np.nan)
+            down = np.where(is_obs, -np.where(delta < 0, delta, 0.0), np.nan)
+            gain = _ewm_step(gain, up, is_obs, wilder_alpha(RSI_WINDOW))
+            loss = _ewm_step(loss, down, is_obs, wilder_alpha(RSI_WINDOW))
+            rsi[t] = np.where(nobs >= RSI_WINDOW,
+                              np.where(loss == 0, 100, 100 - (100 / (1 + gain / loss))), np.nan)
+            prev_close = cur
+
+            # Windowed values over the trailing bars; NaN until a full window exists
+            if t + 1 >= HIGH_WINDOW:
+                high_max[t] = h[t + 1 - HIGH_WINDOW:t + 1].max(axis=0)
+            if t + 1 >= VOLUME_WINDOW:
+                avg_volume[t] = v[t + 1 - VOLUME_WINDOW:t + 1].mean(axis=0)
+            if t + 1 >= BOLLINGER_WINDOW:
+                window = c[t + 1 - BOLLINGER_WINDOW:t + 1]
+                mavg = window.mean(axis=0)
+                mstd = np.sqrt(((window - mavg) ** 2).mean(axis=0))
+                hband = mavg + BOLLINGER_DEV * mstd
+                lband = mavg - BOLLINGER_DEV * mstd
+                width[t] = (hband - lband) / mavg * 100
+
+    return {key: values.T for key, values in out.items()}
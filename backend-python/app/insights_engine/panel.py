@@ -0,0 +1,188 @@
+import numpy as np
+from typing import Dict, List, Optional
+
+FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+class CandlePanel:
+    """
+    Candles for many symbols held as aligned 2D arrays (symbols x bars).
+
+    Rows are right-aligned by bar position: column -1 is each symbol's most
+    recent candle and shorter histories are NaN-padded on the left, so every
+    row sees exactly the candles the per-symbol path would see.
+    """
+
+    def __init__(self, symbols: List[str], arrays: Dict[str, np.ndarray],
+                 lengths: np.ndarray, last_ts: List[Optional[str]], ts: Optional[np.ndarray] = None):
+        self.symbols = symbols
+        self.open = arrays['open']
+        self.high = arrays['high']
+        self.low = arrays['low']
+        self.close = arrays['close']
+        self.volume = arrays['volume']
+        self.lengths = lengths
+        self.last_ts = last_ts
+        self.ts = ts
+
+    @property
+    def shape(self):
+        return self.close.shape
+
+    def __len__(self):
+        return len(self.symbols)
+
+    @classmethod
+    def from_candles(cls, candles_by_symbol: Dict[str, List[dict]], bars: int = 100) -> 'CandlePanel':
+        """Build a panel from chronologically ordered candle rows per symbol"""
+        symbols = list(candles_by_symbol.keys())
+        arrays = {field: np.full((len(symbols), bars), np.nan) for field in FIELDS}
+        lengths = np.zeros(len(symbols), dtype=np.int64)
+        last_ts = []
+        ts = np.full((len(symbols), bars), None, dtype=object)
+
+        for i, symbol in enumerate(symbols):
+            rows = sorted(candles_by_symbol[symbol], key=lambda c: c['ts'])[-bars:]
+            n = len(rows)
+            lengths[i] = n
+            last_ts.append(rows[-1]['ts'] if rows else None)
+            if not n:
+                continue
+            ts[i, bars - n:] = [row['ts'] for row in rows]
+            for field in FIELDS:
+                arrays[field][i, bars - n:] = np.array([row[field] for row in rows], dtype=np.float64)
+
+        return cls(symbols, arrays, lengths, last_ts, ts)
+
+    @classmethod
+    def from_frame(cls, symbol: str, df) -> 'CandlePanel':
+        """Build a single-row panel from one symbol's sorted candle DataFrame"""
+        arrays = {field: df[field].to_numpy(dtype=np.float64).reshape(1, -1) for field in FIELDS}
+        ts = df['ts'].to_numpy(dtype=object).reshape(1, -1)
+        last_ts = [df['ts'].iloc[-1] if len(df) else None]
+        return cls([symbol], arrays, np.array([len(df)], dtype=np.int64), last_ts, ts)
+
+def span_to_alpha(span: int) -> float:
+    """Smoothing factor for a span, derived the same way pandas does"""
+    com = (span - 1) / 2.0
+    return 1.0 / (1.0 + com)
+
+def wilder_alpha(window: int) -> float:
+    """Smoothing factor 1/window, round-tripped through pandas' centre of mass"""
+    com = 1.0 / (1.0 / window) - 1.0
+    return 1.0 / (1.0 + com)
+
+def ewm_mean(values: np.ndarray, alpha: float, min_periods: int = 0) -> np.ndarray:
+    """
+    Row-wise exponential moving average (adjust=False) over a 2D array.
+
+    Mirrors pandas' recursion step for step so results match
+    `Series.ewm(..., adjust=False).mean()` exactly. Leading NaNs are skipped
+    and do not count towards `min_periods`.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    out = np.empty_like(values)
+    weighted = np.full(values.shape[0], np.nan)
+    nobs = np.zeros(values.shape[0], dtype=np.int64)
+    old_wt = 1.0 - alpha
+
+    with np.errstate(invalid='ignore'):
+        for t in range(values.shape[1]):
+            cur = values[:, t]
+            is_obs = cur == cur
+            nobs += is_obs
+
+            started = weighted == weighted
+            step = (old_wt * weighted + alpha * cur) / (old_wt + alpha)
+            update = started & is_obs & (weighted != cur)
+            weighted = np.where(update, step, weighted)
+            weighted = np.where(~started & is_obs, cur, weighted)
+
+            out[:, t] = np.where(nobs >= max(min_periods, 1), weighted, np.nan)
+
+    return out
+
+def shift(values: np.ndarray, periods: int = 1) -> np.ndarray:
+    """Shift along the bar axis, filling vacated columns with NaN"""
+    out = np.full_like(values, np.nan)
+    if periods >= 0:
+        out[:, periods:] = values[:, :values.shape[1] - periods]
+    else:
+        out[:, :periods] = values[:, -periods:]
+    return out
+
+def diff(values: np.ndarray) -> np.ndarray:
+    """First difference along the bar axis, NaN in the first column"""
+    out = np.full_like(values, np.nan)
+    out[:, 1:] = values[:, 1:] - values[:, :-1]
+    return out
+
+def _sliding(values: np.ndarray, window: int, extreme) -> np.ndarray:
+    """
+    Van Herk/Gil-Werman sliding extreme: O(n) per row whatever the window.
+
+    Returns an array of shape (rows, n - window + 1) whose column i covers
+    values[:, i:i + window]. NaNs propagate only into windows containing them.
+    """
+    rows, n = values.shape
+    blocks = -(-n // window)
+    padded = np.full((rows, blocks, window), np.nan)
+    padded.reshape(rows, -1)[:, :n] = values
+
+    # Running extreme from each block's start (prefix) and towards its end (suffix)
+    prefix = padded.copy()
+    suffix = padded.copy()
+    for k in range(1, window):
+        extreme(prefix[:, :, k - 1], prefix[:, :, k], out=prefix[:, :, k])
+        extreme(suffix[:, :, window - k], suffix[:, :, window - k - 1], out=suffix[:, :, window - k - 1])
+
+    count = n - window + 1
+    return extreme(suffix.reshape(rows, -1)[:, :count], prefix.reshape(rows, -1)[:, window - 1:window - 1 + count])
+
+def sliding_max(values: np.ndarray, window: int) -> np.ndarray:
+    """Maximum of every full window, indexed by window start"""
+    return _sliding(values, window, np.maximum)
+
+def sliding_min(values: np.ndarray, window: int) -> np.ndarray:
+    """Minimum of every full window, indexed by window start"""
+    return _sliding(values, window, np.minimum)
+
+def rolling_max(values: np.ndarray, window: int) -> np.ndarray:
+    """Rolling maximum; NaN until a full window of observations exists"""
+    out = np.full_like(values, np.nan)
+    if values.shape[1] >= window:
+        out[:, window - 1:] = sliding_max(values, window)
+    return out
+
+def rolling_min(values: np.ndarray, window: int) -> np.ndarray:
+    """Rolling minimum; NaN until a full window of observations exists"""
+    out = np.full_like(values, np.nan)
+    if values.shape[1] >= window:
+        out[:, window - 1:] = sliding_min(values, window)
+    return out
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """Rolling mean; NaN until a full window of observations exists"""
+    out = np.full_like(values, np.nan)
+    if values.shape[1] >= window:
+        windows = np.lib.stride_tricks.sliding_window_view(values, window, axis=1)
+        out[:, window - 1:] = windows.mean(axis=-1)
+    return out
+
+def rsi(close: np.ndarray, window: int = 14) -> np.ndarray:
+    """Wilder RSI over each row, matching `ta.momentum.RSIIndicator`"""
+    observed = ~np.isnan(close)
+    delta = diff(close)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        up = np.where(observed, np.where(delta > 0, delta, 0.0), np.nan)
+        down = np.where(observed, -np.where(delta < 0, delta, 0.0), np.nan)
+
+        emaup = ewm_mean(up, wilder_alpha(window), min_periods=window)
+        emadn = ewm_mean(down, wilder_alpha(window), min_periods=window)
+
+        relative_strength = emaup / emadn
+        return np.where(emadn == 0, 100, 100 - (100 / (1 + relative_strength)))
+
+def ema(close: np.ndarray, window: int) -> np.ndarray:
+    """EMA over each row, matching `ta.trend.EMAIndicator`"""
+    return ewm_mean(close, span_to_alpha(window), min_periods=window)
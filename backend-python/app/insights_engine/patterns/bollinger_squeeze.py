@@ -0,0 +1,61 @@
+import numpy as np
+from typing import Optional, Dict, List
+
+from .. import panel as pnl
+from ..features import FeatureStore
+from ..state import IndicatorState
+
+FEATURES = ['bollinger_width(20,2)']
+
+# A squeeze is the narrowest band width of this many bars
+SQUEEZE_LOOKBACK = 50
+MIN_BARS = 20 + SQUEEZE_LOOKBACK - 1
+
+# Signals with no direction; the backtest counts them apart from BUY/SELL
+NEUTRAL_SIGNALS = ("BOLLINGER_SQUEEZE",)
+
+def run_panel(features: FeatureStore, meta: dict) -> List[Optional[Dict]]:
+    """Evaluate the squeeze rule for every symbol in a candle panel at once"""
+    panel = features.panel
+    width = features.get('bollinger_width(20,2)')
+    narrowest = pnl.rolling_min(width, SQUEEZE_LOOKBACK)[:, -1]
+    widest = pnl.rolling_max(width, SQUEEZE_LOOKBACK)[:, -1]
+    latest_close = features.get('close')[:, -1]
+
+    results = [None] * len(panel)
+    with np.errstate(invalid='ignore'):
+        hits = (panel.lengths >= MIN_BARS) & (width[:, -1] <= narrowest)
+    for i in np.flatnonzero(hits):
+        results[i] = signal(width[i, -1], narrowest[i], widest[i], latest_close[i])
+
+    return results
+
+def run_signals(features: FeatureStore, meta: dict) -> Dict[str, np.ndarray]:
+    """Squeeze rule at every bar: 1 where band width hits its 50-bar low (no direction), 0 otherwise"""
+    width = features.get('bollinger_width(20,2)')
+
+    with np.errstate(invalid='ignore'):
+        hits = (features.get('bars') >= MIN_BARS) & (width <= pnl.rolling_min(width, SQUEEZE_LOOKBACK))
+
+    return {"BOLLINGER_SQUEEZE": hits.astype(np.int8)}
+
+def run_state(state: IndicatorState, meta: dict) -> Optional[Dict]:
+    """The squeeze compares against 50 bars of band width, which indicator state does not keep"""
+    return None
+
+def signal(width: float, narrowest: float, widest: float, latest_close: float) -> Optional[Dict]:
+    """Build the squeeze insight when the latest band width is the narrowest of the lookback"""
+    if width <= narrowest:
+        return {
+            "insight_type": "BOLLINGER_SQUEEZE",
+            "signal_type": "NEUTRAL",  # A squeeze precedes a move but not its direction
+            "price": latest_close,
+            "score": 1 - width / widest if widest > 0 else 0.0,  # Tighter vs recent range scores higher
+            "attributes": {
+                "bandwidth_pct": width,
+                "widest_bandwidth_pct": widest,
+                "lookback": SQUEEZE_LOOKBACK
+            }
+        }
+
+    return None
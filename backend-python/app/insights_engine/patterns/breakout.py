@@ -1,48 +1,81 @@
-import pandas as pd
 import numpy as np
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 
-def run(df: pd.DataFrame, symbol: str, meta: dict) -> Optional[Dict]:
-    """
-    Breakout pattern detection
-    Identifies when price breaks above resistance with volume confirmation
-    """
-    if len(df) < 20:
-        return None
+from .. import panel as pnl
+from ..features import FeatureStore
+from ..state import IndicatorState
+
+FEATURES = ['rolling_max(high,20)', 'rolling_mean(volume,20)']
+
+def run_panel(features: FeatureStore, meta: dict) -> List[Optional[Dict]]:
+    """Evaluate the breakout rule for every symbol in a candle panel at once"""
+    panel = features.panel
+    resistance = features.get('rolling_max(high,20)')
+    avg_volume = features.get('rolling_mean(volume,20)')
+    
+    resistance_level = resistance[:, -2]  # Use previous resistance
+    high = features.get('high')[:, -1]
+    close = features.get('close')[:, -1]
+    volume = features.get('volume')[:, -1]
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        hits = (panel.lengths >= 20) & ~np.isnan(resistance[:, -1]) & ~np.isnan(avg_volume[:, -1]) & \
+               (high > resistance_level) & \
+               (volume / avg_volume[:, -1] > 1.5) & \
+               (close / high > 0.95)
+    
+    results = [None] * len(panel)
+    for i in np.flatnonzero(hits):
+        results[i] = signal(resistance_level[i], high[i], close[i], volume[i], avg_volume[i, -1])
     
-    # Calculate 20-period high (resistance)
-    df['resistance'] = df['high'].rolling(window=20).max()
-    df['avg_volume'] = df['volume'].rolling(window=20).mean()
+    return results
+
+def run_signals(features: FeatureStore, meta: dict) -> Dict[str, np.ndarray]:
+    """Breakout rule at every bar: +1 on a confirmed breakout, 0 otherwise"""
+    resistance_level = pnl.shift(features.get('rolling_max(high,20)'))  # Use previous resistance
+    avg_volume = features.get('rolling_mean(volume,20)')
+    high = features.get('high')
     
-    latest = df.iloc[-1]
-    prev = df.iloc[-2]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        hits = (features.get('bars') >= 20) & \
+               (high > resistance_level) & \
+               (features.get('volume') / avg_volume > 1.5) & \
+               (features.get('close') / high > 0.95)
     
-    if pd.isna(latest['resistance']) or pd.isna(latest['avg_volume']):
+    return {"BREAKOUT": hits.astype(np.int8)}
+
+def run_state(state: IndicatorState, meta: dict) -> Optional[Dict]:
+    """Evaluate the breakout rule from incrementally maintained indicator state"""
+    if state.resistance is None or state.avg_volume is None or state.prev_resistance is None:
         return None
     
+    return signal(state.prev_resistance, state.highs[-1], state.last_close,
+                  state.volumes[-1], state.avg_volume)
+
+def signal(resistance_level: float, high: float, close: float, volume: float,
+           avg_volume: float) -> Optional[Dict]:
+    """Build the breakout insight for the latest bar, if it qualifies"""
+    volume_multiplier = volume / avg_volume
+    close_to_high_ratio = close / high
+    
     # Check for breakout conditions
     # 1. Current high breaks above resistance
     # 2. Volume is above average
     # 3. Close is near high (strong close)
-    
-    resistance_level = prev['resistance']  # Use previous resistance
-    volume_multiplier = latest['volume'] / latest['avg_volume']
-    close_to_high_ratio = latest['close'] / latest['high']
-    
-    if (latest['high'] > resistance_level and 
+    if (high > resistance_level and 
         volume_multiplier > 1.5 and  # Volume 50% above average
         close_to_high_ratio > 0.95):  # Close within 5% of high
         
-        breakout_strength = min((latest['high'] - resistance_level) / resistance_level * 100, 5.0)
+        breakout_strength = min((high - resistance_level) / resistance_level * 100, 5.0)
         
         return {
             "insight_type": "BREAKOUT",
             "signal_type": "BUY",
-            "price": latest['close'],
+            "price": close,
             "score": min(breakout_strength / 5.0 + volume_multiplier / 3.0, 1.0),
             "attributes": {
                 "resistance_level": resistance_level,
-                "breakout_price": latest['high'],
+                "breakout_price": high,
                 "volume_multiplier": volume_multiplier,
                 "breakout_strength_pct": breakout_strength,
                 "close_to_high_ratio": close_to_high_ratio
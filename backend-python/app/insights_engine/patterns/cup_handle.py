@@ -0,0 +1,212 @@
+import numpy as np
+from typing import Optional, Dict, List
+
+from .. import panel as pnl
+from ..features import FeatureStore
+from ..state import IndicatorState
+
+FEATURES = ['bars']
+
+# Cup lengths searched in the same pass, in bars
+CUP_LENGTHS = (20, 30, 45, 60, 90)
+HANDLE_LENGTH = 10
+HANDLE_RATIO = 0.3       # Handle depth at most 30% of cup depth
+MIN_CUP_DEPTH = 0.1      # Cup at least 10% below its left rim
+RIM_TOLERANCE = 0.05     # Rims within 5% of each other
+
+def scan(close: np.ndarray, cup_lengths=CUP_LENGTHS, handle_length: int = HANDLE_LENGTH,
+         handle_ratio: float = HANDLE_RATIO) -> Dict[str, np.ndarray]:
+    """
+    Find every cup-and-handle formation in a (symbols x bars) close array.
+
+    Window minima and maxima come from linear-time sliding extremes, so each
+    cup length costs O(bars) per symbol instead of re-slicing every window.
+    The criteria are those of the original script: a cup of L bars falling at
+    least 10% below its left rim with rims within 5% of each other, followed
+    by a handle of up to `handle_length` bars (at least 3) no deeper than
+    `handle_ratio` of the cup.
+
+    Returns parallel arrays, one entry per formation.
+    """
+    rows, n = close.shape
+    found = {key: [] for key in ('row', 'cup_start', 'cup_length', 'handle_length', 'cup_low',
+                                 'cup_depth', 'handle_high', 'handle_depth', 'rim_gap')}
+
+    if n >= 3:
+        # Handle extremes: full windows where they fit, the remaining tail otherwise
+        tail_max = np.maximum.accumulate(close[:, ::-1], axis=1)[:, ::-1]
+        tail_min = np.minimum.accumulate(close[:, ::-1], axis=1)[:, ::-1]
+        window = min(handle_length, n)
+        handle_max = np.concatenate([pnl.sliding_max(close, window)[:, :n - window], tail_max[:, n - window:]], axis=1)
+        handle_min = np.concatenate([pnl.sliding_min(close, window)[:, :n - window], tail_min[:, n - window:]], axis=1)
+
+    for length in cup_lengths:
+        if n < length + 5:
+            continue
+
+        count = n - length - 2  # The handle needs at least 3 bars
+        starts = np.arange(count)
+        ends = starts + length
+
+        cup_low = pnl.sliding_min(close, length)[:, :count]
+        rim_left = close[:, :count]
+        rim_right = close[:, length - 1:length - 1 + count]
+        cup_depth = np.maximum(rim_left, rim_right) - cup_low
+        rim_gap = np.abs(rim_left - rim_right)
+
+        handle_high = handle_max[:, ends]
+        handle_depth = handle_high - handle_min[:, ends]
+
+        with np.errstate(invalid='ignore'):
+            ok = (cup_depth >= MIN_CUP_DEPTH * rim_left) & \
+                 (rim_gap <= RIM_TOLERANCE * rim_left) & \
+                 (handle_depth <= handle_ratio * cup_depth)
+
+        row, start = np.nonzero(ok)
+        found['row'].append(row)
+        found['cup_start'].append(start)
+        found['cup_length'].append(np.full(len(row), length))
+        found['handle_length'].append(np.minimum(handle_length, n - (start + length)))
+        found['cup_low'].append(cup_low[row, start])
+        found['cup_depth'].append(cup_depth[row, start])
+        found['handle_high'].append(handle_high[row, start])
+        found['handle_depth'].append(handle_depth[row, start])
+        found['rim_gap'].append(rim_gap[row, start] / rim_left[row, start])
+
+    formations = {
+        key: np.concatenate(parts) if parts else np.array([])
+        for key, parts in found.items()
+    }
+    formations['score'] = score(formations, handle_ratio)
+    return formations
+
+def score(formations: Dict[str, np.ndarray], handle_ratio: float = HANDLE_RATIO) -> np.ndarray:
+    """Score formations in [0, 1] by rim match, handle shallowness and cup depth"""
+    if not len(formations['row']):
+        return np.array([])
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rim_match = 1 - formations['rim_gap'] / RIM_TOLERANCE
+        shallowness = np.where(formations['cup_depth'] > 0,
+                               1 - formations['handle_depth'] / (handle_ratio * formations['cup_depth']), 0)
+        rim = formations['cup_low'] + formations['cup_depth']
+        depth = np.clip(formations['cup_depth'] / rim / 0.35, 0, 1)
+
+    return np.clip((rim_match + shallowness + depth) / 3, 0, 1)
+
+def formation_dict(formations: Dict[str, np.ndarray], i: int, offset: int = 0) -> Dict:
+    """Describe formation i; `offset` shifts bar positions (e.g. panel padding)"""
+    cup_start = int(formations['cup_start'][i]) - offset
+    cup_end = cup_start + int(formations['cup_length'][i])
+    handle_depth = float(formations['handle_depth'][i])
+    cup_depth = float(formations['cup_depth'][i])
+
+    return {
+        "pattern": "Cup and Handle",
+        "cup_start": cup_start,
+        "cup_end": cup_end,
+        "handle_start": cup_end,
+        "handle_end": cup_end + int(formations['handle_length'][i]),
+        "cup_length": int(formations['cup_length'][i]),
+        "cup_depth": round(cup_depth, 2),
+        "handle_depth": round(handle_depth, 2),
+        "cup_low": round(float(formations['cup_low'][i]), 2),
+        "breakout_level": round(float(formations['handle_high'][i]), 2),
+        "confidence": "High" if handle_depth < 0.15 * cup_depth else "Medium",
+        "score": float(formations['score'][i])
+    }
+
+def detect_cup_and_handle(prices, cup_lengths=CUP_LENGTHS, handle_length: int = HANDLE_LENGTH,
+                          handle_ratio: float = HANDLE_RATIO) -> List[Dict]:
+    """Every cup-and-handle formation in a price series, best score first"""
+    close = np.asarray(prices, dtype=np.float64).reshape(1, -1)
+    formations = scan(close, cup_lengths, handle_length, handle_ratio)
+    order = np.argsort(-formations['score'], kind='stable')
+    return [formation_dict(formations, i) for i in order]
+
+def run_panel(features: FeatureStore, meta: dict) -> List[Optional[Dict]]:
+    """Evaluate the cup-and-handle rule for every symbol in a candle panel at once"""
+    panel = features.panel
+    close = features.get('close')
+    formations = scan(close)
+    n = close.shape[1]
+
+    results = [None] * len(panel)
+    rows = formations['row']
+    # Padding makes every row look n bars long; keep cups that fit the symbol's real history
+    fits = formations['cup_length'] + 5 <= panel.lengths[rows]
+    for i in np.unique(rows[fits]):
+        results[i] = _latest_signal(formations, np.flatnonzero((rows == i) & fits), n,
+                                    n - int(panel.lengths[i]), close[i, -1])
+    return results
+
+def run_signals(features: FeatureStore, meta: dict) -> Dict[str, np.ndarray]:
+    """
+    Cup-and-handle rule at every bar: +1 where a formation's handle ends on that bar.
+    
+    At bar t the live formations are those whose handle of 3..HANDLE_LENGTH
+    bars ends at t, so each (cup length, handle length) pair is one shifted,
+    whole-panel comparison.
+    """
+    close = features.get('close')
+    bars = features.get('bars')
+    rows, n = close.shape
+    hits = np.zeros((rows, n), dtype=bool)
+    handle_depths = {
+        handle: pnl.sliding_max(close, handle) - pnl.sliding_min(close, handle)
+        for handle in range(3, min(HANDLE_LENGTH, n) + 1)
+    }
+    
+    for length in CUP_LENGTHS:
+        if n < length + 3:
+            continue
+        cup_low = pnl.sliding_min(close, length)
+        
+        for handle, depths in handle_depths.items():
+            t = np.arange(length + handle - 1, n)
+            if not len(t):
+                continue
+            cup_start = t - handle + 1 - length
+            cup_end = cup_start + length
+            
+            rim_left = close[:, cup_start]
+            rim_right = close[:, cup_end - 1]
+            cup_depth = np.maximum(rim_left, rim_right) - cup_low[:, cup_start]
+            handle_depth = depths[:, cup_end]
+            
+            with np.errstate(invalid='ignore'):
+                hits[:, t] |= (bars[:, t] >= length + 5) & \
+                              (cup_depth >= MIN_CUP_DEPTH * rim_left) & \
+                              (np.abs(rim_left - rim_right) <= RIM_TOLERANCE * rim_left) & \
+                              (handle_depth <= HANDLE_RATIO * cup_depth)
+    
+    return {"CUP_HANDLE": hits.astype(np.int8)}
+
+def run_state(state: IndicatorState, meta: dict) -> Optional[Dict]:
+    """Formations span months of bars, which indicator state does not keep"""
+    return None
+
+def _latest_signal(formations: Dict[str, np.ndarray], candidates: np.ndarray, n: int,
+                   offset: int, latest_close: float) -> Optional[Dict]:
+    """Build the insight from the best formation whose handle ends on the latest bar"""
+    live = candidates[
+        formations['cup_start'][candidates] + formations['cup_length'][candidates] +
+        formations['handle_length'][candidates] == n
+    ]
+    if not len(live):
+        return None
+
+    best = live[np.argmax(formations['score'][live])]
+    formation = formation_dict(formations, best, offset)
+
+    return {
+        "insight_type": "CUP_HANDLE",
+        "signal_type": "BUY",
+        "price": latest_close,
+        "score": formation['score'],
+        "attributes": {
+            **formation,
+            "formations_found": int(len(candidates)),
+            "distance_to_breakout_pct": (formation['breakout_level'] - latest_close) / latest_close * 100
+        }
+    }
@@ -0,0 +1,164 @@
+import math
+from dataclasses import dataclass, field, asdict
+from typing import Dict, List, Optional
+
+from .panel import span_to_alpha, wilder_alpha
+
+STATE_VERSION = 2
+
+# Bars kept for the breakout rule: a 20-bar window plus the bar before it
+HIGH_BUFFER = 21
+VOLUME_BUFFER = 20
+
+def ewm_step(weighted: Optional[float], cur: float, alpha: float) -> float:
+    """One adjust=False EWM step, written exactly as pandas computes it"""
+    if weighted is None:
+        return cur
+    if weighted != cur:
+        old_wt = 1.0 - alpha
+        return (old_wt * weighted + alpha * cur) / (old_wt + alpha)
+    return weighted
+
+@dataclass
+class IndicatorState:
+    """
+    Recursive indicator state for one symbol as of its latest processed bar.
+
+    Advancing by one bar costs O(1): EMAs and Wilder averages are updated
+    recursively and the breakout windows are short ring buffers.
+    """
+    symbol: str
+    as_of: Optional[str] = None
+    bars: int = 0
+    last_close: Optional[float] = None
+    ema_12: Optional[float] = None
+    ema_26: Optional[float] = None
+    prev_ema_12: Optional[float] = None
+    prev_ema_26: Optional[float] = None
+    macd_signal: Optional[float] = None
+    prev_macd_signal: Optional[float] = None
+    avg_gain: Optional[float] = None
+    avg_loss: Optional[float] = None
+    highs: List[float] = field(default_factory=list)
+    volumes: List[float] = field(default_factory=list)
+    version: int = STATE_VERSION
+
+    def advance(self, candle: dict) -> 'IndicatorState':
+        """Fold one new candle into the state"""
+        close = float(candle['close'])
+
+        # The first bar has no change, which ta counts as zero gain and loss
+        change = close - self.last_close if self.last_close is not None else 0.0
+        self.avg_gain = ewm_step(self.avg_gain, change if change > 0 else 0.0, wilder_alpha(14))
+        self.avg_loss = ewm_step(self.avg_loss, -change if change < 0 else 0.0, wilder_alpha(14))
+
+        self.prev_ema_12, self.prev_ema_26 = self.ema_12, self.ema_26
+        self.ema_12 = ewm_step(self.ema_12, close, span_to_alpha(12))
+        self.ema_26 = ewm_step(self.ema_26, close, span_to_alpha(26))
+
+        # The MACD line starts once EMA(26) has warmed up; its signal line is EMA(9) of it
+        if self.bars + 1 >= 26:
+            self.prev_macd_signal = self.macd_signal
+            self.macd_signal = ewm_step(self.macd_signal, self.ema_12 - self.ema_26, span_to_alpha(9))
+
+        self.highs = (self.highs + [float(candle['high'])])[-HIGH_BUFFER:]
+        self.volumes = (self.volumes + [float(candle['volume'])])[-VOLUME_BUFFER:]
+
+        self.last_close = close
+        self.as_of = candle['ts']
+        self.bars += 1
+        return self
+
+    @classmethod
+    def from_candles(cls, symbol: str, candles: List[dict]) -> 'IndicatorState':
+        """Full recompute from chronologically ordered candles"""
+        state = cls(symbol)
+        for candle in candles:
+            state.advance(candle)
+        return state
+
+    @property
+    def rsi(self) -> Optional[float]:
+        if self.bars < 14:
+            return None
+        if self.avg_loss == 0:
+            return 100.0
+        return 100 - (100 / (1 + self.avg_gain / self.avg_loss))
+
+    def ema(self, window: int, previous: bool = False) -> Optional[float]:
+        """EMA(12) or EMA(26), or None while it is still warming up"""
+        needed = window + 1 if previous else window
+        if self.bars < needed:
+            return None
+        if window == 12:
+            return self.prev_ema_12 if previous else self.ema_12
+        return self.prev_ema_26 if previous else self.ema_26
+
+    def macd(self, previous: bool = False) -> Optional[float]:
+        """MACD line (EMA(12) - EMA(26)), or None while it is still warming up"""
+        if self.bars < (27 if previous else 26):
+            return None
+        if previous:
+            return self.prev_ema_12 - self.prev_ema_26
+        return self.ema_12 - self.ema_26
+
+    def signal_line(self, previous: bool = False) -> Optional[float]:
+        """MACD signal line (EMA(9) of the MACD line), or None while it is still warming up"""
+        if self.bars < (35 if previous else 34):
+            return None
+        return self.prev_macd_signal if previous else self.macd_signal
+
+    @property
+    def resistance(self) -> Optional[float]:
+        """Highest high of the last 20 bars"""
+        return max(self.highs[-20:]) if len(self.highs) >= 20 else None
+
+    @property
+    def prev_resistance(self) -> Optional[float]:
+        """Highest high of the 20 bars before the latest one"""
+        return max(self.highs[:-1]) if len(self.highs) >= HIGH_BUFFER else None
+
+    @property
+    def avg_volume(self) -> Optional[float]:
+        return sum(self.volumes) / len(self.volumes) if len(self.volumes) >= VOLUME_BUFFER else None
+
+    def matches(self, candles: List[dict]) -> bool:
+        """Check that already-processed candles still agree with the stored buffers"""
+        seen = [c for c in candles if c['ts'] <= self.as_of]
+        if not seen or seen[-1]['ts'] != self.as_of:
+            return False
+        if not math.isclose(float(seen[-1]['close']), self.last_close, rel_tol=1e-12):
+            return False
+
+        for offset, candle in enumerate(reversed(seen), start=1):
+            if offset <= len(self.highs) and \
+                    not math.isclose(float(candle['high']), self.highs[-offset], rel_tol=1e-12):
+                return False
+            if offset <= len(self.volumes) and \
+                    not math.isclose(float(candle['volume']), self.volumes[-offset], rel_tol=1e-12):
+                return False
+        return True
+
+    def catch_up(self, candles: List[dict]) -> bool:
+        """
+        Advance through any candles newer than as_of.
+
+        Returns False, leaving the state untouched, when the recent candles no
+        longer line up with it (a gap, a backfill or a corrected bar); the
+        caller should then recompute from full history.
+        """
+        if self.as_of is None or not self.matches(candles):
+            return False
+        for candle in candles:
+            if candle['ts'] > self.as_of:
+                self.advance(candle)
+        return True
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> Optional['IndicatorState']:
+        if data.get('version') != STATE_VERSION:
+            return None
+        return cls(**data)
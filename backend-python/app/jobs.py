@@ -0,0 +1,381 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+
+JOBS_DB = os.getenv(
+    "JOBS_DB", os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "jobs.sqlite3")
+)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+
+# A job interrupted by a restart is requeued until it has been started this often
+MAX_ATTEMPTS = 3
+
+# Seconds between queue polls when idle, and between progress writes
+POLL_INTERVAL = 2.0
+PROGRESS_INTERVAL = 1.0
+
+# Running jobs are touched every HEARTBEAT_INTERVAL seconds; one silent for
+# STALE_AFTER seconds belonged to a process that died and is recovered
+HEARTBEAT_INTERVAL = 10.0
+STALE_AFTER = 60.0
+
+SCHEMA = """
+create table if not exists jobs (
+  id text primary key,
+  kind text not null,
+  params text not null,
+  status text not null,
+  progress real default 0,
+  message text,
+  result text,
+  error text,
+  attempts integer default 0,
+  cancel_requested integer default 0,
+  created_at text not null,
+  started_at text,
+  finished_at text,
+  updated_at text
+);
+create index if not exists idx_jobs_status on jobs(status, created_at);
+"""
+
+ACTIVE = ('queued', 'running')
+
+class JobCancelled(Exception):
+    """Raised inside a job once cancellation has been requested"""
+
+Handler = Callable[[Dict, 'JobContext'], Awaitable[Optional[Dict]]]
+JOB_HANDLERS: Dict[str, Handler] = {}
+
+def job_handler(kind: str):
+    """Register an async handler(params, job) for a job kind"""
+    def register(handler: Handler) -> Handler:
+        JOB_HANDLERS[kind] = handler
+        return handler
+    return register
+
+async def in_thread(fn: Callable[..., Awaitable], *args, **kwargs):
+    """
+    Await a coroutine function whose body blocks (synchronous fetches,
+    queries and sleeps) on its own event loop in an executor thread, so the
+    API's loop keeps serving requests and heartbeats while it runs. A
+    cancelled job's thread stops at its next JobContext.update().
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, lambda: asyncio.run(fn(*args, **kwargs)))
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec='milliseconds')
+
+class JobContext:
+    """
+    Handed to a running job. update() records progress (throttled to one
+    write per PROGRESS_INTERVAL) and raises JobCancelled once the job has
+    been cancelled, so any loop that reports progress is a cancellation
+    point. It is safe to call from executor threads, which is where
+    handlers run their blocking work (see in_thread).
+    """
+
+    def __init__(self, queue: 'JobQueue', job_id: str):
+        self.queue = queue
+        self.id = job_id
+        self.cancelled = threading.Event()
+        self.cancel_requested = False
+        self._last_write = 0.0
+
+    def update(self, done: int, total: int, message: Optional[str] = None):
+        if self.cancelled.is_set():
+            raise JobCancelled(self.id)
+        now = time.monotonic()
+        if now - self._last_write >= PROGRESS_INTERVAL or done >= total:
+            self._last_write = now
+            if self.queue.set_progress(self.id, done / total if total else 1.0,
+                                       message or f"{done}/{total}"):
+                self.cancel_requested = True
+                self.cancelled.set()
+                raise JobCancelled(self.id)
+
+class JobQueue:
+    """
+    SQLite-backed job queue with an asyncio worker pool.
+
+    Jobs are rows in a local SQLite database, so the queue and every job's
+    status, progress and timing survive restarts. Workers claim the oldest
+    queued job, run its registered handler as a task and store the result
+    or error. Cancelling a queued job drops it; cancelling a running job
+    cancels its task and trips its context so executor threads stop at their
+    next progress update. Jobs left running by a dead process are requeued
+    once their heartbeat goes stale; the handlers resume from their own
+    checkpoints.
+    """
+
+    def __init__(self, path: str = JOBS_DB):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._db() as conn:
+            conn.execute("pragma journal_mode=wal")
+            conn.executescript(SCHEMA)
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._contexts: Dict[str, JobContext] = {}
+        self._workers: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+
+    @contextmanager
+    def _db(self):
+        """A short-lived autocommit connection; an open transaction rolls back on error"""
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict:
+        job = dict(row)
+        job['params'] = json.loads(job['params'])
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        job['cancel_requested'] = bool(job['cancel_requested'])
+        started = datetime.fromisoformat(job['started_at']) if job['started_at'] else None
+        finished = datetime.fromisoformat(job['finished_at']) if job['finished_at'] else None
+        created = datetime.fromisoformat(job['created_at'])
+        job['queued_seconds'] = ((started or datetime.now(timezone.utc)) - created).total_seconds()
+        job['run_seconds'] = ((finished or datetime.now(timezone.utc)) - started).total_seconds() if started else None
+        return job
+
+    def enqueue(self, kind: str, params: Optional[Dict] = None) -> Dict:
+        """
+        Queue a job, or return the queued or running job with the same kind
+        and params instead of starting a duplicate.
+        """
+        if kind not in JOB_HANDLERS:
+            raise ValueError(f"Unknown job kind: {kind}")
+        encoded = json.dumps(params or {}, sort_keys=True)
+
+        with self._db() as conn:
+            conn.execute("begin immediate")
+            row = conn.execute(
+                "select * from jobs where kind = ? and params = ? and status in (?, ?) order by created_at limit 1",
+                (kind, encoded, *ACTIVE)
+            ).fetchone()
+            if row is None:
+                job_id = uuid.uuid4().hex
+                now = _now()
+                conn.execute(
+                    "insert into jobs (id, kind, params, status, created_at, updated_at) values (?, ?, ?, 'queued', ?, ?)",
+                    (job_id, kind, encoded, now, now)
+                )
+                row = conn.execute("select * from jobs where id = ?", (job_id,)).fetchone()
+                duplicate = False
+            else:
+                duplicate = True
+            conn.execute("commit")
+
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return {**self._to_dict(row), 'duplicate': duplicate}
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._db() as conn:
+            row = conn.execute("select * from jobs where id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def list(self, status: Optional[str] = None, kind: Optional[str] = None, limit: int = 50) -> List[Dict]:
+        clauses, args = [], []
+        if status:
+            clauses.append("status = ?")
+            args.append(status)
+        if kind:
+            clauses.append("kind = ?")
+            args.append(kind)
+        where = f"where {' and '.join(clauses)}" if clauses else ""
+        with self._db() as conn:
+            rows = conn.execute(f"select * from jobs {where} order by created_at desc limit ?", (*args, limit)).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def cancel(self, job_id: str) -> Optional[Dict]:
+        """Cancel a queued job at once, or ask a running one to stop"""
+        with self._db() as conn:
+            conn.execute("begin immediate")
+            conn.execute(
+                "update jobs set status = 'cancelled', finished_at = ?, updated_at = ? where id = ? and status = 'queued'",
+                (_now(), _now(), job_id)
+            )
+            conn.execute("update jobs set cancel_requested = 1, updated_at = ? where id = ? and status = 'running'",
+                         (_now(), job_id))
+            conn.execute("commit")
+
+        context = self._contexts.get(job_id)
+        if context is not None:
+            context.cancel_requested = True
+            context.cancelled.set()
+        task = self._tasks.get(job_id)
+        if task is not None:
+            task.cancel()
+        return self.get(job_id)
+
+    def set_progress(self, job_id: str, progress: float, message: Optional[str] = None) -> bool:
+        """Store progress; returns True if the job has been asked to cancel"""
+        with self._db() as conn:
+            conn.execute("update jobs set progress = ?, message = ?, updated_at = ? where id = ?",
+                         (min(max(progress, 0.0), 1.0), message, _now(), job_id))
+            row = conn.execute("select cancel_requested from jobs where id = ?", (job_id,)).fetchone()
+        return bool(row and row['cancel_requested'])
+
+    def _claim(self) -> Optional[Dict]:
+        """Mark the oldest queued job running and return it"""
+        with self._db() as conn:
+            conn.execute("begin immediate")
+            row = conn.execute(
+                "select * from jobs where status = 'queued' order by created_at limit 1"
+            ).fetchone()
+            if row is not None:
+                now = _now()
+                conn.execute(
+                    "update jobs set status = 'running', attempts = attempts + 1, started_at = ?, "
+                    "finished_at = null, updated_at = ? where id = ?",
+                    (now, now, row['id'])
+                )
+                row = conn.execute("select * from jobs where id = ?", (row['id'],)).fetchone()
+            conn.execute("commit")
+        return self._to_dict(row) if row else None
+
+    def _finish(self, job_id: str, status: str, result: Optional[Dict] = None, error: Optional[str] = None):
+        now = _now()
+        with self._db() as conn:
+            conn.execute(
+                "update jobs set status = ?, result = ?, error = ?, finished_at = ?, updated_at = ?, "
+                "progress = case when ? = 'succeeded' then 1.0 else progress end where id = ?",
+                (status, json.dumps(result, default=str) if result is not None else None, error, now, now,
+                 status, job_id)
+            )
+
+    def _requeue(self, job_id: str, message: str):
+        with self._db() as conn:
+            conn.execute("update jobs set status = 'queued', message = ?, updated_at = ? where id = ?",
+                         (message, _now(), job_id))
+
+    def _heartbeat(self, job_id: str):
+        with self._db() as conn:
+            conn.execute("update jobs set updated_at = ? where id = ?", (_now(), job_id))
+
+    def recover(self, stale_after: float = STALE_AFTER) -> int:
+        """
+        Requeue running jobs whose process has stopped heartbeating; those
+        already started MAX_ATTEMPTS times fail, and those with a pending
+        cancel are cancelled.
+        """
+        now = _now()
+        cutoff = (datetime.now(timezone.utc) - timedelta(seconds=stale_after)).isoformat(timespec='milliseconds')
+        stale = "status = 'running' and updated_at < ?"
+        with self._db() as conn:
+            conn.execute("begin immediate")
+            conn.execute(
+                f"update jobs set status = 'cancelled', finished_at = ?, updated_at = ? where {stale} and cancel_requested = 1",
+                (now, now, cutoff)
+            )
+            conn.execute(
+                f"update jobs set status = 'failed', error = ?, finished_at = ?, updated_at = ? where {stale} and attempts >= ?",
+                (f"Interrupted {MAX_ATTEMPTS} times", now, now, cutoff, MAX_ATTEMPTS)
+            )
+            requeued = conn.execute(
+                f"update jobs set status = 'queued', message = 'Requeued after interruption', updated_at = ? where {stale}",
+                (now, cutoff)
+            ).rowcount
+            conn.execute("commit")
+        if requeued:
+            print(f"Requeued {requeued} interrupted jobs")
+        return requeued
+
+    async def _run(self, job: Dict):
+        context = JobContext(self, job['id'])
+        task = asyncio.create_task(JOB_HANDLERS[job['kind']](job['params'], context))
+        self._tasks[job['id']] = task
+        self._contexts[job['id']] = context
+        loop = asyncio.get_running_loop()
+
+        async def heartbeat():
+            while True:
+                await asyncio.sleep(HEARTBEAT_INTERVAL)
+                await loop.run_in_executor(None, self._heartbeat, job['id'])
+
+        beat = asyncio.create_task(heartbeat())
+        started = time.perf_counter()
+        try:
+            result = await task
+            self._finish(job['id'], 'succeeded', result)
+            status = 'succeeded'
+        except (asyncio.CancelledError, JobCancelled):
+            if self._stopping and not context.cancel_requested:
+                # Shutdown rather than a cancel request: run it again on the next start
+                self._requeue(job['id'], "Requeued at shutdown")
+                status = 'requeued'
+            else:
+                self._finish(job['id'], 'cancelled')
+                status = 'cancelled'
+            if self._stopping:
+                raise
+        except Exception as e:
+            self._finish(job['id'], 'failed', error=str(e))
+            status = 'failed'
+        finally:
+            beat.cancel()
+            context.cancelled.set()
+            self._tasks.pop(job['id'], None)
+            self._contexts.pop(job['id'], None)
+        print(f"Job {job['id']} ({job['kind']}) {status} in {time.perf_counter() - started:.1f}s")
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while not self._stopping:
+            job = await loop.run_in_executor(None, self._claim)
+            if job is None:
+                await loop.run_in_executor(None, self.recover)
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            if job['kind'] not in JOB_HANDLERS:
+                self._finish(job['id'], 'failed', error=f"No handler for job kind {job['kind']}")
+                continue
+            await self._run(job)
+
+    async def start(self, workers: int = JOB_WORKERS):
+        """Start the worker tasks on the running loop; idle workers also recover interrupted jobs"""
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(workers)]
+        print(f"Job queue started: {workers} workers")
+
+    async def stop(self):
+        """Stop the workers; jobs still running are requeued for the next start"""
+        self._stopping = True
+        for context in list(self._contexts.values()):
+            context.cancelled.set()
+        for task in list(self._tasks.values()):
+            task.cancel()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+_job_queue: Optional[JobQueue] = None
+
+def get_job_queue() -> JobQueue:
+    """Get job queue singleton"""
+    global _job_queue
+
+    if _job_queue is None:
+        _job_queue = JobQueue()
+
+    return _job_queue
@@ -0,0 +1,317 @@
+import os
+import json
+import math
+import time
+import bisect
+import threading
+from datetime import date
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from .supabase_client import count_scores_for_date, get_latest_scores, get_scores_for_date, on_write
+
+LEADERBOARD_SNAPSHOT = os.getenv(
+    "LEADERBOARD_SNAPSHOT", os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "leaderboard.json")
+)
+
+# Most recent score dates kept in memory and in the snapshot
+LEADERBOARD_DAYS = int(os.getenv("LEADERBOARD_DAYS", "30"))
+
+# Writes are batched into one snapshot save at most this often, the last of
+# them once writes go quiet (and on shutdown)
+SAVE_INTERVAL = 5.0
+
+SNAPSHOT_VERSION = 1
+SIDES = ('bullish', 'bearish')
+MAX_LIMIT = 500
+
+# Board holding every symbol, whatever its sector
+ALL_SECTORS = '*'
+
+class DayBoard:
+    """
+    One date's combined scores as (score, symbol) lists kept sorted
+    ascending by insort: one over every symbol and one per sector. Bullish
+    stocks are read from the top down to the first score <= 0, bearish ones
+    from the bottom up to the first score >= 0, so a page of k costs a
+    binary search plus k.
+    """
+
+    def __init__(self):
+        self.entries: Dict[str, Tuple[float, Optional[str]]] = {}
+        self.ranked: Dict[str, List[Tuple[float, str]]] = {ALL_SECTORS: []}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _boards(self, sector: Optional[str]) -> List[List[Tuple[float, str]]]:
+        keys = [ALL_SECTORS, sector] if sector else [ALL_SECTORS]
+        return [self.ranked.setdefault(key, []) for key in keys]
+
+    def set(self, symbol: str, score: Optional[float], sector: Optional[str] = None) -> bool:
+        """Place or move a symbol; a missing score removes it. False when nothing changed"""
+        if score is not None:
+            score = None if math.isnan(score) else float(score)
+        old = self.entries.get(symbol)
+        if old == (score, sector) or (old is None and score is None):
+            return False
+        if old is not None:
+            for ranked in self._boards(old[1]):
+                del ranked[bisect.bisect_left(ranked, (old[0], symbol))]
+            del self.entries[symbol]
+        if score is not None:
+            self.entries[symbol] = (score, sector)
+            for ranked in self._boards(sector):
+                bisect.insort(ranked, (score, symbol))
+        return True
+
+    @classmethod
+    def from_entries(cls, entries: Dict[str, Tuple[float, Optional[str]]]) -> 'DayBoard':
+        """A board from a snapshot, sorted once instead of inserted one by one"""
+        board = cls()
+        board.entries = {symbol: (float(score), sector) for symbol, (score, sector) in entries.items()}
+        for symbol, (score, sector) in board.entries.items():
+            for ranked in board._boards(sector):
+                ranked.append((score, symbol))
+        for ranked in board.ranked.values():
+            ranked.sort()
+        return board
+
+    def extend(self, rows: Iterable[dict], sectors: Dict[str, Optional[str]]) -> int:
+        return sum(self.set(row['symbol'], row.get('combined_score'), sectors.get(row['symbol'])) for row in rows)
+
+    def top(self, side: str = 'bullish', sector: Optional[str] = None, limit: int = 50) -> Tuple[int, List[dict]]:
+        """How many symbols are on a side, and the first `limit` of them, strongest first"""
+        ranked = self.ranked.get(sector or ALL_SECTORS, [])
+        if side == 'bullish':
+            first = bisect.bisect_right(ranked, 0.0, key=lambda entry: entry[0])
+            count = len(ranked) - first
+            picked = reversed(ranked[max(first, len(ranked) - limit):])
+        else:
+            count = bisect.bisect_left(ranked, 0.0, key=lambda entry: entry[0])
+            picked = ranked[:min(count, limit)]
+        return count, [
+            {'rank': rank, 'symbol': symbol, 'score': score, 'sector': self.entries[symbol][1]}
+            for rank, (score, symbol) in enumerate(picked, 1)
+        ]
+
+    def sectors(self) -> List[str]:
+        return sorted(key for key, ranked in self.ranked.items() if key != ALL_SECTORS and ranked)
+
+def default_sectors(symbols: Iterable[str]) -> Dict[str, Optional[str]]:
+    """Sectors from the in-memory screener"""
+    from .screener import get_screener
+    return get_screener().sectors(symbols)
+
+class Leaderboard:
+    """
+    Daily combined-score leaderboards for the last LEADERBOARD_DAYS dates.
+
+    Kept current by a write hook on stock_daily_scores, so every scanner
+    mode updates it as its scores are upserted. Dates not held in memory
+    are read from the database on request. The boards are snapshotted to
+    LEADERBOARD_SNAPSHOT and restored on start; a restored date is checked
+    against the database's row count the first time it is read, and
+    re-read if the snapshot missed writes.
+    """
+
+    def __init__(self, path: str = LEADERBOARD_SNAPSHOT, days: int = LEADERBOARD_DAYS,
+                 sectors: Callable[[Iterable[str]], Dict[str, Optional[str]]] = default_sectors,
+                 save_interval: float = SAVE_INTERVAL,
+                 counts: Callable[[str], int] = count_scores_for_date):
+        self.path = path
+        self.max_days = days
+        self.save_interval = save_interval
+        self._sectors = sectors
+        self._counts = counts
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self.days: Dict[str, DayBoard] = {}
+        self._fetched = set()
+        self._restored = set()
+        self._dirty = False
+        self._saved_at = time.monotonic()
+        self._save_timer: Optional[threading.Timer] = None
+        self.stats = {'updated': 0, 'saves': 0, 'fetched_dates': 0, 'stale_restored': 0}
+        self.load()
+        on_write('stock_daily_scores', self.update)
+
+    def _sectors_of(self, symbols: List[str]) -> Dict[str, Optional[str]]:
+        try:
+            return self._sectors(symbols)
+        except Exception as e:
+            print(f"Leaderboard sector lookup failed: {e}")
+            return {}
+
+    def _apply(self, rows: List[dict]) -> int:
+        sectors = self._sectors_of(list({row['symbol'] for row in rows}))
+        by_date: Dict[str, List[dict]] = {}
+        for row in rows:
+            by_date.setdefault(str(row['date']), []).append(row)
+        changed = 0
+        with self._lock:
+            for score_date, day_rows in by_date.items():
+                changed += self.days.setdefault(score_date, DayBoard()).extend(day_rows, sectors)
+            for stale in sorted(self.days, reverse=True)[self.max_days:]:
+                del self.days[stale]
+                self._fetched.discard(stale)
+                self._restored.discard(stale)
+            if changed:
+                self._dirty = True
+            self.stats['updated'] += changed
+        return changed
+
+    def update(self, rows: list):
+        """
+        Write hook: apply upserted stock_daily_scores rows and save when due.
+        Otherwise a timer saves once the interval has passed, so the last
+        writes of a scan reach the snapshot without waiting for another.
+        """
+        rows = [row for row in rows if row.get('symbol') and row.get('date')]
+        if not rows or not self._apply(rows):
+            return
+        wait = self.save_interval - (time.monotonic() - self._saved_at)
+        if wait <= 0:
+            self.save()
+        else:
+            self._schedule_save(wait)
+
+    def _schedule_save(self, delay: float):
+        if math.isinf(delay):
+            return
+        with self._lock:
+            if self._save_timer is not None:
+                return
+            self._save_timer = threading.Timer(delay, self._timed_save)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def _timed_save(self):
+        with self._lock:
+            self._save_timer = None
+        self.save()
+
+    def _check_restored(self, score_date: str):
+        """Re-read a restored date whose row count no longer matches the database"""
+        try:
+            count = self._counts(score_date)
+        except Exception as e:
+            print(f"Leaderboard count check for {score_date} failed: {e}")
+            return
+        with self._lock:
+            self._restored.discard(score_date)
+            held = len(self.days.get(score_date) or ())
+        if count == held:
+            return
+
+        print(f"Leaderboard snapshot held {held} of {count} scores for {score_date}, re-reading it")
+        rows = get_scores_for_date(score_date)
+        board = DayBoard()
+        board.extend(rows, self._sectors_of([row['symbol'] for row in rows]))
+        with self._lock:
+            if score_date in self.days:
+                self.days[score_date] = board
+                self._fetched.add(score_date)
+                self._dirty = True
+        self.stats['stale_restored'] += 1
+
+    def board(self, score_date: Optional[str] = None) -> Tuple[Optional[str], Optional[DayBoard]]:
+        """A date's board (the latest by default), read from the database if not held"""
+        with self._lock:
+            if score_date is None and self.days:
+                score_date = max(self.days)
+            restored = score_date in self._restored
+
+        if restored:
+            self._check_restored(score_date)
+        with self._lock:
+            if score_date in self.days or score_date in self._fetched:
+                return score_date, self.days.get(score_date)
+
+        rows = get_scores_for_date(score_date) if score_date else get_latest_scores()
+        if score_date is None:
+            if not rows:
+                return None, None
+            score_date = str(rows[0]['date'])
+        self.stats['fetched_dates'] += 1
+
+        with self._lock:
+            retained = len(self.days) < self.max_days or score_date > min(self.days)
+        if not retained:
+            # Older than every date kept: serve it without displacing them
+            board = DayBoard()
+            board.extend(rows, self._sectors_of([row['symbol'] for row in rows]))
+            return score_date, board
+
+        self._apply(rows)
+        with self._lock:
+            self._fetched.add(score_date)
+            return score_date, self.days.get(score_date)
+
+    def top(self, score_date: Optional[str] = None, side: str = 'bullish', sector: Optional[str] = None,
+            limit: int = 50) -> Dict:
+        if side not in SIDES:
+            raise ValueError(f"side must be one of {', '.join(SIDES)}")
+        if score_date is not None:
+            score_date = date.fromisoformat(score_date).isoformat()
+        score_date, board = self.board(score_date)
+        limit = max(1, min(limit, MAX_LIMIT))
+        with self._lock:
+            count, rows = board.top(side, sector, limit) if board is not None else (0, [])
+            sectors = board.sectors() if board is not None else []
+        return {'date': score_date, 'side': side, 'sector': sector, 'count': count, 'rows': rows, 'sectors': sectors}
+
+    def load(self):
+        """Restore the boards from the last snapshot, if any"""
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get('version') != SNAPSHOT_VERSION:
+            return
+        with self._lock:
+            for score_date, entries in data['days'].items():
+                self.days[score_date] = DayBoard.from_entries(entries)
+                self._restored.add(score_date)
+        print(f"Leaderboard restored {len(self.days)} dates from {self.path}")
+
+    def save(self):
+        """Write a snapshot if anything changed since the last one"""
+        with self._save_lock:
+            with self._lock:
+                if self._save_timer is not None:
+                    self._save_timer.cancel()
+                    self._save_timer = None
+                if not self._dirty:
+                    return
+                days = {score_date: dict(board.entries) for score_date, board in self.days.items()}
+                self._dirty = False
+                self._saved_at = time.monotonic()
+            body = json.dumps({'version': SNAPSHOT_VERSION, 'days': days}, separators=(',', ':'))
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = f"{self.path}.tmp"
+            with open(tmp, 'w') as f:
+                f.write(body)
+            os.replace(tmp, self.path)
+            self.stats['saves'] += 1
+
+    def summary(self) -> Dict:
+        with self._lock:
+            return {
+                'dates': {score_date: len(board) for score_date, board in sorted(self.days.items(), reverse=True)},
+                'snapshot': self.path,
+                'pending_save': self._dirty,
+                'unchecked_restored': sorted(self._restored),
+                **self.stats
+            }
+
+_leaderboard: Optional[Leaderboard] = None
+
+def get_leaderboard() -> Leaderboard:
+    """Get leaderboard singleton"""
+    global _leaderboard
+
+    if _leaderboard is None:
+        _leaderboard = Leaderboard()
+
+    return _leaderboard
@@ -1,16 +1,42 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File
+from fastapi import FastAPI, HTTPException, UploadFile, File, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from typing import Optional, List
 import pandas as pd
 from datetime import date, datetime
 import os
+import asyncio
+import functools
 from dotenv import load_dotenv
 
-from .supabase_client import get_supabase_client
+from .supabase_client import get_supabase_client, get_fundamentals_page
 from .models import StockScore, Insight, Signal
-from .ingest import ingest_daily_data
-from .scanner import run_insights_for_symbol
-from .fundamentals import load_equity_list_and_fetch_fundamentals
+from .ingest import ingest_daily_data, ingest_concurrent, INGEST_CONCURRENCY
+from .scanner import (
+    run_insights_for_symbol,
+    run_insights_serial,
+    run_insights_panel,
+    run_insights_incremental
+)
+from .parallel_scanner import run_insights_parallel
+from .fundamentals import (
+    fundamentals_columns, encode_cursor, decode_cursor, stream_fundamentals,
+    FUNDAMENTALS_PAGE_SIZE, MAX_PAGE_SIZE
+)
+from .fundamentals_loader import FUNDAMENTALS_WORKERS
+from .fundamentals_refresh import refresh_fundamentals, ttl_fields
+from .jobs import get_job_queue, job_handler, in_thread, JobContext, JOB_WORKERS
+from .market_feed import (
+    ShoonyaFeed, ReplayFeed, SyntheticFeed, tick_file,
+    get_quote_stream, start_quote_stream, stop_quote_stream
+)
+from .backtest import run_backtest
+from .metadata_cache import get_metadata_cache
+from .http_pool import http_stats
+from .ohlc_cache import cached_ohlc, ohlc_response, get_ohlc_cache, LAYOUTS
+from .screener import get_screener
+from .leaderboard import get_leaderboard
+from .db import run_db, fetch, db_stats
 
 load_dotenv()
 
@@ -24,37 +50,50 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+async def start_job_workers():
+    await get_job_queue().start(JOB_WORKERS)
+    asyncio.get_running_loop().run_in_executor(None, get_screener().warm)
+    get_leaderboard()
+
+@app.on_event("shutdown")
+async def stop_job_workers():
+    await get_job_queue().stop()
+    stop_quote_stream()
+    get_leaderboard().save()
+
+def enqueue_job(kind: str, params: dict) -> dict:
+    """Queue a background job and describe it for the caller"""
+    job = get_job_queue().enqueue(kind, params)
+    return {
+        "job_id": job['id'],
+        "status": job['status'],
+        "duplicate": job['duplicate'],
+        "status_url": f"/api/jobs/{job['id']}"
+    }
+
+def screened_symbols() -> List[str]:
+    supabase = get_supabase_client()
+    result = supabase.table('screened_stocks').select('symbol').execute()
+    return [row['symbol'] for row in result.data]
+
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "timestamp": datetime.now()}
 
 @app.get("/api/ohlc")
-async def get_ohlc(symbol: str, from_date: Optional[str] = None, to_date: Optional[str] = None):
-    """Get OHLC data for lightweight charts"""
-    supabase = get_supabase_client()
-    
-    query = supabase.table('daily_candles').select('*').eq('symbol', symbol)
-    
-    if from_date:
-        query = query.gte('ts', from_date)
-    if to_date:
-        query = query.lte('ts', to_date)
-    
-    result = query.order('ts').execute()
-    
-    # Format for lightweight charts
-    data = []
-    for row in result.data:
-        data.append({
-            'time': row['ts'],
-            'open': row['open'],
-            'high': row['high'],
-            'low': row['low'],
-            'close': row['close'],
-            'volume': row['volume']
-        })
+async def get_ohlc(request: Request, symbol: str, from_date: Optional[str] = None, to_date: Optional[str] = None,
+                   source: str = "auto", layout: str = "rows"):
+    """
+    Get OHLC data for lightweight charts; 'auto' reads the local candle store when it has the symbol.
+    layout=columns returns parallel time/open/high/low/close/volume arrays. Responses are cached
+    and carry an ETag; a matching If-None-Match gets 304.
+    """
+    if layout not in LAYOUTS:
+        raise HTTPException(status_code=400, detail=f"Unknown layout: {layout}")
     
-    return data
+    entry = await run_db(cached_ohlc, symbol, from_date, to_date, source, layout)
+    return ohlc_response(entry, request.headers.get('if-none-match'))
 
 @app.get("/api/insights")
 async def get_insights(symbol: str, date: Optional[str] = None):
@@ -70,8 +109,7 @@ async def get_insights(symbol: str, date: Optional[str] = None):
     if date:
         query = query.eq('detected_on', date)
     
-    result = query.order('detected_on', desc=True).execute()
-    return result.data
+    return await fetch(query.order('detected_on', desc=True))
 
 @app.get("/api/signals")
 async def get_signals(since: Optional[str] = None, limit: int = 50):
@@ -86,8 +124,7 @@ async def get_signals(since: Optional[str] = None, limit: int = 50):
     if since:
         query = query.gte('detected_on', since)
     
-    result = query.order('detected_on', desc=True).limit(limit).execute()
-    return result.data
+    return await fetch(query.order('detected_on', desc=True).limit(limit))
 
 @app.get("/api/stock_score")
 async def get_stock_score(symbol: str, date: Optional[str] = None):
@@ -96,12 +133,56 @@ async def get_stock_score(symbol: str, date: Optional[str] = None):
         date = datetime.now().date().isoformat()
     
     supabase = get_supabase_client()
-    result = supabase.table('stock_daily_scores').select('*').eq('symbol', symbol).eq('date', date).execute()
+    rows = await fetch(supabase.table('stock_daily_scores').select('*').eq('symbol', symbol).eq('date', date))
     
-    if not result.data:
+    if not rows:
         raise HTTPException(status_code=404, detail="Score not found")
     
-    return result.data[0]
+    return rows[0]
+
+@app.get("/api/stock/{symbol}")
+async def stock_detail(symbol: str, limit: int = 20):
+    """
+    Everything the stock page shows in one call: listing, fundamentals, latest score,
+    recent insights and signals. The five queries run concurrently.
+    """
+    supabase = get_supabase_client()
+    stock, fundamentals, scores, insights, signals = await asyncio.gather(
+        fetch(supabase.table('screened_stocks').select('*').eq('symbol', symbol)),
+        fetch(supabase.table('fundamentals').select('*').eq('symbol', symbol)),
+        fetch(supabase.table('stock_daily_scores').select('*').eq('symbol', symbol)
+              .order('date', desc=True).limit(1)),
+        fetch(supabase.table('insights').select('*, insight_types(code, name, category)').eq('symbol', symbol)
+              .order('detected_on', desc=True).limit(limit)),
+        fetch(supabase.table('detected_signals').select('*').eq('symbol', symbol)
+              .order('detected_on', desc=True).limit(limit))
+    )
+    
+    if not stock and not fundamentals:
+        raise HTTPException(status_code=404, detail=f"Unknown symbol: {symbol}")
+    
+    return {
+        "symbol": symbol,
+        "stock": stock[0] if stock else None,
+        "fundamentals": fundamentals[0] if fundamentals else None,
+        "score": scores[0] if scores else None,
+        "insights": insights,
+        "signals": signals
+    }
+
+@app.get("/api/leaderboard")
+async def leaderboard(date: Optional[str] = None, sector: Optional[str] = None, side: str = "bullish",
+                      limit: int = 50):
+    """Top combined scores of a day (the latest by default), bullish highest first or bearish lowest first"""
+    try:
+        return await run_db(get_leaderboard().top, date, side, sector, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/leaderboard/status")
+async def leaderboard_status():
+    """Symbols held per date and snapshot saves of the leaderboard"""
+    return get_leaderboard().summary()
 
 @app.post("/api/upload-screened")
 async def upload_screened_stocks(file: UploadFile = File(...)):
@@ -126,70 +207,287 @@ async def upload_screened_stocks(file: UploadFile = File(...)):
             'meta': {}
         })
     
-    result = supabase.table('screened_stocks').upsert(stocks).execute()
+    result = await run_db(supabase.table('screened_stocks').upsert(stocks).execute)
+    get_metadata_cache().invalidate('stock_meta')
     return {"message": f"Uploaded {len(stocks)} stocks", "count": len(stocks)}
 
 @app.post("/api/trigger_backfill")
-async def trigger_backfill(symbol: Optional[str] = None):
-    """Trigger data backfill for symbol(s)"""
+async def trigger_backfill(symbol: Optional[str] = None, mode: str = "serial",
+                           concurrency: Optional[int] = None):
+    """Queue a data backfill job for symbol(s); mode is 'serial' or 'concurrent'"""
+    if mode not in ("serial", "concurrent"):
+        raise HTTPException(status_code=400, detail=f"Unknown mode: {mode}")
     try:
-        if symbol:
-            await ingest_daily_data([symbol])
-            return {"message": f"Backfill triggered for {symbol}"}
-        else:
-            # Get all screened stocks
-            supabase = get_supabase_client()
-            result = supabase.table('screened_stocks').select('symbol').execute()
-            symbols = [row['symbol'] for row in result.data]
-            
-            await ingest_daily_data(symbols)
-            return {"message": f"Backfill triggered for {len(symbols)} symbols"}
+        return enqueue_job("backfill", {"symbol": symbol, "mode": mode, "concurrency": concurrency})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/fundamentals")
-async def get_fundamentals(symbol: Optional[str] = None, sector: Optional[str] = None):
-    """Get fundamental data"""
-    supabase = get_supabase_client()
+@job_handler("backfill")
+async def backfill_job(params: dict, job: JobContext) -> dict:
+    symbols = [params['symbol']] if params.get('symbol') else await run_db(screened_symbols)
     
-    query = supabase.table('fundamentals').select('*')
+    if params['mode'] == "concurrent":
+        summary = await ingest_concurrent(symbols, concurrency=params.get('concurrency') or INGEST_CONCURRENCY,
+                                          progress=job.update)
+        return {"message": f"Backfill completed for {len(symbols)} symbols", **summary}
     
-    if symbol:
-        query = query.eq('symbol', symbol)
-    if sector:
-        query = query.eq('sector', sector)
+    await in_thread(ingest_daily_data, symbols, progress=job.update)
+    return {"message": f"Backfill completed for {len(symbols)} symbols"}
+
+@app.get("/api/fundamentals")
+async def get_fundamentals(request: Request, symbol: Optional[str] = None, sector: Optional[str] = None,
+                           fields: Optional[str] = None, limit: int = FUNDAMENTALS_PAGE_SIZE,
+                           after: Optional[str] = None, stream: bool = False):
+    """
+    Get fundamental data, largest market cap first, one page of `limit` rows at a time.
+    When more rows follow, X-Next-Cursor (and a rel="next" Link) gives the `after` for the next page.
+    fields= selects columns (comma separated); stream=true returns every matching row as NDJSON.
+    """
+    try:
+        columns = fundamentals_columns(fields.split(',') if fields else None)
+        cursor = decode_cursor(after) if after else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if stream:
+        return StreamingResponse(stream_fundamentals(columns, cursor, symbol, sector),
+                                 media_type='application/x-ndjson')
     
-    result = query.order('market_cap', desc=True).execute()
-    return result.data
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    rows = await run_db(get_fundamentals_page, columns, cursor, limit, symbol, sector)
+    headers = {}
+    if len(rows) == limit:
+        next_cursor = encode_cursor(rows[-1])
+        headers['X-Next-Cursor'] = next_cursor
+        headers['Link'] = f'<{request.url.include_query_params(after=next_cursor)}>; rel="next"'
+    return JSONResponse(rows, headers=headers)
+
+@app.get("/api/screen")
+async def screen(where: Optional[str] = None, sort: str = "-market_cap", limit: int = 50,
+                 fields: Optional[str] = None):
+    """
+    Screen every symbol in memory, e.g. where=pe_ratio < 20 and roe > 0.15 and sector == 'Technology'.
+    Returns the match count and the first `limit` matches by `sort` ('-' prefix for descending).
+    """
+    try:
+        return await run_db(get_screener().screen, where, sort, limit, fields.split(',') if fields else None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/api/load_fundamentals")
-async def load_fundamentals():
-    """Load EQUITY_L.csv and fetch fundamentals"""
+async def load_fundamentals(workers: int = FUNDAMENTALS_WORKERS, force: bool = False, max_symbols: Optional[int] = None,
+                            fields: Optional[str] = None, watchlist: Optional[str] = None,
+                            dry_run: bool = False):
+    """
+    Queue a fundamentals refresh for EQUITY_L.csv, fetching only rows that
+    are stale for the requested fields (comma separated; default all) or
+    have never been fetched, watchlist symbols and large caps first.
+    Symbols that failed recently are skipped until their backoff expires;
+    force refetches everything. An interrupted or capped load continues
+    with whatever is still stale on the next call; dry_run fetches through
+    a local stub and writes nothing.
+    """
     try:
-        await load_equity_list_and_fetch_fundamentals("/Users/singhxss/Desktop/Amar Personal/EQUITY_L.csv")
-        return {"message": "Fundamentals loading completed"}
+        fields = ttl_fields(fields.split(',') if fields else None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        return enqueue_job("fundamentals", {
+            "workers": workers, "force": force, "max_symbols": max_symbols, "fields": fields,
+            "watchlist": watchlist.split(',') if watchlist else None, "dry_run": dry_run
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@job_handler("fundamentals")
+async def fundamentals_job(params: dict, job: JobContext) -> dict:
+    summary = await refresh_fundamentals(
+        "/Users/singhxss/Desktop/Amar Personal/EQUITY_L.csv",
+        fields=params['fields'], watchlist=params['watchlist'], max_symbols=params['max_symbols'],
+        workers=params['workers'], force=params['force'], dry_run=params['dry_run'], progress=job.update
+    )
+    return {"message": "Fundamentals refresh completed", **summary}
+
 @app.post("/api/run_scanner")
-async def run_scanner(symbol: Optional[str] = None):
-    """Run insight scanner for symbol(s)"""
+async def run_scanner(symbol: Optional[str] = None, mode: str = "serial",
+                      workers: Optional[int] = None, chunk_size: int = 100, source: str = "db"):
+    """
+    Queue an insight scanner job for symbol(s); mode is 'serial', 'panel', 'parallel' or 'incremental'.
+    Panel mode reads candles from the local candle store with source=store.
+    """
+    if mode not in ("serial", "panel", "parallel", "incremental"):
+        raise HTTPException(status_code=400, detail=f"Unknown mode: {mode}")
     try:
-        if symbol:
-            await run_insights_for_symbol(symbol)
-            return {"message": f"Scanner completed for {symbol}"}
+        return enqueue_job("scanner", {
+            "symbol": symbol, "mode": mode, "workers": workers, "chunk_size": chunk_size, "source": source
+        })
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@job_handler("scanner")
+async def scanner_job(params: dict, job: JobContext) -> dict:
+    if params.get('symbol'):
+        await in_thread(run_insights_for_symbol, params['symbol'])
+        return {"message": f"Scanner completed for {params['symbol']}"}
+    
+    # Run for all screened stocks
+    symbols = await run_db(screened_symbols)
+    mode = params['mode']
+    
+    # Every mode but parallel blocks as it goes, so it runs off the event loop;
+    # parallel moves its own prefetch and write to executor threads
+    if mode == "panel":
+        await in_thread(run_insights_panel, symbols, source=params['source'])
+    elif mode == "incremental":
+        await in_thread(run_insights_incremental, symbols)
+    elif mode == "parallel":
+        summary = await run_insights_parallel(symbols, workers=params['workers'], chunk_size=params['chunk_size'])
+        return {"message": f"Scanner completed for {len(symbols)} symbols", **summary}
+    else:
+        await in_thread(run_insights_serial, symbols, progress=job.update)
+    
+    return {"message": f"Scanner completed for {len(symbols)} symbols"}
+
+@app.get("/api/backtest")
+async def backtest(symbol: Optional[str] = None, bars: int = 750, source: str = "db"):
+    """Backtest every insight rule over candle history for a symbol or all screened stocks"""
+    try:
+        symbols = [symbol] if symbol else await run_db(screened_symbols)
+        
+        # CPU-bound, so it runs on the default executor rather than holding a database worker
+        return await asyncio.get_running_loop().run_in_executor(
+            None, functools.partial(run_backtest, symbols, bars=bars, source=source)
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/metadata_cache")
+async def metadata_cache_stats():
+    """Hit/miss counters and table ages for the in-process metadata cache"""
+    return get_metadata_cache().summary()
+
+@app.post("/api/metadata_cache/invalidate")
+async def invalidate_metadata_cache(table: Optional[str] = None):
+    """Drop cached insight_types and/or screened_stocks metadata ('insight_types', 'stock_meta' or all)"""
+    cache = get_metadata_cache()
+    if table and table not in cache.stats:
+        raise HTTPException(status_code=400, detail=f"Unknown cache table: {table}")
+    cache.invalidate(table)
+    return {"message": f"Invalidated {table or 'all tables'}"}
+
+@app.get("/api/ohlc_cache")
+async def ohlc_cache_stats():
+    """Entries, hit rate and 304 count of the chart response cache"""
+    return get_ohlc_cache().summary()
+
+@app.get("/api/screener")
+async def screener_stats():
+    """Size, age, update and latency counters of the in-memory screener"""
+    return get_screener().summary()
+
+@app.post("/api/screener/reload")
+async def reload_screener():
+    """Drop the screener table so the next screen reloads it from the database"""
+    get_screener().invalidate()
+    return {"message": "Screener will reload on the next screen"}
+
+@app.get("/api/db_stats")
+async def database_stats():
+    """Calls, queue wait and run time of the database thread pool"""
+    return db_stats()
+
+@app.get("/api/http_stats")
+async def http_connection_stats():
+    """Requests, connection reuse and handshake time per vendor host"""
+    return http_stats()
+
+@app.get("/api/jobs")
+async def list_jobs(status: Optional[str] = None, kind: Optional[str] = None, limit: int = 50):
+    """Recent background jobs, newest first"""
+    return get_job_queue().list(status=status, kind=kind, limit=limit)
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status, progress, timing and result of a background job"""
+    job = get_job_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return job
+
+@app.post("/api/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    """Cancel a queued job, or ask a running one to stop at its next progress update"""
+    job = get_job_queue().cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return job
+
+@app.post("/api/quotes/stream")
+async def start_quotes(symbols: Optional[str] = None, feed: str = "shoonya", path: Optional[str] = None,
+                       speed: float = 1.0, ticks: int = 100000, record: Optional[str] = None):
+    """
+    Start streaming live quotes for symbols (comma separated; default all
+    screened stocks), replacing any running stream. feed is 'shoonya' (the
+    websocket feed, optionally recording ticks to a CSV), 'replay' (a
+    recorded CSV at `speed` x real time) or 'synthetic' (random-walk ticks).
+    record and path are file names under data/ticks.
+    """
+    try:
+        if feed == "shoonya":
+            transport = ShoonyaFeed(record_path=tick_file(record) if record else None)
+        elif feed == "replay":
+            if not path:
+                raise HTTPException(status_code=400, detail="Replay needs a path")
+            transport = ReplayFeed(tick_file(path), speed=speed)
+        elif feed == "synthetic":
+            transport = SyntheticFeed(ticks=ticks, speed=speed)
         else:
-            # Run for all screened stocks
-            supabase = get_supabase_client()
-            result = supabase.table('screened_stocks').select('symbol').execute()
-            
-            for row in result.data:
-                await run_insights_for_symbol(row['symbol'])
-            
-            return {"message": f"Scanner completed for {len(result.data)} symbols"}
+            raise HTTPException(status_code=400, detail=f"Unknown feed: {feed}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        loop = asyncio.get_running_loop()
+        symbol_list = symbols.split(',') if symbols else await run_db(screened_symbols)
+        stream = await loop.run_in_executor(None, start_quote_stream, symbol_list, transport)
+        return stream.summary()
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/quotes/stream")
+async def quote_stream_status():
+    """Throughput, latency and bar counts of the running quote stream"""
+    stream = get_quote_stream()
+    if stream is None:
+        raise HTTPException(status_code=404, detail="No quote stream running")
+    return stream.summary()
+
+@app.post("/api/quotes/stream/stop")
+async def stop_quotes():
+    summary = await asyncio.get_running_loop().run_in_executor(None, stop_quote_stream)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="No quote stream running")
+    return summary
+
+@app.get("/api/quotes")
+async def get_quotes(symbols: Optional[str] = None):
+    """Latest streamed quote for symbols (comma separated; default every symbol that has ticked)"""
+    stream = get_quote_stream()
+    if stream is None:
+        raise HTTPException(status_code=404, detail="No quote stream running")
+    return stream.quotes(symbols.split(',') if symbols else None)
+
+@app.get("/api/quotes/bars")
+async def get_quote_bars(symbol: str, interval: int = 5, limit: int = 100):
+    """Intraday OHLCV bars aggregated from the stream, oldest first; the last may still be open"""
+    stream = get_quote_stream()
+    if stream is None:
+        raise HTTPException(status_code=404, detail="No quote stream running")
+    try:
+        return stream.bars(symbol, interval, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
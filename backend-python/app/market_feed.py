@@ -0,0 +1,690 @@
+import os
+import csv
+import time
+import queue
+import threading
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Tick CSVs recorded from, and replayed into, streams started through the API
+TICKS_DIR = os.getenv(
+    "TICKS_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "ticks")
+)
+
+# Bar sizes aggregated from ticks, in minutes
+BAR_INTERVALS = tuple(int(m) for m in os.getenv("BAR_INTERVALS", "1,5,15").split(","))
+
+# Finished bars kept per symbol and interval, as minutes of history (one NSE session)
+BAR_HISTORY_MINUTES = int(os.getenv("BAR_HISTORY_MINUTES", "375"))
+
+# Most ticks applied in one pass of the consumer
+MAX_BATCH = 20000
+
+# A bar is closed once the feed clock is this many seconds past its end, so
+# ticks that arrive slightly out of order still land in it
+CLOSE_GRACE = 2.0
+
+# Per-tick latency samples kept for the percentiles in stats()
+LATENCY_SAMPLES = 100000
+
+# (symbol, feed time in epoch seconds, last price, cumulative day volume)
+Tick = Tuple[str, float, float, float]
+TickCallback = Callable[[str, float, float, float], None]
+
+def tick_file(name: str) -> str:
+    """Path of a tick CSV under TICKS_DIR, given a bare file name such as ticks.csv"""
+    if not name or name in ('.', '..') or os.path.basename(name) != name or (os.altsep and os.altsep in name):
+        raise ValueError(f"Tick files are named without a directory: {name!r}")
+    return os.path.join(TICKS_DIR, name)
+
+def _first_of_run(keys: np.ndarray) -> np.ndarray:
+    """True where a sorted key array starts a new run"""
+    return np.r_[True, keys[1:] != keys[:-1]] if len(keys) else np.zeros(0, dtype=bool)
+
+def _rank_in_run(keys: np.ndarray) -> np.ndarray:
+    """Position of each element within its run of equal sorted keys"""
+    positions = np.arange(len(keys))
+    return positions - np.maximum.accumulate(np.where(_first_of_run(keys), positions, 0))
+
+class QuoteTable:
+    """
+    Latest quote per symbol in one (symbols x QUOTE_FIELDS) float64 array.
+
+    Symbols get a fixed row the first time they tick; a batch of ticks is
+    applied with a few vectorized writes (last price, volume and time from
+    each symbol's last tick, session open/high/low folded in), so the table
+    costs a few hundred bytes per symbol however fast the feed.
+    """
+
+    QUOTE_FIELDS = ('ltp', 'open', 'high', 'low', 'volume', 'ts', 'ticks')
+    LTP, OPEN, HIGH, LOW, VOLUME, TS, TICKS = range(7)
+
+    def __init__(self, capacity: int = 512):
+        self.symbols: List[str] = []
+        self.rows: Dict[str, int] = {}
+        self.values = self._empty(capacity)
+
+    def _empty(self, capacity: int) -> np.ndarray:
+        values = np.full((capacity, len(self.QUOTE_FIELDS)), np.nan)
+        values[:, self.TICKS] = 0
+        return values
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def index(self, symbols: Iterable[str]) -> np.ndarray:
+        """Row numbers for symbols, adding rows (and growing the array) for new ones"""
+        rows = self.rows
+        for symbol in symbols:
+            if symbol not in rows:
+                rows[symbol] = len(self.symbols)
+                self.symbols.append(symbol)
+        if len(self.symbols) > len(self.values):
+            grown = self._empty(max(len(self.symbols), 2 * len(self.values)))
+            grown[:len(self.values)] = self.values
+            self.values = grown
+        return np.array([rows[s] for s in symbols], dtype=np.int64)
+
+    def apply(self, rows: np.ndarray, ts: np.ndarray, price: np.ndarray, volume: np.ndarray):
+        """
+        Fold a batch of ticks (in arrival order) into the table. A tick on a
+        later (UTC) day than a symbol's last one starts a new session, resetting
+        its open, high, low and tick count; ticks from an earlier day than the
+        symbol's latest are left out.
+        """
+        values = self.values
+        day = np.floor(ts / 86400)
+        stored_day = np.floor(values[rows, self.TS] / 86400)
+        if day[0] == day.min() == day.max():
+            session = np.fmax(stored_day, day)
+        else:
+            # The batch spans days: each symbol's session is its latest day
+            latest = np.full(len(values), np.nan)
+            latest[rows] = stored_day
+            np.fmax.at(latest, rows, day)
+            session = latest[rows]
+        rolled = rows[session > stored_day]
+        if len(rolled):
+            values[rolled, self.OPEN] = np.nan
+            values[rolled, self.HIGH] = np.nan
+            values[rolled, self.LOW] = np.nan
+            values[rolled, self.TICKS] = 0
+        current = day >= session
+        if not current.all():
+            rows, ts, price, volume = rows[current], ts[current], price[current], volume[current]
+
+        reversed_rows = rows[::-1]
+        symbols, last = np.unique(reversed_rows, return_index=True)
+        last = len(rows) - 1 - last
+        _, first = np.unique(rows, return_index=True)
+
+        values[symbols, self.LTP] = price[last]
+        values[symbols, self.TS] = ts[last]
+        known = ~np.isnan(volume[last])
+        values[symbols[known], self.VOLUME] = volume[last][known]
+        unopened = np.isnan(values[symbols, self.OPEN])
+        values[symbols[unopened], self.OPEN] = price[first][unopened]
+
+        high = values[:, self.HIGH]
+        low = values[:, self.LOW]
+        np.fmax.at(high, rows, price)
+        np.fmin.at(low, rows, price)
+        np.add.at(values[:, self.TICKS], rows, 1)
+
+    def quote(self, row: int) -> Dict:
+        ltp, open_, high, low, volume, ts, ticks = self.values[row].tolist()
+        return {
+            'symbol': self.symbols[row],
+            'ltp': ltp,
+            'open': open_,
+            'high': high,
+            'low': low,
+            'change_pct': round(100 * (ltp / open_ - 1), 2) if open_ else None,
+            'volume': None if volume != volume else volume,
+            'ts': datetime.fromtimestamp(ts, timezone.utc).isoformat(),
+            'ticks': int(ticks)
+        }
+
+class BarAggregator:
+    """
+    Incremental OHLCV bars of one interval for every symbol in a QuoteTable.
+
+    Each symbol has one open bar (start, open, high, low, close, volume) in
+    flat arrays; finished bars go to a per-symbol ring of `history` rows. A
+    batch of ticks is grouped by (symbol, bar start) with one lexsort and
+    reduced with reduceat, then each symbol's first group is merged into
+    its open bar and the rest close bars in order. Ticks older than a
+    symbol's open bar, or for a bar already closed, are counted as late and
+    dropped.
+    """
+
+    START, OPEN, HIGH, LOW, CLOSE, VOLUME = range(6)
+
+    def __init__(self, minutes: int, history: int, capacity: int = 512):
+        self.minutes = minutes
+        self.interval = minutes * 60.0
+        self.history = history
+        self.current = np.full((capacity, 6), np.nan)
+        self.is_open = np.zeros(capacity, dtype=bool)
+        self.ring = np.full((capacity, history, 6), np.nan)
+        self.count = np.zeros(capacity, dtype=np.int64)
+        self.stats = {'bars': 0, 'late_ticks': 0}
+
+    def _ensure(self, rows: int):
+        capacity = len(self.current)
+        if rows <= capacity:
+            return
+        capacity = max(rows, 2 * capacity)
+        current = np.full((capacity, 6), np.nan)
+        current[:len(self.current)] = self.current
+        is_open = np.zeros(capacity, dtype=bool)
+        is_open[:len(self.is_open)] = self.is_open
+        ring = np.full((capacity, self.history, 6), np.nan)
+        ring[:len(self.ring)] = self.ring
+        count = np.zeros(capacity, dtype=np.int64)
+        count[:len(self.count)] = self.count
+        self.current, self.is_open, self.ring, self.count = current, is_open, ring, count
+
+    def _push(self, rows: np.ndarray, bars: np.ndarray):
+        """Append finished bars to the rings; rows must be sorted, oldest bar first within a symbol"""
+        if not len(rows):
+            return
+        slots = (self.count[rows] + _rank_in_run(rows)) % self.history
+        self.ring[rows, slots] = bars
+        np.add.at(self.count, rows, 1)
+        self.stats['bars'] += len(rows)
+
+    def apply(self, rows: np.ndarray, ts: np.ndarray, price: np.ndarray, volume: np.ndarray, table_size: int):
+        """Fold a batch of ticks; volume is the traded quantity of each tick"""
+        self._ensure(table_size)
+        start = np.floor(ts / self.interval) * self.interval
+        current_start = self.current[rows, self.START]
+        late = (start < current_start) | ((start == current_start) & ~self.is_open[rows])
+        if late.any():
+            self.stats['late_ticks'] += int(late.sum())
+            keep = ~late
+            rows, start, price, volume = rows[keep], start[keep], price[keep], volume[keep]
+        if not len(rows):
+            return
+
+        order = np.lexsort((start, rows))
+        rows, start, price, volume = rows[order], start[order], price[order], volume[order]
+        firsts = np.flatnonzero(np.r_[True, (rows[1:] != rows[:-1]) | (start[1:] != start[:-1])])
+        lasts = np.r_[firsts[1:], len(rows)] - 1
+        groups = np.column_stack([
+            start[firsts], price[firsts],
+            np.maximum.reduceat(price, firsts), np.minimum.reduceat(price, firsts),
+            price[lasts], np.add.reduceat(volume, firsts)
+        ])
+        group_rows = rows[firsts]
+        first_of_symbol = _first_of_run(group_rows)
+        last_of_symbol = np.r_[first_of_symbol[1:], True]
+
+        # A symbol's first group may continue its open bar
+        merge = first_of_symbol & self.is_open[group_rows] & (groups[:, self.START] == self.current[group_rows, self.START])
+        merged = group_rows[merge]
+        current = self.current
+        current[merged, self.HIGH] = np.maximum(current[merged, self.HIGH], groups[merge, self.HIGH])
+        current[merged, self.LOW] = np.minimum(current[merged, self.LOW], groups[merge, self.LOW])
+        current[merged, self.CLOSE] = groups[merge, self.CLOSE]
+        current[merged, self.VOLUME] += groups[merge, self.VOLUME]
+
+        # Open bars followed by a newer group close first, then every group
+        # but a symbol's last; the last one becomes (or stays) the open bar
+        closing = first_of_symbol & self.is_open[group_rows] & (~merge | ~last_of_symbol)
+        finished = ~merge & ~last_of_symbol
+        closed_rows = np.concatenate([group_rows[closing], group_rows[finished]])
+        closed_bars = np.concatenate([current[group_rows[closing]], groups[finished]])
+        order = np.argsort(closed_rows, kind='stable')
+        self._push(closed_rows[order], closed_bars[order])
+
+        opening = ~merge & last_of_symbol
+        current[group_rows[opening]] = groups[opening]
+        self.is_open[group_rows[closing]] = False
+        self.is_open[group_rows[opening]] = True
+
+    def close_until(self, clock: float):
+        """Close every open bar that ended CLOSE_GRACE seconds before the feed clock"""
+        ended = np.flatnonzero(self.is_open & (self.current[:, self.START] + self.interval + CLOSE_GRACE <= clock))
+        self._push(ended, self.current[ended])
+        self.is_open[ended] = False
+
+    def bars(self, row: int, limit: int) -> List[Dict]:
+        """Up to `limit` most recent bars of a symbol, oldest first, the open bar last"""
+        bars = []
+        if row < len(self.count):
+            count = int(self.count[row])
+            kept = min(count, self.history)
+            slots = [(count - kept + i) % self.history for i in range(kept)]
+            bars = [(values, True) for values in self.ring[row, slots].tolist()]
+            if self.is_open[row]:
+                bars.append((self.current[row].tolist(), False))
+        return [
+            {
+                'ts': datetime.fromtimestamp(start, timezone.utc).isoformat(),
+                'open': open_,
+                'high': high,
+                'low': low,
+                'close': close,
+                'volume': volume,
+                'complete': complete
+            }
+            for (start, open_, high, low, close, volume), complete in bars[-limit:]
+        ]
+
+class FeedTransport:
+    """
+    A source of ticks. start() subscribes to symbols and calls on_tick(symbol,
+    ts, price, cumulative_volume) from any thread until stop(); `done` is set
+    when a finite source runs out.
+    """
+
+    name = 'feed'
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.emitted = 0
+
+    def start(self, symbols: Sequence[str], on_tick: TickCallback):
+        raise NotImplementedError
+
+    def stop(self):
+        self.done.set()
+
+class ShoonyaFeed(FeedTransport):
+    """
+    Shoonya websocket touchline feed. Symbols are resolved to tokens through
+    the scrip master and subscribed in one call; partial 'tf' updates are
+    completed from the last values seen per token. With record_path set,
+    the normalized ticks are also appended to a CSV that ReplayFeed reads.
+    """
+
+    name = 'shoonya'
+
+    def __init__(self, exchange: str = "NSE", record_path: Optional[str] = None):
+        super().__init__()
+        self.exchange = exchange
+        self.record_path = record_path
+        self._client = None
+        self._tokens: Dict[str, str] = {}
+        self._last: Dict[str, List[float]] = {}
+        self._on_tick: Optional[TickCallback] = None
+        self._recorder = None
+
+    def start(self, symbols: Sequence[str], on_tick: TickCallback):
+        from .ingest import ShoonyaClient
+
+        self._client = ShoonyaClient()
+        if not self._client.login():
+            raise RuntimeError("Shoonya login failed")
+        for symbol in symbols:
+            token = self._client.get_token_for_symbol(symbol, self.exchange)
+            if token:
+                self._tokens[token] = symbol
+            else:
+                print(f"No Shoonya token for {symbol}; not subscribed")
+
+        self._on_tick = on_tick
+        if self.record_path:
+            self._recorder = TickRecorder(self.record_path)
+        opened = threading.Event()
+        self._client.api.start_websocket(
+            subscribe_callback=self._on_message,
+            socket_open_callback=opened.set,
+            socket_close_callback=self.done.set
+        )
+        if not opened.wait(30):
+            raise RuntimeError("Shoonya websocket did not open")
+        self._client.api.subscribe([f"{self.exchange}|{token}" for token in self._tokens])
+        print(f"Subscribed to {len(self._tokens)} symbols on the Shoonya feed")
+
+    def _on_message(self, message: Dict):
+        if message.get('t') not in ('tk', 'tf'):
+            return
+        token = message.get('tk')
+        symbol = self._tokens.get(token)
+        if symbol is None:
+            return
+        last = self._last.setdefault(token, [np.nan, np.nan])
+        if 'lp' in message:
+            last[0] = float(message['lp'])
+        if 'v' in message:
+            last[1] = float(message['v'])
+        if last[0] != last[0]:
+            return
+        ts = float(message['ft']) if 'ft' in message else time.time()
+        self._on_tick(symbol, ts, last[0], last[1])
+        if self._recorder is not None:
+            self._recorder.write(symbol, ts, last[0], last[1])
+
+    def stop(self):
+        if self._client is not None:
+            try:
+                self._client.api.close_websocket()
+            except Exception as e:
+                print(f"Error closing Shoonya websocket: {e}")
+        if self._recorder is not None:
+            self._recorder.close()
+        super().stop()
+
+class TickRecorder:
+    """Appends normalized ticks to a ts,symbol,price,volume CSV"""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        new = not os.path.exists(path)
+        self._file = open(path, 'a', newline='')
+        self._writer = csv.writer(self._file)
+        self._lock = threading.Lock()
+        if new:
+            self._writer.writerow(['ts', 'symbol', 'price', 'volume'])
+
+    def write(self, symbol: str, ts: float, price: float, volume: float):
+        with self._lock:
+            self._writer.writerow([ts, symbol, price, '' if volume != volume else volume])
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+class _ThreadedFeed(FeedTransport):
+    """A finite feed that emits from its own thread, paced against the feed clock"""
+
+    def __init__(self, speed: float = 1.0):
+        super().__init__()
+        self.speed = speed
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def ticks(self, symbols: Sequence[str]) -> Iterable[List[Tick]]:
+        """Chunks of ticks in feed-time order"""
+        raise NotImplementedError
+
+    def start(self, symbols: Sequence[str], on_tick: TickCallback):
+        self._thread = threading.Thread(target=self._emit, args=(symbols, on_tick), daemon=True)
+        self._thread.start()
+
+    def _emit(self, symbols: Sequence[str], on_tick: TickCallback):
+        started = None
+        try:
+            for chunk in self.ticks(symbols):
+                if self._stop.is_set():
+                    break
+                if self.speed and chunk:
+                    # Sleep until wall time catches up with the chunk's feed time
+                    if started is None:
+                        started = (time.monotonic(), chunk[0][1])
+                    lag = (chunk[0][1] - started[1]) / self.speed - (time.monotonic() - started[0])
+                    if lag > 0:
+                        time.sleep(lag)
+                for tick in chunk:
+                    on_tick(*tick)
+                self.emitted += len(chunk)
+        finally:
+            self.done.set()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        super().stop()
+
+class ReplayFeed(_ThreadedFeed):
+    """
+    Replays a ts,symbol,price,volume CSV (as written by TickRecorder) at
+    `speed` x real time; speed 0 replays as fast as possible.
+    """
+
+    name = 'replay'
+
+    def __init__(self, path: str, speed: float = 1.0, chunk: int = 100):
+        super().__init__(speed)
+        self.path = path
+        self.chunk = chunk
+
+    def ticks(self, symbols: Sequence[str]) -> Iterable[List[Tick]]:
+        wanted = set(symbols)
+        chunk = []
+        with open(self.path, newline='') as f:
+            for row in csv.DictReader(f):
+                if wanted and row['symbol'] not in wanted:
+                    continue
+                volume = float(row['volume']) if row['volume'] else np.nan
+                chunk.append((row['symbol'], float(row['ts']), float(row['price']), volume))
+                if len(chunk) == self.chunk:
+                    yield chunk
+                    chunk = []
+        if chunk:
+            yield chunk
+
+class SyntheticFeed(_ThreadedFeed):
+    """
+    Random-walk ticks for offline runs and benchmarks: `ticks` ticks spread
+    over the symbols at `ticks_per_sec` of feed time (Poisson arrivals),
+    with cumulative day volume like the Shoonya feed. `speed` paces them
+    against wall time; 0 emits as fast as possible.
+    """
+
+    name = 'synthetic'
+
+    def __init__(self, ticks: int = 100000, ticks_per_sec: float = 2000.0, speed: float = 1.0,
+                 start: Optional[float] = None, seed: int = 0, chunk: int = 200):
+        super().__init__(speed)
+        self.total = ticks
+        self.ticks_per_sec = ticks_per_sec
+        self.start_ts = time.time() if start is None else start
+        self.seed = seed
+        self.chunk = chunk
+
+    def ticks(self, symbols: Sequence[str]) -> Iterable[List[Tick]]:
+        rng = np.random.default_rng(self.seed)
+        log_price = np.log(rng.uniform(50, 3000, len(symbols)))
+        volume = rng.integers(0, 100000, len(symbols)).astype(np.float64)
+        ts = self.start_ts
+
+        for offset in range(0, self.total, self.chunk):
+            n = min(self.chunk, self.total - offset)
+            rows = rng.integers(0, len(symbols), n)
+            times = ts + np.cumsum(rng.exponential(1 / self.ticks_per_sec, n))
+            ts = float(times[-1])
+
+            # Running per-symbol sums within the chunk, on top of the carried state
+            order = np.argsort(rows, kind='stable')
+            sorted_rows = rows[order]
+            steps = np.column_stack([rng.normal(0, 0.0005, n), rng.integers(1, 500, n)])[order]
+            sums = np.cumsum(steps, axis=0)
+            run_start = np.maximum.accumulate(np.where(_first_of_run(sorted_rows), np.arange(n), 0))
+            sums -= np.where(run_start[:, None] > 0, sums[run_start - 1], 0)
+            prices = np.empty(n)
+            volumes = np.empty(n)
+            prices[order] = np.round(np.exp(log_price[sorted_rows] + sums[:, 0]), 2)
+            volumes[order] = volume[sorted_rows] + sums[:, 1]
+            last = np.flatnonzero(np.r_[sorted_rows[1:] != sorted_rows[:-1], True])
+            log_price[sorted_rows[last]] += sums[last, 0]
+            volume[sorted_rows[last]] += sums[last, 1]
+
+            yield [(symbols[r], t, p, v) for r, t, p, v in zip(rows.tolist(), times.tolist(),
+                                                              prices.tolist(), volumes.tolist())]
+
+class QuoteStream:
+    """
+    Consumes a FeedTransport into a QuoteTable and one BarAggregator per
+    BAR_INTERVALS entry.
+
+    Transport callbacks only stamp each tick and put it on a queue; one
+    consumer thread drains whatever has arrived (up to MAX_BATCH ticks) and
+    applies it as a batch, so per-tick overhead stays flat when the feed
+    bursts. Cumulative day volume becomes per-tick quantity here, and the
+    feed clock (the newest tick time) closes bars of quiet symbols.
+    """
+
+    def __init__(self, transport: FeedTransport, intervals: Sequence[int] = BAR_INTERVALS,
+                 history_minutes: int = BAR_HISTORY_MINUTES):
+        self.transport = transport
+        self.table = QuoteTable()
+        self.aggregators = {m: BarAggregator(m, max(1, history_minutes // m)) for m in intervals}
+        self.clock = 0.0
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._consumer: Optional[threading.Thread] = None
+        self._latency = np.zeros(LATENCY_SAMPLES)
+        self.stats = {'ticks': 0, 'batches': 0, 'max_batch': 0, 'apply_time': 0.0}
+        self.symbols: List[str] = []
+        self.started_at: Optional[float] = None
+
+    def _on_tick(self, symbol: str, ts: float, price: float, volume: float):
+        self._queue.put((symbol, ts, price, volume, time.perf_counter()))
+
+    def start(self, symbols: Sequence[str]):
+        self.symbols = list(symbols)
+        self.started_at = time.time()
+        self._consumer = threading.Thread(target=self._consume, daemon=True)
+        self._consumer.start()
+        self.transport.start(self.symbols, self._on_tick)
+
+    def stop(self):
+        """Stop the transport, apply what it already delivered and stop consuming"""
+        self.transport.stop()
+        self._stop.set()
+        if self._consumer is not None:
+            self._consumer.join()
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """Wait for a finite transport to finish and its ticks to be applied"""
+        if not self.transport.done.wait(timeout):
+            return False
+        while self.stats['ticks'] < self.transport.emitted and self._consumer.is_alive():
+            time.sleep(0.01)
+        return True
+
+    def _consume(self):
+        while True:
+            try:
+                batch = [self._queue.get(timeout=0.2)]
+            except queue.Empty:
+                if self._stop.is_set():
+                    return
+                continue
+            try:
+                while len(batch) < MAX_BATCH:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            try:
+                self.apply(batch)
+            except Exception as e:
+                print(f"Error applying {len(batch)} ticks: {e}")
+
+    def apply(self, batch: List[tuple]):
+        """Apply (symbol, ts, price, cumulative volume, received) ticks in arrival order"""
+        started = time.perf_counter()
+        symbols, ts, price, volume, received = zip(*batch)
+        ts = np.array(ts, dtype=np.float64)
+        price = np.array(price, dtype=np.float64)
+        volume = np.array(volume, dtype=np.float64)
+
+        with self._lock:
+            rows = self.table.index(symbols)
+            traded = self._traded(rows, ts, volume)
+            self.table.apply(rows, ts, price, volume)
+            self.clock = max(self.clock, float(ts.max()))
+            for aggregator in self.aggregators.values():
+                aggregator.apply(rows, ts, price, traded, len(self.table))
+                aggregator.close_until(self.clock)
+
+            done = time.perf_counter()
+            count = self.stats['ticks']
+            slots = np.arange(count, count + len(batch)) % LATENCY_SAMPLES
+            self._latency[slots] = done - np.array(received)
+            self.stats['ticks'] += len(batch)
+            self.stats['batches'] += 1
+            self.stats['max_batch'] = max(self.stats['max_batch'], len(batch))
+            self.stats['apply_time'] += done - started
+
+    def _traded(self, rows: np.ndarray, ts: np.ndarray, volume: np.ndarray) -> np.ndarray:
+        """
+        Per-tick quantity from cumulative day volume. A lower total on a new
+        (UTC) day starts a new session; on the same day it is an out-of-order
+        update and trades nothing.
+        """
+        order = np.argsort(rows, kind='stable')
+        sorted_rows = rows[order]
+        current = volume[order]
+        day = np.floor(ts[order] / 86400)
+        previous = np.r_[np.nan, current[:-1]]
+        previous_day = np.r_[np.nan, day[:-1]]
+        first = _first_of_run(sorted_rows)
+        previous[first] = self.table.values[sorted_rows[first], QuoteTable.VOLUME]
+        previous_day[first] = np.floor(self.table.values[sorted_rows[first], QuoteTable.TS] / 86400)
+        # Unknown volume carries the previous value forward, trading nothing
+        current = np.where(np.isnan(current), previous, current)
+        traded = np.where(current >= previous, current - previous, np.where(day > previous_day, current, 0))
+        traded[np.isnan(traded)] = 0
+        result = np.empty_like(traded)
+        result[order] = traded
+        return result
+
+    def quotes(self, symbols: Optional[Iterable[str]] = None) -> List[Dict]:
+        with self._lock:
+            rows = self.table.rows
+            wanted = self.table.symbols if symbols is None else [s for s in symbols if s in rows]
+            return [self.table.quote(rows[s]) for s in wanted]
+
+    def bars(self, symbol: str, minutes: int, limit: int = 100) -> List[Dict]:
+        if minutes not in self.aggregators:
+            raise ValueError(f"No {minutes}-minute bars; intervals are {sorted(self.aggregators)}")
+        with self._lock:
+            row = self.table.rows.get(symbol)
+            return [] if row is None else self.aggregators[minutes].bars(row, limit)
+
+    def summary(self) -> Dict:
+        with self._lock:
+            ticks = self.stats['ticks']
+            latency = self._latency[:min(ticks, LATENCY_SAMPLES)] * 1000
+            elapsed = time.time() - self.started_at if self.started_at else 0.0
+            return {
+                'transport': self.transport.name,
+                'running': not self._stop.is_set() and not self.transport.done.is_set(),
+                'subscribed': len(self.symbols),
+                'symbols': len(self.table),
+                'ticks': ticks,
+                'ticks_per_sec': round(ticks / elapsed, 1) if elapsed else 0.0,
+                'batches': self.stats['batches'],
+                'max_batch': self.stats['max_batch'],
+                'apply_ticks_per_sec': round(ticks / self.stats['apply_time']) if self.stats['apply_time'] else 0,
+                'latency_ms': {
+                    'p50': round(float(np.percentile(latency, 50)), 3),
+                    'p99': round(float(np.percentile(latency, 99)), 3),
+                    'max': round(float(latency.max()), 3)
+                } if ticks else None,
+                'bars': {f"{m}m": dict(a.stats) for m, a in self.aggregators.items()},
+                'feed_clock': datetime.fromtimestamp(self.clock, timezone.utc).isoformat() if self.clock else None
+            }
+
+_quote_stream: Optional[QuoteStream] = None
+
+def get_quote_stream() -> Optional[QuoteStream]:
+    """The running quote stream, if one has been started"""
+    return _quote_stream
+
+def start_quote_stream(symbols: Sequence[str], transport: FeedTransport) -> QuoteStream:
+    """Replace any running quote stream with one on the given transport"""
+    global _quote_stream
+
+    stop_quote_stream()
+    stream = QuoteStream(transport)
+    stream.start(symbols)
+    _quote_stream = stream
+    return stream
+
+def stop_quote_stream() -> Optional[Dict]:
+    global _quote_stream
+
+    if _quote_stream is None:
+        return None
+    stream, _quote_stream = _quote_stream, None
+    stream.stop()
+    return stream.summary()
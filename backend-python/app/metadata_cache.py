@@ -0,0 +1,145 @@
+import time
+import threading
+from typing import Dict, List, Optional
+
+from .supabase_client import get_supabase_client
+
+# Default weights by category
+CATEGORY_WEIGHTS = {
+    'FORMULA': 1.0,
+    'PATTERN': 1.5,
+    'SENTIMENT': 1.2
+}
+
+DEFAULT_TTL = 300.0
+
+class MetadataCache:
+    """
+    Process-wide cache of slow-changing lookup tables.
+
+    insight_types (code -> id, code -> score weight) and the screened_stocks
+    meta/token map are each loaded with one query and reused until their TTL
+    expires or invalidate() is called. Per table, a lookup served from the
+    cached table is a hit and one that had to load it a miss; lookups of
+    keys the table does not hold are also counted as absent.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._tables: Dict[str, Dict] = {}
+        self._loaded_at: Dict[str, float] = {}
+        self.stats = {
+            name: {'hits': 0, 'misses': 0, 'absent': 0, 'loads': 0}
+            for name in ('insight_types', 'stock_meta')
+        }
+
+    def _table(self, name: str, lookup: bool = True) -> Dict:
+        """A table, loaded if missing or expired; a lookup counts as a hit or a miss"""
+        with self._lock:
+            loaded_at = self._loaded_at.get(name)
+            loaded = loaded_at is None or time.monotonic() - loaded_at > self.ttl
+            if loaded:
+                self._tables[name] = getattr(self, f'_load_{name}')()
+                self._loaded_at[name] = time.monotonic()
+                self.stats[name]['loads'] += 1
+            if lookup:
+                self.stats[name]['misses' if loaded else 'hits'] += 1
+            return self._tables[name]
+
+    def _absent(self, name: str):
+        with self._lock:
+            self.stats[name]['absent'] += 1
+
+    def _load_insight_types(self) -> Dict:
+        supabase = get_supabase_client()
+        result = supabase.table('insight_types').select('id, code, category').execute()
+        return {
+            'ids': {row['code']: row['id'] for row in result.data},
+            'weights': {row['code']: CATEGORY_WEIGHTS.get(row['category'], 1.0) for row in result.data}
+        }
+
+    def _load_stock_meta(self) -> Dict:
+        supabase = get_supabase_client()
+        meta = {}
+        offset = 0
+        while True:
+            result = supabase.table('screened_stocks')\
+                .select('symbol, meta')\
+                .order('symbol')\
+                .range(offset, offset + 999)\
+                .execute()
+            for row in result.data:
+                meta[row['symbol']] = row.get('meta') or {}
+            if len(result.data) < 1000:
+                return meta
+            offset += 1000
+
+    def insight_type_id(self, code: str) -> Optional[int]:
+        type_id = self._table('insight_types')['ids'].get(code)
+        if type_id is None:
+            self._absent('insight_types')
+        return type_id
+
+    def insight_type_ids(self) -> Dict[str, int]:
+        return dict(self._table('insight_types')['ids'])
+
+    def insight_type_weights(self) -> Dict[str, float]:
+        return dict(self._table('insight_types')['weights'])
+
+    def token(self, symbol: str) -> Optional[str]:
+        token = self._table('stock_meta').get(symbol, {}).get('token')
+        if token is None:
+            self._absent('stock_meta')
+        return token
+
+    def set_tokens(self, tokens: Dict[str, str]) -> List[dict]:
+        """
+        Record resolved tokens and return screened_stocks rows for the ones
+        that changed, ready for a single bulk upsert.
+        """
+        stock_meta = self._table('stock_meta', lookup=False)
+        changed = []
+        with self._lock:
+            for symbol, token in tokens.items():
+                meta = stock_meta.setdefault(symbol, {})
+                if meta.get('token') != token:
+                    meta['token'] = token
+                    changed.append({'symbol': symbol, 'meta': dict(meta)})
+        return changed
+
+    def warm(self, name: Optional[str] = None):
+        """Load one table, or all of them, if missing or expired"""
+        for key in ([name] if name else list(self.stats)):
+            self._table(key, lookup=False)
+
+    def invalidate(self, name: Optional[str] = None):
+        """Drop one cached table, or all of them, so the next lookup reloads"""
+        with self._lock:
+            for key in ([name] if name else list(self._loaded_at)):
+                self._loaded_at.pop(key, None)
+                self._tables.pop(key, None)
+
+    def summary(self) -> Dict:
+        now = time.monotonic()
+        return {
+            'ttl': self.ttl,
+            'tables': {
+                name: {
+                    **counts,
+                    'age': now - self._loaded_at[name] if name in self._loaded_at else None
+                }
+                for name, counts in self.stats.items()
+            }
+        }
+
+_metadata_cache: Optional[MetadataCache] = None
+
+def get_metadata_cache() -> MetadataCache:
+    """Get metadata cache singleton"""
+    global _metadata_cache
+
+    if _metadata_cache is None:
+        _metadata_cache = MetadataCache()
+
+    return _metadata_cache
@@ -0,0 +1,186 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from fastapi import Response
+
+from .insights_engine.panel import FIELDS
+from .candle_store import get_candle_store, to_dates
+from .supabase_client import get_supabase_client
+
+# Responses built from the database are rebuilt after this long even
+# without an invalidation (writes from other processes); store-backed ones
+# are checked against the symbol file on every hit
+OHLC_CACHE_TTL = float(os.getenv("OHLC_CACHE_TTL", "900"))
+
+# Encoded bodies kept, least recently used dropped first (a 3-year chart is ~100 KB)
+OHLC_CACHE_MB = float(os.getenv("OHLC_CACHE_MB", "64"))
+
+LAYOUTS = ('rows', 'columns')
+
+# symbol, from_date, to_date, source, layout
+CacheKey = Tuple[str, Optional[str], Optional[str], str, str]
+
+def _json_values(values: np.ndarray) -> list:
+    """Column values for JSON, NaN as null"""
+    missing = np.isnan(values)
+    if missing.any():
+        values = values.astype(object)
+        values[missing] = None
+    return values.tolist()
+
+def block_columns(block: np.ndarray) -> Dict[str, list]:
+    """Chart columns from a candle store (6 x n) block"""
+    columns = {'time': to_dates(block[0]).tolist()}
+    for i, field in enumerate(FIELDS):
+        columns[field] = _json_values(block[i + 1])
+    return columns
+
+def row_columns(rows: List[dict]) -> Dict[str, list]:
+    """Chart columns from daily_candles rows"""
+    df = pd.DataFrame.from_records(rows, columns=['ts', *FIELDS])
+    columns = {'time': df['ts'].astype(str).tolist()}
+    for field in FIELDS:
+        columns[field] = _json_values(df[field].to_numpy(dtype=np.float64))
+    return columns
+
+def encode_ohlc(columns: Dict[str, list], layout: str) -> bytes:
+    """
+    The response body: parallel time/open/high/low/close/volume arrays for
+    'columns', or the lightweight-charts row objects for 'rows'.
+    """
+    if layout == 'columns':
+        payload = columns
+    else:
+        keys = list(columns)
+        payload = [dict(zip(keys, values)) for values in zip(*columns.values())]
+    return json.dumps(payload, separators=(',', ':')).encode()
+
+class OHLCEntry:
+    __slots__ = ('body', 'etag', 'version', 'created')
+
+    def __init__(self, body: bytes, version: Optional[tuple]):
+        self.body = body
+        self.etag = f'"{hashlib.blake2b(body, digest_size=12).hexdigest()}"'
+        self.version = version
+        self.created = time.monotonic()
+
+class OHLCCache:
+    """
+    LRU cache of encoded /api/ohlc bodies and their ETags, keyed by
+    (symbol, from, to, source, layout).
+
+    Store-backed entries carry the symbol file's version and are dropped as
+    soon as it changes; database-backed ones live until ingest invalidates
+    the symbol or OHLC_CACHE_TTL passes.
+    """
+
+    def __init__(self, max_bytes: int = int(OHLC_CACHE_MB * 2 ** 20), ttl: float = OHLC_CACHE_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[CacheKey, OHLCEntry]' = OrderedDict()
+        self._bytes = 0
+        self.stats = {'hits': 0, 'misses': 0, 'not_modified': 0, 'invalidated': 0, 'evicted': 0}
+
+    def get(self, key: CacheKey, version: Optional[tuple] = None) -> Optional[OHLCEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry.version != version or time.monotonic() - entry.created > self.ttl):
+                self._drop(key)
+                entry = None
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return entry
+
+    def put(self, key: CacheKey, body: bytes, version: Optional[tuple] = None) -> OHLCEntry:
+        entry = OHLCEntry(body, version)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = entry
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                self._drop(next(iter(self._entries)))
+                self.stats['evicted'] += 1
+        return entry
+
+    def _drop(self, key: CacheKey):
+        self._bytes -= len(self._entries.pop(key).body)
+
+    def invalidate(self, symbol: Optional[str] = None) -> int:
+        """Drop the cached responses for a symbol, or all of them"""
+        with self._lock:
+            keys = [key for key in self._entries if symbol is None or key[0] == symbol]
+            for key in keys:
+                self._drop(key)
+            self.stats['invalidated'] += len(keys)
+        return len(keys)
+
+    def summary(self) -> Dict:
+        with self._lock:
+            lookups = self.stats['hits'] + self.stats['misses']
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'ttl': self.ttl,
+                **self.stats,
+                'hit_pct': round(100 * self.stats['hits'] / lookups, 1) if lookups else 0.0
+            }
+
+_ohlc_cache: Optional[OHLCCache] = None
+
+def get_ohlc_cache() -> OHLCCache:
+    """Get OHLC response cache singleton"""
+    global _ohlc_cache
+
+    if _ohlc_cache is None:
+        _ohlc_cache = OHLCCache()
+
+    return _ohlc_cache
+
+def cached_ohlc(symbol: str, from_date: Optional[str] = None, to_date: Optional[str] = None,
+                source: str = "auto", layout: str = "rows") -> OHLCEntry:
+    """The encoded OHLC response for a chart load, built on a cache miss"""
+    store = get_candle_store()
+    use_store = source == "store" or (source == "auto" and symbol in store)
+    key = (symbol, from_date, to_date, 'store' if use_store else 'db', layout)
+    version = store.version(symbol) if use_store else None
+
+    cache = get_ohlc_cache()
+    entry = cache.get(key, version)
+    if entry is not None:
+        return entry
+
+    if use_store:
+        block = store.block(symbol, from_date, to_date)
+        columns = block_columns(block if block is not None else np.empty((len(FIELDS) + 1, 0)))
+    else:
+        supabase = get_supabase_client()
+        query = supabase.table('daily_candles').select('ts, open, high, low, close, volume').eq('symbol', symbol)
+        if from_date:
+            query = query.gte('ts', from_date)
+        if to_date:
+            query = query.lte('ts', to_date)
+        columns = row_columns(query.order('ts').execute().data)
+
+    return cache.put(key, encode_ohlc(columns, layout), version)
+
+def ohlc_response(entry: OHLCEntry, if_none_match: Optional[str] = None) -> Response:
+    """200 with the cached body, or 304 when the client already holds this ETag"""
+    headers = {'ETag': entry.etag, 'Cache-Control': 'no-cache'}
+    if if_none_match:
+        tags = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+        if entry.etag in tags or '*' in tags:
+            get_ohlc_cache().stats['not_modified'] += 1
+            return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type='application/json', headers=headers)
@@ -0,0 +1,149 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from typing import List, Dict, Optional
+
+from .supabase_client import get_candles_for_symbol, get_candles_bulk
+from .scanner import candles_to_frame, evaluate_symbol, save_insights_batch, print_scan_stats
+
+DEFAULT_CHUNK_SIZE = 100
+
+def chunk_symbols(symbols: List[str], chunk_size: int) -> List[List[str]]:
+    """Split symbols into consecutive chunks of at most chunk_size"""
+    return [symbols[i:i + chunk_size] for i in range(0, len(symbols), chunk_size)]
+
+def scan_chunk(symbols: List[str], candles_by_symbol: Optional[Dict[str, List[dict]]] = None,
+               days: int = 100) -> Dict:
+    """
+    Worker entry point: evaluate the insight modules for a chunk of symbols.
+
+    Candles are fetched inside the worker unless they are passed in. Nothing
+    is written to the database here; the parent merges and writes once.
+    """
+    started = time.perf_counter()
+    results = {}
+    stats = {}
+    fetch_time = 0.0
+
+    for symbol in symbols:
+        if candles_by_symbol is not None:
+            candles = candles_by_symbol.get(symbol, [])
+        else:
+            fetch_started = time.perf_counter()
+            try:
+                candles = get_candles_for_symbol(symbol, days=days)
+            except Exception as e:
+                print(f"Error fetching candles for {symbol}: {e}")
+                candles = []
+            fetch_time += time.perf_counter() - fetch_started
+
+        if candles:
+            results[symbol] = evaluate_symbol(candles_to_frame(candles), symbol, stats)
+
+    return {
+        'results': results,
+        'stats': stats,
+        'worker': os.getpid(),
+        'symbols': len(symbols),
+        'fetch_time': fetch_time,
+        'elapsed': time.perf_counter() - started
+    }
+
+async def scan_parallel(symbols: List[str], workers: Optional[int] = None,
+                        chunk_size: int = DEFAULT_CHUNK_SIZE,
+                        candles_by_symbol: Optional[Dict[str, List[dict]]] = None) -> Dict:
+    """
+    Evaluate all symbols across a process pool without writing anything.
+
+    Returns the merged per-symbol results together with per-worker timings.
+    """
+    workers = workers or os.cpu_count() or 1
+    chunks = chunk_symbols(symbols, chunk_size)
+    loop = asyncio.get_running_loop()
+
+    results = {}
+    worker_stats = {}
+    module_stats = {}
+    done_symbols = 0
+    started = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = []
+        for chunk in chunks:
+            chunk_candles = None
+            if candles_by_symbol is not None:
+                chunk_candles = {s: candles_by_symbol.get(s, []) for s in chunk}
+            futures.append(loop.run_in_executor(executor, scan_chunk, chunk, chunk_candles))
+
+        for future in asyncio.as_completed(futures):
+            outcome = await future
+            results.update(outcome['results'])
+            done_symbols += outcome['symbols']
+
+            stats = worker_stats.setdefault(outcome['worker'], {
+                'chunks': 0, 'symbols': 0, 'busy_time': 0.0, 'fetch_time': 0.0
+            })
+            stats['chunks'] += 1
+            stats['symbols'] += outcome['symbols']
+            stats['busy_time'] += outcome['elapsed']
+            stats['fetch_time'] += outcome['fetch_time']
+            
+            for module_path, entry in outcome['stats'].get('modules', {}).items():
+                merged = module_stats.setdefault(module_path, {'runs': 0, 'time': 0.0})
+                merged['runs'] += entry['runs']
+                merged['time'] += entry['time']
+
+            print(f"Scanned {done_symbols}/{len(symbols)} symbols "
+                  f"({time.perf_counter() - started:.1f}s elapsed)")
+
+    return {
+        'results': results,
+        'workers': worker_stats,
+        'modules': module_stats,
+        'elapsed': time.perf_counter() - started
+    }
+
+async def run_insights_parallel(symbols: List[str], target_date: Optional[str] = None,
+                                workers: Optional[int] = None,
+                                chunk_size: int = DEFAULT_CHUNK_SIZE,
+                                prefetch: bool = True) -> Dict:
+    """
+    Scan symbols in a process pool, then write all insights and scores in one batch.
+
+    With prefetch the parent loads every symbol's candles in a few bulk
+    requests and ships them to the workers; otherwise each worker queries
+    its own symbols. The prefetch and the write block, so they run in
+    executor threads and leave the event loop free.
+    """
+    if not target_date:
+        target_date = date.today().isoformat()
+
+    print(f"Running parallel insights for {len(symbols)} symbols on {target_date} "
+          f"(workers={workers or os.cpu_count()}, chunk_size={chunk_size})")
+
+    loop = asyncio.get_running_loop()
+    candles_by_symbol = await loop.run_in_executor(None, get_candles_bulk, symbols) if prefetch else None
+    scan = await scan_parallel(symbols, workers=workers, chunk_size=chunk_size,
+                               candles_by_symbol=candles_by_symbol)
+
+    write_started = time.perf_counter()
+    written = await loop.run_in_executor(None, save_insights_batch, scan['results'], target_date)
+    write_time = time.perf_counter() - write_started
+
+    print_scan_stats({'modules': scan['modules']})
+    for pid, stats in sorted(scan['workers'].items()):
+        print(f"Worker {pid}: {stats['chunks']} chunks, {stats['symbols']} symbols, "
+              f"busy {stats['busy_time']:.2f}s (fetch {stats['fetch_time']:.2f}s)")
+    print(f"Completed parallel insights: {written['insights']} insights, {written['scores']} scores "
+          f"(scan {scan['elapsed']:.2f}s, write {write_time:.2f}s)")
+
+    return {
+        'symbols': len(symbols),
+        'insights': written['insights'],
+        'scores': written['scores'],
+        'scan_time': scan['elapsed'],
+        'write_time': write_time,
+        'workers': scan['workers']
+    }
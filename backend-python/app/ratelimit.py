@@ -0,0 +1,100 @@
+import time
+import threading
+from typing import Dict, Optional
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens per second, bursts up to `capacity`.
+
+    acquire() blocks the calling thread until a token is free, so any number
+    of workers sharing one bucket together stay under the limit.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.stats: Dict[str, float] = {'acquired': 0, 'waits': 0, 'wait_time': 0.0}
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        """Take tokens if they are available right now"""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                self.stats['acquired'] += tokens
+                return True
+            return False
+
+    def acquire(self, tokens: float = 1) -> float:
+        """Block until tokens are available; returns the time spent waiting"""
+        if tokens > self.capacity:
+            raise ValueError("tokens exceed bucket capacity")
+
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    self.stats['acquired'] += tokens
+                    if waited:
+                        self.stats['waits'] += 1
+                        self.stats['wait_time'] += waited
+                    return waited
+                delay = (tokens - self._tokens) / self.rate
+
+            time.sleep(delay)
+            waited += delay
+
+class AdaptiveTokenBucket(TokenBucket):
+    """
+    Token bucket that follows the remote side's throttling (AIMD).
+
+    throttled() halves the rate, at most once per `cooldown` seconds so one
+    burst of 429s counts once, and drops any banked burst; every `window`
+    consecutive succeeded() calls raise the rate by `step`, up to max_rate.
+    """
+
+    def __init__(self, rate: float, max_rate: Optional[float] = None, min_rate: float = 0.2,
+                 step: float = 0.5, window: int = 20, cooldown: float = 1.0,
+                 capacity: Optional[float] = None):
+        super().__init__(rate, capacity)
+        self.max_rate = max_rate or rate
+        self.min_rate = min(min_rate, rate)
+        self.step = step
+        self.window = window
+        self.cooldown = cooldown
+        self._streak = 0
+        self._last_cut = float('-inf')
+        self.stats.update({'throttled': 0, 'rate_cuts': 0, 'rate_raises': 0})
+
+    def throttled(self):
+        with self._lock:
+            now = time.monotonic()
+            self.stats['throttled'] += 1
+            self._streak = 0
+            if now - self._last_cut >= self.cooldown:
+                self._refill(now)
+                self.rate = max(self.min_rate, self.rate / 2)
+                self._tokens = min(self._tokens, 0.0)
+                self._last_cut = now
+                self.stats['rate_cuts'] += 1
+
+    def succeeded(self):
+        with self._lock:
+            self._streak += 1
+            if self._streak >= self.window and self.rate < self.max_rate:
+                self._refill(time.monotonic())
+                self.rate = min(self.max_rate, self.rate + self.step)
+                self._streak = 0
+                self.stats['rate_raises'] += 1
@@ -1,113 +1,282 @@
 import pandas as pd
 import importlib
 import os
+import time
 from datetime import date, datetime
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional
 
 from .supabase_client import (
-    get_supabase_client, 
     get_candles_for_symbol, 
+    get_candles_bulk,
+    get_indicator_states,
+    upsert_indicator_states,
     insert_insight,
-    upsert_stock_score
+    insert_insights,
+    upsert_stock_score,
+    upsert_stock_scores,
+    insights_buffer,
+    scores_buffer,
+    WriteBuffer
 )
+from .metadata_cache import get_metadata_cache
+from .candle_store import get_candle_store
+from .insights_engine.panel import CandlePanel
+from .insights_engine.features import FeatureStore
+from .insights_engine.state import IndicatorState
+
+# Recent candles fetched to advance stored indicator state
+STATE_LOOKBACK = 5
 
 # Available insight modules
 INSIGHT_MODULES = {
     'RSI_OVERSOLD': 'insights_engine.indicators.rsi',
     'RSI_OVERBOUGHT': 'insights_engine.indicators.rsi', 
     'EMA_CROSS': 'insights_engine.indicators.ema_cross',
-    'BREAKOUT': 'insights_engine.patterns.breakout'
+    'MACD_BULLISH': 'insights_engine.indicators.macd',
+    'BREAKOUT': 'insights_engine.patterns.breakout',
+    'CUP_HANDLE': 'insights_engine.patterns.cup_handle',
+    'BOLLINGER_SQUEEZE': 'insights_engine.patterns.bollinger_squeeze'
 }
 
 def get_insight_type_id(code: str) -> Optional[int]:
     """Get insight type ID from code"""
-    supabase = get_supabase_client()
-    result = supabase.table('insight_types').select('id').eq('code', code).execute()
-    
-    if result.data:
-        return result.data[0]['id']
-    return None
+    return get_metadata_cache().insight_type_id(code)
 
-async def run_insights_for_symbol(symbol: str, target_date: Optional[str] = None):
-    """Run all insight modules for a symbol"""
-    if not target_date:
-        target_date = date.today().isoformat()
+def load_module(module_path: str):
+    """Import an insight module by its path relative to the app package"""
+    return importlib.import_module(f"app.{module_path}")
+
+def candles_to_frame(candles: List[Dict]) -> pd.DataFrame:
+    """Convert candle rows into a chronologically sorted DataFrame"""
+    df = pd.DataFrame(candles)
+    df['ts'] = pd.to_datetime(df['ts'])
+    return df.sort_values('ts').reset_index(drop=True)
+
+def insight_modules() -> List[str]:
+    """Distinct module paths, in INSIGHT_MODULES order; a module emitting several codes runs once"""
+    return list(dict.fromkeys(INSIGHT_MODULES.values()))
+
+def evaluate_symbol(df: pd.DataFrame, symbol: str, stats: Optional[Dict] = None) -> List[Dict]:
+    """Run all insight modules over one symbol's candles and collect the hits"""
+    if df.empty:
+        return []
+    return evaluate_panel(CandlePanel.from_frame(symbol, df), stats).get(symbol, [])
+
+def evaluate_panel(panel: CandlePanel, stats: Optional[Dict] = None) -> Dict[str, List[Dict]]:
+    """
+    Run all insight modules over a candle panel with matrix operations.
     
-    print(f"Running insights for {symbol} on {target_date}")
+    Every module runs once against a shared FeatureStore, so each declared
+    feature is computed once per scan. When a stats dict is passed, module
+    run counts and timings accumulate under 'modules' and feature compute
+    counts and timings under 'features'.
+    """
+    features = FeatureStore(panel)
+    module_results = {}
+    module_stats = stats.setdefault('modules', {}) if stats is not None else {}
     
-    # Get candle data
-    candles = get_candles_for_symbol(symbol, days=100)
+    for module_path in insight_modules():
+        entry = module_stats.setdefault(module_path, {'runs': 0, 'time': 0.0})
+        started = time.perf_counter()
+        try:
+            module = load_module(module_path)
+            features.prepare(getattr(module, 'FEATURES', []))
+            module_results[module_path] = module.run_panel(features, {})
+        except Exception as e:
+            print(f"Error running {module_path} over panel: {e}")
+            module_results[module_path] = [None] * len(panel)
+        entry['runs'] += 1
+        entry['time'] += time.perf_counter() - started
     
-    if not candles:
-        print(f"No candle data found for {symbol}")
-        return
+    if stats is not None:
+        feature_stats = stats.setdefault('features', {})
+        for key, values in features.stats.items():
+            entry = feature_stats.setdefault(key, {'computed': 0, 'hits': 0, 'time': 0.0})
+            for name in entry:
+                entry[name] += values[name]
     
-    # Convert to DataFrame
-    df = pd.DataFrame(candles)
-    df['ts'] = pd.to_datetime(df['ts'])
-    df = df.sort_values('ts').reset_index(drop=True)
+    results = {}
+    for i, symbol in enumerate(panel.symbols):
+        if not panel.lengths[i]:
+            continue
+        results[symbol] = [
+            module_results[module_path][i]
+            for module_path in module_results
+            if module_results[module_path][i]
+        ]
+    
+    return results
+
+def print_scan_stats(stats: Dict):
+    """Print per-module and per-feature work done during a scan"""
+    for module_path, entry in stats.get('modules', {}).items():
+        print(f"  module {module_path}: {entry['runs']} runs, {entry['time'] * 1000:.1f} ms")
+    for key, entry in stats.get('features', {}).items():
+        print(f"  feature {key}: computed {entry['computed']}x, reused {entry['hits']}x, "
+              f"{entry['time'] * 1000:.1f} ms")
+
+def evaluate_state(state: IndicatorState) -> List[Dict]:
+    """Run all insight modules against one symbol's incremental indicator state"""
+    results = []
+    
+    for module_path in insight_modules():
+        try:
+            result = load_module(module_path).run_state(state, {})
+            if result:
+                results.append(result)
+        except Exception as e:
+            print(f"Error running {module_path} for {state.symbol}: {e}")
+            continue
+    
+    return results
+
+def build_insight_row(symbol: str, insight_type_id: int, target_date: str, result: Dict) -> Dict:
+    """Shape a module result as an insights table row"""
+    return {
+        'symbol': symbol,
+        'insight_type_id': insight_type_id,
+        'detected_on': target_date,
+        'signal_type': result.get('signal_type'),
+        'price': result.get('price'),
+        'score': result.get('score'),
+        'attributes': result.get('attributes', {})
+    }
+
+async def save_insights(symbol: str, target_date: str, results: List[Dict],
+                        buffers: Optional[Dict[str, WriteBuffer]] = None) -> List[Dict]:
+    """
+    Store module results as insights and update the symbol's combined score.
     
+    With buffers ({'insights': ..., 'scores': ...}) rows are queued for bulk
+    writes instead of being sent one request at a time.
+    """
     insights_found = []
     
-    # Run each insight module
-    for insight_code, module_path in INSIGHT_MODULES.items():
+    for result in results:
         try:
-            # Import module dynamically
-            module = importlib.import_module(f"app.{module_path}")
-            
-            # Run the module
-            result = module.run(df, symbol, {})
+            # Get insight type ID
+            insight_type_id = get_insight_type_id(result['insight_type'])
             
-            if result:
-                # Get insight type ID
-                insight_type_id = get_insight_type_id(result['insight_type'])
+            if insight_type_id:
+                insight_data = build_insight_row(symbol, insight_type_id, target_date, result)
                 
-                if insight_type_id:
-                    insight_data = {
-                        'symbol': symbol,
-                        'insight_type_id': insight_type_id,
-                        'detected_on': target_date,
-                        'signal_type': result.get('signal_type'),
-                        'price': result.get('price'),
-                        'score': result.get('score'),
-                        'attributes': result.get('attributes', {})
-                    }
-                    
-                    # Insert insight
-                    insert_result = insert_insight(insight_data)
-                    insights_found.append(result)
-                    
-                    print(f"Found {result['insight_type']} for {symbol}: {result['signal_type']} at {result['price']}")
+                # Insert insight
+                if buffers:
+                    buffers['insights'].add(insight_data)
+                else:
+                    insert_insight(insight_data)
+                insights_found.append(result)
                 
+                print(f"Found {result['insight_type']} for {symbol}: {result['signal_type']} at {result['price']}")
+        
         except Exception as e:
-            print(f"Error running {insight_code} for {symbol}: {e}")
+            print(f"Error saving {result.get('insight_type')} for {symbol}: {e}")
             continue
     
     # Compute combined score
     if insights_found:
-        await compute_combined_score(symbol, target_date, insights_found)
+        await compute_combined_score(symbol, target_date, insights_found,
+                                     buffers['scores'] if buffers else None)
+    
+    return insights_found
+
+def save_insights_batch(results: Dict[str, List[Dict]], target_date: str) -> Dict[str, int]:
+    """Store module results for many symbols as one bulk insights write and one scores write"""
+    type_ids = get_metadata_cache().insight_type_ids()
+    type_weights = get_insight_type_weights()
+    
+    insight_rows = []
+    score_rows = []
+    for symbol, symbol_results in results.items():
+        found = [r for r in symbol_results if type_ids.get(r['insight_type'])]
+        insight_rows.extend(
+            build_insight_row(symbol, type_ids[r['insight_type']], target_date, r) for r in found
+        )
+        if found:
+            score_rows.append(build_score(symbol, target_date, found, type_weights))
+    
+    if insight_rows:
+        insert_insights(insight_rows)
+    if score_rows:
+        upsert_stock_scores(score_rows)
+    
+    return {'insights': len(insight_rows), 'scores': len(score_rows)}
+
+async def run_insights_for_symbol(symbol: str, target_date: Optional[str] = None,
+                                  buffers: Optional[Dict[str, WriteBuffer]] = None):
+    """Run all insight modules for a symbol"""
+    if not target_date:
+        target_date = date.today().isoformat()
+    
+    print(f"Running insights for {symbol} on {target_date}")
+    
+    # Get candle data
+    candles = get_candles_for_symbol(symbol, days=100)
+    
+    if not candles:
+        print(f"No candle data found for {symbol}")
+        return
+    
+    df = candles_to_frame(candles)
+    
+    insights_found = await save_insights(symbol, target_date, evaluate_symbol(df, symbol), buffers)
     
     print(f"Completed insights for {symbol}: {len(insights_found)} insights found")
 
-async def compute_combined_score(symbol: str, target_date: str, insights: List[Dict]):
-    """Compute combined score for a symbol"""
+async def run_insights_serial(symbols: List[str], target_date: Optional[str] = None,
+                              progress: Optional[Callable[[int, int], None]] = None):
+    """Run all insight modules symbol by symbol, queueing every write into bulk buffers"""
+    buffers = {'insights': insights_buffer(), 'scores': scores_buffer()}
+    try:
+        for done, symbol in enumerate(symbols):
+            if progress:
+                progress(done, len(symbols))
+            await run_insights_for_symbol(symbol, target_date, buffers)
+            # Symbols without insights add no rows, so the age threshold is checked here too
+            for buffer in buffers.values():
+                buffer.flush_due()
+    finally:
+        for buffer in buffers.values():
+            buffer.close()
+
+async def run_insights_panel(symbols: List[str], target_date: Optional[str] = None, bars: int = 100,
+                             source: str = "db"):
+    """
+    Run all insight modules for many symbols at once in panel mode.
     
-    # Default weights by category
-    weights = {
-        'FORMULA': 1.0,
-        'PATTERN': 1.5,
-        'SENTIMENT': 1.2
-    }
+    Candles come from daily_candles in bulk, or with source="store" from the
+    local memory-mapped candle store.
+    """
+    if not target_date:
+        target_date = date.today().isoformat()
+    
+    print(f"Running panel insights for {len(symbols)} symbols on {target_date}")
     
-    supabase = get_supabase_client()
+    started = time.perf_counter()
+    if source == "store":
+        panel = get_candle_store().panel(symbols, bars=bars)
+    else:
+        panel = CandlePanel.from_candles(get_candles_bulk(symbols, days=bars), bars=bars)
+    loaded = time.perf_counter()
     
-    # Get insight types for weights
-    insight_types = supabase.table('insight_types').select('*').execute()
-    type_weights = {}
+    stats = {}
+    results = evaluate_panel(panel, stats)
+    evaluated = time.perf_counter()
+    print_scan_stats(stats)
     
-    for it in insight_types.data:
-        type_weights[it['code']] = weights.get(it['category'], 1.0)
+    written = save_insights_batch(results, target_date)
     
+    print(f"Completed panel insights for {len(results)} symbols: {written['insights']} insights found "
+          f"(load from {source} {loaded - started:.2f}s, evaluate {evaluated - loaded:.3f}s, "
+          f"save {time.perf_counter() - evaluated:.2f}s)")
+    return results
+
+def get_insight_type_weights() -> Dict[str, float]:
+    """Get the score weight for every insight type code"""
+    return get_metadata_cache().insight_type_weights()
+
+def build_score(symbol: str, target_date: str, insights: List[Dict], type_weights: Dict[str, float]) -> Dict:
+    """Combine a symbol's insights into a stock_daily_scores row"""
     total_score = 0
     total_weight = 0
     details = {'insights': []}
@@ -121,8 +290,11 @@ async def compute_combined_score(symbol: str, target_date: str, insights: List[D
         if insight.get('signal_type') == 'SELL':
             score = -score  # Negative for sell signals
         
-        total_score += score * weight
-        total_weight += weight
+        # NEUTRAL insights (a squeeze) say nothing about direction, so they
+        # stay out of the weighted average
+        if insight.get('signal_type') != 'NEUTRAL':
+            total_score += score * weight
+            total_weight += weight
         
         details['insights'].append({
             'type': insight_type,
@@ -135,16 +307,76 @@ async def compute_combined_score(symbol: str, target_date: str, insights: List[D
     details['combined'] = combined_score
     details['scale'] = '-1 to 1'
     
-    # Upsert score
-    score_data = {
+    return {
         'symbol': symbol,
         'date': target_date,
         'combined_score': combined_score,
         'details': details
     }
+
+async def run_insights_incremental(symbols: List[str], target_date: Optional[str] = None, bars: int = 100):
+    """
+    Run all insight modules by advancing stored indicator state one bar.
+    
+    Symbols without usable state (new, backfilled, corrected or more than
+    STATE_LOOKBACK bars behind) are recomputed from their last `bars` candles.
+    """
+    if not target_date:
+        target_date = date.today().isoformat()
     
-    upsert_stock_score(score_data)
-    print(f"Combined score for {symbol}: {combined_score:.3f}")
+    print(f"Running incremental insights for {len(symbols)} symbols on {target_date}")
+    started = time.perf_counter()
+    
+    stored = {}
+    for symbol, row in get_indicator_states(symbols).items():
+        state = IndicatorState.from_dict(row['state'])
+        if state:
+            stored[symbol] = state
+    
+    recent = get_candles_bulk(symbols, days=STATE_LOOKBACK)
+    states = {}
+    recompute = []
+    advanced = 0
+    for symbol in symbols:
+        state = stored.get(symbol)
+        if state and state.catch_up(recent.get(symbol, [])):
+            states[symbol] = state
+            advanced += 1
+        else:
+            recompute.append(symbol)
+    
+    if recompute:
+        history = get_candles_bulk(recompute, days=bars)
+        for symbol in recompute:
+            if history.get(symbol):
+                states[symbol] = IndicatorState.from_candles(symbol, history[symbol])
+    recomputed = len(states) - advanced
+    
+    results = {symbol: evaluate_state(state) for symbol, state in states.items()}
+    written = save_insights_batch(results, target_date)
+    
+    if states:
+        upsert_indicator_states([
+            {'symbol': symbol, 'as_of': state.as_of, 'version': state.version, 'state': state.to_dict()}
+            for symbol, state in states.items()
+        ])
+    
+    print(f"Completed incremental insights: {advanced} advanced, {recomputed} recomputed, "
+          f"{len(recompute) - recomputed} without candles, {written['insights']} insights found "
+          f"({time.perf_counter() - started:.2f}s)")
+    return results
+
+async def compute_combined_score(symbol: str, target_date: str, insights: List[Dict],
+                                 buffer: Optional[WriteBuffer] = None):
+    """Compute combined score for a symbol"""
+    score_data = build_score(symbol, target_date, insights, get_insight_type_weights())
+    
+    # Upsert score
+    if buffer:
+        buffer.add(score_data)
+    else:
+        upsert_stock_score(score_data)
+    print(f"Combined score for {symbol}: {score_data['combined_score']:.3f}")
 
 if __name__ == "__main__":
     import asyncio
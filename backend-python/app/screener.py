@@ -0,0 +1,404 @@
+import os
+import ast
+import time
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .supabase_client import get_fundamentals_page, get_latest_scores, on_write
+
+# Full reload from the database after this long, for writes made by other
+# processes; writes made in this process are applied as they happen
+SCREENER_TTL = float(os.getenv("SCREENER_TTL", "900"))
+
+NUMERIC = ('market_cap', 'roe', 'pe_ratio', 'pb_ratio', 'eps', 'combined_score')
+CATEGORICAL = ('sector', 'industry', 'score_date')
+COLUMNS = ('symbol', 'company_name') + NUMERIC + CATEGORICAL
+
+FUNDAMENTALS_SELECT = 'symbol, company_name, market_cap, roe, pe_ratio, pb_ratio, eps, industry, sector'
+PAGE_SIZE = 1000
+MAX_RESULTS = 1000
+
+OPERATORS = {
+    ast.Lt: '<', ast.LtE: '<=', ast.Gt: '>', ast.GtE: '>=',
+    ast.Eq: '==', ast.NotEq: '!=', ast.In: 'in', ast.NotIn: 'not in'
+}
+
+# `20 > pe_ratio` is `pe_ratio < 20`
+FLIPPED = {'<': '>', '<=': '>=', '>': '<', '>=': '<=', '==': '==', '!=': '!='}
+
+def parse_filter(expression: str) -> ast.AST:
+    """
+    Parse a filter such as `pe_ratio < 20 and roe > 0.15 and sector == 'IT'`.
+    Comparisons take a column and a literal (`in` a list or tuple, `== None`
+    for missing values) and combine with and/or/not and parentheses.
+    """
+    try:
+        return ast.parse(expression.strip(), mode='eval').body
+    except SyntaxError as e:
+        raise ValueError(f"Invalid filter: {e.msg}")
+
+def screen_fields(fields: Optional[Iterable[str]] = None) -> Tuple[str, ...]:
+    """Output columns, validated; every column by default"""
+    if not fields:
+        return COLUMNS
+    fields = tuple(dict.fromkeys(f.strip() for f in fields if f.strip()))
+    unknown = [f for f in fields if f not in COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown screener columns: {', '.join(unknown)}")
+    return fields
+
+class ScreenerTable:
+    """
+    Fundamentals and latest scores as columns, one row per symbol.
+
+    Numeric columns are float64 arrays (NaN when missing) indexed by their
+    sort order, so a range filter is two binary searches and a top-N is a
+    walk down the order. Categorical columns are int32 codes with one bitmap
+    per distinct value. Only the indexes of columns whose values an upsert
+    changed are rebuilt, on the next screen.
+    """
+
+    def __init__(self, rows: Iterable[dict] = ()):
+        self.symbols: List[str] = []
+        self.names: List[Optional[str]] = []
+        self.positions: Dict[str, int] = {}
+        self.numeric = {column: np.empty(0) for column in NUMERIC}
+        self.codes = {column: np.empty(0, dtype=np.int32) for column in CATEGORICAL}
+        self.categories: Dict[str, List[str]] = {column: [] for column in CATEGORICAL}
+        self._category_codes: Dict[str, Dict[str, int]] = {column: {} for column in CATEGORICAL}
+        self._sorted: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._bitmaps: Dict[str, np.ndarray] = {}
+        self._orders: Dict[Tuple[str, bool], np.ndarray] = {}
+        self._stale = set(COLUMNS)
+        self.upsert(rows)
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def _code(self, column: str, value) -> int:
+        if value is None:
+            return -1
+        codes = self._category_codes[column]
+        if value not in codes:
+            codes[value] = len(codes)
+            self.categories[column].append(value)
+        return codes[value]
+
+    def upsert(self, rows: Iterable[dict]) -> int:
+        """Set the columns present in each row for its symbol, adding symbols not seen before"""
+        rows = [row for row in rows if row.get('symbol')]
+        added = [s for s in dict.fromkeys(row['symbol'] for row in rows) if s not in self.positions]
+        if added:
+            for symbol in added:
+                self.positions[symbol] = len(self.symbols)
+                self.symbols.append(symbol)
+                self.names.append(None)
+            for column in NUMERIC:
+                self.numeric[column] = np.concatenate([self.numeric[column], np.full(len(added), np.nan)])
+            for column in CATEGORICAL:
+                self.codes[column] = np.concatenate([self.codes[column], np.full(len(added), -1, dtype=np.int32)])
+            self._stale.update(COLUMNS)
+
+        for row in rows:
+            i = self.positions[row['symbol']]
+            for column, value in row.items():
+                if column in self.numeric:
+                    value = np.nan if value is None else float(value)
+                    current = self.numeric[column][i]
+                    if value != current and not (np.isnan(value) and np.isnan(current)):
+                        self.numeric[column][i] = value
+                        self._stale.add(column)
+                elif column in self.codes:
+                    code = self._code(column, value)
+                    if code != self.codes[column][i]:
+                        self.codes[column][i] = code
+                        self._stale.add(column)
+                elif column == 'company_name':
+                    self.names[i] = value
+        return len(rows)
+
+    def upsert_scores(self, rows: Iterable[dict]) -> int:
+        """Apply stock_daily_scores rows, skipping any older than the score a symbol already has"""
+        latest = []
+        for row in rows:
+            score_date = str(row['date'])
+            current = self.category('score_date', row['symbol'])
+            if current is not None and current > score_date:
+                continue
+            latest.append({'symbol': row['symbol'], 'combined_score': row.get('combined_score'),
+                           'score_date': score_date})
+        return self.upsert(latest)
+
+    def category(self, column: str, symbol: str) -> Optional[str]:
+        """A symbol's value in a categorical column, None when unknown"""
+        i = self.positions.get(symbol)
+        if i is None or self.codes[column][i] < 0:
+            return None
+        return self.categories[column][self.codes[column][i]]
+
+    def _index(self):
+        """Rebuild the indexes of stale columns"""
+        if not self._stale:
+            return
+        n = len(self.symbols)
+        for column in self._stale:
+            if column in self.numeric:
+                values = self.numeric[column]
+                order = np.argsort(values, kind='stable')
+                self._sorted[column] = (order, values[order[:np.count_nonzero(~np.isnan(values))]])
+            elif column in self.codes:
+                codes = self.codes[column]
+                bitmaps = np.zeros((len(self.categories[column]), n), dtype=bool)
+                known = np.nonzero(codes >= 0)[0]
+                bitmaps[codes[known], known] = True
+                self._bitmaps[column] = bitmaps
+        if 'symbol' in self._stale:
+            self._orders = {('symbol', False): np.argsort(np.array(self.symbols, dtype=object), kind='stable')}
+        else:
+            self._orders = {key: order for key, order in self._orders.items() if key[0] not in self._stale}
+        self._stale = set()
+
+    def _order(self, column: str, descending: bool) -> np.ndarray:
+        """Row positions sorted by column, missing values last and ties by symbol"""
+        key = (column, descending)
+        if key not in self._orders:
+            by_symbol = self._orders[('symbol', False)]
+            if column == 'symbol':
+                self._orders[key] = by_symbol[::-1]
+            elif column in self.numeric:
+                rank = np.empty(len(by_symbol), dtype=np.int64)
+                rank[by_symbol] = np.arange(len(by_symbol))
+                values = self.numeric[column]
+                self._orders[key] = np.lexsort((rank, -values if descending else values))
+            else:
+                raise ValueError(f"Cannot sort by {column}: sort by symbol or a numeric column")
+        return self._orders[key]
+
+    def _known(self, column: str) -> np.ndarray:
+        if column in self.numeric:
+            return ~np.isnan(self.numeric[column])
+        if column in self.codes:
+            return self.codes[column] >= 0
+        return np.ones(len(self.symbols), dtype=bool)
+
+    def _equals(self, column: str, value) -> np.ndarray:
+        mask = np.zeros(len(self.symbols), dtype=bool)
+        if column in self.numeric:
+            if not isinstance(value, (int, float)) or isinstance(value, bool):
+                raise ValueError(f"{column} is numeric, got {value!r}")
+            order, values = self._sorted[column]
+            mask[order[np.searchsorted(values, value, 'left'):np.searchsorted(values, value, 'right')]] = True
+        elif not isinstance(value, str):
+            raise ValueError(f"{column} is text, got {value!r}")
+        elif column == 'symbol':
+            if value in self.positions:
+                mask[self.positions[value]] = True
+        else:
+            code = self._category_codes[column].get(value)
+            if code is not None:
+                mask |= self._bitmaps[column][code]
+        return mask
+
+    def _range(self, column: str, op: str, value) -> np.ndarray:
+        if column not in self.numeric:
+            raise ValueError(f"{column} only supports ==, != and in")
+        if not isinstance(value, (int, float)) or isinstance(value, bool):
+            raise ValueError(f"{column} {op} needs a number, got {value!r}")
+        order, values = self._sorted[column]
+        lo, hi = 0, len(values)
+        if op in ('<', '<='):
+            hi = np.searchsorted(values, value, 'left' if op == '<' else 'right')
+        else:
+            lo = np.searchsorted(values, value, 'right' if op == '>' else 'left')
+        mask = np.zeros(len(self.symbols), dtype=bool)
+        mask[order[lo:hi]] = True
+        return mask
+
+    def _compare(self, column: str, op: str, value) -> np.ndarray:
+        if column not in COLUMNS or column == 'company_name':
+            raise ValueError(f"Cannot filter on {column}")
+        if op in ('==', '!=') and value is None:
+            known = self._known(column)
+            return known if op == '!=' else ~known
+        if op in ('in', 'not in'):
+            if not isinstance(value, (list, tuple, set)):
+                raise ValueError(f"{column} {op} needs a list of values")
+            values = value
+        elif op in ('==', '!='):
+            values = [value]
+        else:
+            return self._range(column, op, value)
+        mask = np.zeros(len(self.symbols), dtype=bool)
+        for v in values:
+            mask |= self._equals(column, v)
+        return mask if op in ('==', 'in') else self._known(column) & ~mask
+
+    def _operand(self, left: ast.AST, op: str, right: ast.AST) -> Tuple[str, str, object]:
+        if isinstance(right, ast.Name) and not isinstance(left, ast.Name) and op in FLIPPED:
+            left, right, op = right, left, FLIPPED[op]
+        if not isinstance(left, ast.Name) or isinstance(right, ast.Name):
+            raise ValueError(f"Compare a column with a value: {ast.unparse(left)} {op} {ast.unparse(right)}")
+        try:
+            return left.id, op, ast.literal_eval(right)
+        except ValueError:
+            raise ValueError(f"Not a literal value: {ast.unparse(right)}")
+
+    def mask(self, node: ast.AST) -> np.ndarray:
+        """Rows matching a parsed filter expression"""
+        if isinstance(node, ast.BoolOp):
+            masks = [self.mask(value) for value in node.values]
+            return np.logical_and.reduce(masks) if isinstance(node.op, ast.And) else np.logical_or.reduce(masks)
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            return ~self.mask(node.operand)
+        if isinstance(node, ast.Compare):
+            masks = []
+            left = node.left
+            for op, right in zip(node.ops, node.comparators):
+                if type(op) not in OPERATORS:
+                    raise ValueError(f"Unsupported operator in {ast.unparse(node)}")
+                masks.append(self._compare(*self._operand(left, OPERATORS[type(op)], right)))
+                left = right
+            return np.logical_and.reduce(masks)
+        raise ValueError(f"Unsupported filter expression: {ast.unparse(node)}")
+
+    def rows(self, positions: np.ndarray, fields: Tuple[str, ...] = COLUMNS) -> List[dict]:
+        columns = []
+        for field in fields:
+            if field == 'symbol':
+                columns.append([self.symbols[i] for i in positions])
+            elif field == 'company_name':
+                columns.append([self.names[i] for i in positions])
+            elif field in self.numeric:
+                values = self.numeric[field][positions]
+                missing = np.isnan(values)
+                out = values.astype(object)
+                if field == 'market_cap':
+                    out[~missing] = values[~missing].astype(np.int64)
+                out[missing] = None
+                columns.append(out.tolist())
+            else:
+                names = self.categories[field]
+                columns.append([names[code] if code >= 0 else None for code in self.codes[field][positions]])
+        return [dict(zip(fields, values)) for values in zip(*columns)]
+
+    def screen(self, expression: Optional[str] = None, sort: str = '-market_cap', limit: int = 50,
+               fields: Optional[Iterable[str]] = None) -> Dict:
+        """
+        The number of symbols matching a filter expression and the first
+        `limit` of them ordered by `sort` (a column, '-' prefix for descending).
+        """
+        fields = screen_fields(fields)
+        self._index()
+        if expression and expression.strip():
+            mask = self.mask(parse_filter(expression))
+        else:
+            mask = np.ones(len(self.symbols), dtype=bool)
+        order = self._order(sort.lstrip('-'), sort.startswith('-'))
+        selected = order[mask[order]][:max(0, min(limit, MAX_RESULTS))]
+        return {'count': int(np.count_nonzero(mask)), 'rows': self.rows(selected, fields)}
+
+def load_screener_table() -> ScreenerTable:
+    """Every fundamentals row, keyset page by page, with the latest scores"""
+    rows = []
+    after = None
+    while True:
+        page = get_fundamentals_page(FUNDAMENTALS_SELECT, after, PAGE_SIZE)
+        rows.extend(page)
+        if len(page) < PAGE_SIZE:
+            break
+        after = (page[-1]['market_cap'], page[-1]['symbol'])
+    table = ScreenerTable(rows)
+    table.upsert_scores(get_latest_scores())
+    return table
+
+class Screener:
+    """
+    The process-wide screening table. Loaded on first use, updated by write
+    hooks on fundamentals and stock_daily_scores, and reloaded in full once
+    it is SCREENER_TTL seconds old or after invalidate().
+    """
+
+    def __init__(self, ttl: float = SCREENER_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._table: Optional[ScreenerTable] = None
+        self._loaded_at: Optional[float] = None
+        self.stats = {'screens': 0, 'loads': 0, 'updated_rows': 0, 'screen_time': 0.0, 'load_time': 0.0}
+        on_write('fundamentals', self.update_fundamentals)
+        on_write('stock_daily_scores', self.update_scores)
+
+    def _current(self) -> ScreenerTable:
+        if self._table is None or time.monotonic() - self._loaded_at > self.ttl:
+            started = time.perf_counter()
+            self._table = load_screener_table()
+            self._loaded_at = time.monotonic()
+            self.stats['loads'] += 1
+            self.stats['load_time'] += time.perf_counter() - started
+            print(f"Screener loaded {len(self._table)} symbols in {time.perf_counter() - started:.2f}s")
+        return self._table
+
+    def screen(self, expression: Optional[str] = None, sort: str = '-market_cap', limit: int = 50,
+               fields: Optional[Iterable[str]] = None) -> Dict:
+        with self._lock:
+            table = self._current()
+            started = time.perf_counter()
+            result = table.screen(expression, sort, limit, fields)
+            elapsed = time.perf_counter() - started
+            self.stats['screens'] += 1
+            self.stats['screen_time'] += elapsed
+        return {**result, 'universe': len(table), 'elapsed_ms': round(elapsed * 1000, 3)}
+
+    def update_fundamentals(self, rows: list):
+        with self._lock:
+            if self._table is not None:
+                self.stats['updated_rows'] += self._table.upsert(rows)
+
+    def update_scores(self, rows: list):
+        with self._lock:
+            if self._table is not None:
+                self.stats['updated_rows'] += self._table.upsert_scores(rows)
+
+    def sectors(self, symbols: Iterable[str]) -> Dict[str, Optional[str]]:
+        """The sector of each symbol, None when unknown"""
+        with self._lock:
+            table = self._current()
+            return {symbol: table.category('sector', symbol) for symbol in symbols}
+
+    def warm(self):
+        """Load the table ahead of the first screen"""
+        try:
+            with self._lock:
+                self._current()
+        except Exception as e:
+            print(f"Screener warm-up failed: {e}")
+
+    def invalidate(self):
+        with self._lock:
+            self._table = None
+
+    def summary(self) -> Dict:
+        with self._lock:
+            screens, loads = self.stats['screens'], self.stats['loads']
+            return {
+                'symbols': len(self._table) if self._table is not None else 0,
+                'age': round(time.monotonic() - self._loaded_at, 1) if self._table is not None else None,
+                'ttl': self.ttl,
+                'screens': screens,
+                'loads': loads,
+                'updated_rows': self.stats['updated_rows'],
+                'mean_screen_ms': round(1000 * self.stats['screen_time'] / screens, 3) if screens else 0.0,
+                'mean_load_ms': round(1000 * self.stats['load_time'] / loads, 1) if loads else 0.0
+            }
+
+_screener: Optional[Screener] = None
+
+def get_screener() -> Screener:
+    """Get screener singleton"""
+    global _screener
+
+    if _screener is None:
+        _screener = Screener()
+
+    return _screener
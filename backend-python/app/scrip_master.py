@@ -0,0 +1,192 @@
+import io
+import os
+import csv
+import json
+import time
+import zipfile
+import threading
+from datetime import date
+from typing import Dict, Iterable, Optional
+
+from .http_pool import get_http_session
+
+# Broker symbol master archives, refreshed by Shoonya every trading day
+SCRIP_MASTER_URL = "https://api.shoonya.com/{exchange}_symbols.txt.zip"
+SCRIP_MASTER_DIR = os.getenv(
+    "SCRIP_MASTER_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "scrip_master")
+)
+INDEX_VERSION = 1
+
+# After a failed download with no index to fall back on, callers get None
+# without another attempt for this many seconds
+SCRIP_MASTER_RETRY_AFTER = float(os.getenv("SCRIP_MASTER_RETRY_AFTER", "300"))
+
+# Series tried, in order, when a bare symbol such as RELIANCE is looked up
+EQUITY_SERIES = ('EQ', 'BE', 'BZ', 'SM', 'ST')
+
+def parse_scrip_master(lines: Iterable[str], exchange: str) -> Dict[str, str]:
+    """
+    Map trading symbol (tsym) to token from the broker's symbol master.
+
+    The file is CSV with a header row naming at least Exchange, Token and
+    TradingSymbol; rows for other exchanges are ignored.
+    """
+    tokens = {}
+    for row in csv.DictReader(lines):
+        if (row.get('Exchange') or '').strip() != exchange:
+            continue
+        tsym = (row.get('TradingSymbol') or '').strip()
+        token = (row.get('Token') or '').strip()
+        if tsym and token:
+            tokens[tsym] = token
+    return tokens
+
+class ScripMaster:
+    """
+    Local symbol-to-token index for one exchange.
+
+    Lookups are plain dict reads. The index is persisted as JSON with a
+    version stamp (format version, source and the date it was built), so a
+    process start reads one small file instead of calling searchscrip per
+    symbol. A stamp from an earlier day marks the index stale.
+    """
+
+    def __init__(self, exchange: str, tokens: Dict[str, str], source: str, as_of: str):
+        self.exchange = exchange
+        self.tokens = tokens
+        self.source = source
+        self.as_of = as_of
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def __len__(self):
+        return len(self.tokens)
+
+    @property
+    def stale(self) -> bool:
+        return self.as_of != date.today().isoformat()
+
+    def resolve(self, symbol: str) -> Optional[str]:
+        """Token for an exact tsym (RELIANCE-EQ) or a bare symbol in an equity series"""
+        token = self.tokens.get(symbol)
+        if token is None and '-' not in symbol:
+            for series in EQUITY_SERIES:
+                token = self.tokens.get(f"{symbol}-{series}")
+                if token is not None:
+                    break
+        self.stats['hits' if token is not None else 'misses'] += 1
+        return token
+
+    def add(self, tsym: str, token: str):
+        """Remember a token found through a network lookup"""
+        self.tokens[tsym] = token
+
+    @staticmethod
+    def index_path(exchange: str) -> str:
+        return os.path.join(SCRIP_MASTER_DIR, f"{exchange}_index.json")
+
+    def save(self, path: Optional[str] = None):
+        path = path or self.index_path(self.exchange)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        stamp = {'version': INDEX_VERSION, 'exchange': self.exchange, 'source': self.source,
+                 'as_of': self.as_of, 'count': len(self.tokens)}
+        tmp = f"{path}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump({**stamp, 'tokens': self.tokens}, f, separators=(',', ':'))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, exchange: str, path: Optional[str] = None) -> Optional['ScripMaster']:
+        """Read a persisted index; None when missing or written by another format version"""
+        path = path or cls.index_path(exchange)
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get('version') != INDEX_VERSION or data.get('exchange') != exchange:
+            return None
+        return cls(exchange, data['tokens'], data.get('source', path), data.get('as_of'))
+
+    @classmethod
+    def from_dump(cls, exchange: str, path: str) -> 'ScripMaster':
+        """Build from a local symbol master dump, either the .txt or the .zip archive"""
+        if path.endswith('.zip'):
+            with zipfile.ZipFile(path) as archive:
+                with archive.open(archive.namelist()[0]) as raw:
+                    tokens = parse_scrip_master(io.TextIOWrapper(raw, encoding='utf-8'), exchange)
+        else:
+            with open(path, encoding='utf-8') as f:
+                tokens = parse_scrip_master(f, exchange)
+        return cls(exchange, tokens, path, date.today().isoformat())
+
+    @classmethod
+    def download(cls, exchange: str, timeout: float = 30.0) -> 'ScripMaster':
+        """Download and parse the broker's current symbol master archive"""
+        url = SCRIP_MASTER_URL.format(exchange=exchange)
+        response = get_http_session("shoonya").get(url, timeout=timeout)
+        response.raise_for_status()
+        with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+            with archive.open(archive.namelist()[0]) as raw:
+                tokens = parse_scrip_master(io.TextIOWrapper(raw, encoding='utf-8'), exchange)
+        return cls(exchange, tokens, url, date.today().isoformat())
+
+_scrip_masters: Dict[str, ScripMaster] = {}
+_retry_at: Dict[str, float] = {}
+_lock = threading.Lock()
+
+def get_scrip_master(exchange: str = "NSE", refresh: bool = False) -> Optional[ScripMaster]:
+    """
+    Get the scrip-master index for an exchange, loading it at most once per process.
+
+    Order: the persisted index if it is from today, otherwise a fresh
+    download (persisted for the next start), otherwise whatever stale index
+    exists. Returns None if no index can be had, in which case callers fall
+    back to network lookups; that outcome is remembered for
+    SCRIP_MASTER_RETRY_AFTER seconds so per-symbol lookups don't each wait
+    on another download.
+    """
+    with _lock:
+        master = _scrip_masters.get(exchange)
+        if master is not None and not refresh:
+            return master
+        if not refresh and time.monotonic() < _retry_at.get(exchange, 0.0):
+            return None
+
+        started = time.perf_counter()
+        master = ScripMaster.load(exchange)
+        if master is None or master.stale or refresh:
+            try:
+                downloaded = ScripMaster.download(exchange)
+                downloaded.save()
+                master = downloaded
+            except Exception as e:
+                print(f"Could not download {exchange} scrip master: {e}")
+
+        if master is None:
+            _retry_at[exchange] = time.monotonic() + SCRIP_MASTER_RETRY_AFTER
+        else:
+            _retry_at.pop(exchange, None)
+            _scrip_masters[exchange] = master
+            print(f"Loaded {exchange} scrip master: {len(master)} symbols as of {master.as_of} "
+                  f"({(time.perf_counter() - started) * 1000:.0f} ms)")
+        return master
+
+def import_scrip_master(exchange: str, path: str) -> ScripMaster:
+    """Build the index from a local dump, persist it and make it the process index"""
+    master = ScripMaster.from_dump(exchange, path)
+    master.save()
+    with _lock:
+        _scrip_masters[exchange] = master
+    return master
+
+if __name__ == "__main__":
+    import sys
+
+    # python -m app.scrip_master [EXCHANGE] [dump.zip|dump.txt]
+    exchange = sys.argv[1] if len(sys.argv) > 1 else "NSE"
+    if len(sys.argv) > 2:
+        master = import_scrip_master(exchange, sys.argv[2])
+    else:
+        master = get_scrip_master(exchange, refresh=True)
+    if master:
+        print(f"{len(master)} {exchange} symbols indexed from {master.source}")
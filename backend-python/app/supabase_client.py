@@ -1,9 +1,48 @@
 import os
-from supabase import create_client, Client
-from typing import Optional
+import json
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from httpx import Limits, Timeout
+from postgrest import SyncPostgrestClient
+from postgrest.utils import SyncClient
+from supabase import Client
+from supabase.lib.client_options import ClientOptions
+from typing import Callable, Optional, Dict, List, Iterator, Tuple
+
+# Keep-alive PostgREST connections shared by every thread; a caller waits
+# up to DB_TIMEOUT for a free one instead of opening more
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "32"))
+
+# Connect, read and pool-wait limit of one query, in seconds
+DB_TIMEOUT = float(os.getenv("DB_TIMEOUT", "30"))
+DB_CONNECT_TIMEOUT = 5.0
+
+class PooledPostgrestClient(SyncPostgrestClient):
+    """PostgREST client whose httpx session is bounded to DB_POOL_SIZE connections"""
+    
+    def create_session(self, base_url: str, headers: Dict[str, str], timeout) -> SyncClient:
+        return SyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            limits=Limits(max_connections=DB_POOL_SIZE, max_keepalive_connections=DB_POOL_SIZE)
+        )
+
+class PooledClient(Client):
+    """Supabase client using PooledPostgrestClient for table queries"""
+    
+    @staticmethod
+    def _init_postgrest_client(rest_url: str, headers: Dict[str, str], schema: str,
+                               timeout=DB_TIMEOUT) -> SyncPostgrestClient:
+        return PooledPostgrestClient(rest_url, headers=headers, schema=schema, timeout=timeout)
 
 _supabase_client: Optional[Client] = None
 
+# Callbacks run with the rows of every successful upsert, per table
+_write_hooks: Dict[str, List[Callable[[list], None]]] = {}
+
 def get_supabase_client() -> Client:
     """Get Supabase client singleton"""
     global _supabase_client
@@ -15,29 +54,26 @@ def get_supabase_client() -> Client:
         if not url or not key:
             raise ValueError("SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY must be set")
         
-        _supabase_client = create_client(url, key)
+        timeout = Timeout(DB_TIMEOUT, connect=DB_CONNECT_TIMEOUT)
+        _supabase_client = PooledClient(url, key, ClientOptions(postgrest_client_timeout=timeout))
     
     return _supabase_client
 
-def upsert_daily_candles(symbol: str, candles_data: list) -> dict:
-    """Upsert daily candles data"""
-    supabase = get_supabase_client()
+def upsert_daily_candles(symbol: str, candles_data: list) -> Dict:
+    """Upsert daily candle rows in bounded chunks (bulk ingest goes through app.candle_loader)"""
+    with WriteBuffer('daily_candles', CANDLE_KEYS, max_rows=2000) as buffer:
+        for candle in candles_data:
+            buffer.add({
+                'symbol': symbol,
+                'ts': str(candle['date']),
+                'open': candle['open'],
+                'high': candle['high'],
+                'low': candle['low'],
+                'close': candle['close'],
+                'volume': candle['volume']
+            })
     
-    # Prepare data for upsert
-    rows = []
-    for candle in candles_data:
-        rows.append({
-            'symbol': symbol,
-            'ts': candle['date'],
-            'open': candle['open'],
-            'high': candle['high'],
-            'low': candle['low'],
-            'close': candle['close'],
-            'volume': candle['volume']
-        })
-    
-    result = supabase.table('daily_candles').upsert(rows).execute()
-    return result
+    return buffer.stats
 
 def get_last_candle_date(symbol: str) -> Optional[str]:
     """Get the last candle date for a symbol"""
@@ -54,6 +90,13 @@ def get_last_candle_date(symbol: str) -> Optional[str]:
         return result.data[0]['ts']
     return None
 
+def get_last_candle_dates(symbols: List[str]) -> Dict[str, Optional[str]]:
+    """Get the last candle date for many symbols in one round-trip; None where there are no candles"""
+    supabase = get_supabase_client()
+    result = supabase.rpc('get_last_candle_dates', {'symbols': symbols}).execute()
+    last_dates = result.data or {}
+    return {symbol: last_dates.get(symbol) for symbol in symbols}
+
 def get_candles_for_symbol(symbol: str, days: int = 100) -> list:
     """Get recent candles for a symbol"""
     supabase = get_supabase_client()
@@ -68,6 +111,159 @@ def get_candles_for_symbol(symbol: str, days: int = 100) -> list:
     # Return in chronological order
     return list(reversed(result.data))
 
+# PostgREST caps every response at max-rows (1000 on Supabase by default);
+# raise both together to cut round-trips further.
+BULK_PAGE_ROWS = 1000
+
+# Symbol groups fetched at once; long histories need one request per symbol
+# or more, so these overlap instead of running back to back
+BULK_WORKERS = int(os.getenv("BULK_WORKERS", "8"))
+
+def _candle_group_pages(group: List[str], days: int, page_rows: int) -> List[list]:
+    """Every page of one symbol group, continued with range paging while pages come back full"""
+    supabase = get_supabase_client()
+    pages = []
+    offset = 0
+    
+    while True:
+        result = supabase.rpc('get_recent_candles', {'symbols': group, 'n': days})\
+            .range(offset, offset + page_rows - 1)\
+            .execute()
+        pages.append(result.data)
+        
+        offset += page_rows
+        if len(result.data) < page_rows or offset >= len(group) * days:
+            return pages
+
+def iter_candle_pages(symbols: List[str], days: int = 100, page_rows: int = BULK_PAGE_ROWS,
+                      stats: Optional[Dict] = None, workers: int = BULK_WORKERS) -> Iterator[list]:
+    """
+    Yield pages of recent candles for many symbols via the get_recent_candles RPC.
+    
+    Symbols are grouped so each request stays within page_rows; a group that
+    still comes back truncated is continued with range paging. Up to
+    `workers` groups are fetched concurrently, at most 2 x workers ahead of
+    the consumer, and pages are yielded in group order. When a stats dict is
+    passed it is updated with round-trips, rows and payload bytes.
+    """
+    group_size = max(1, page_rows // days)
+    groups = [symbols[i:i + group_size] for i in range(0, len(symbols), group_size)]
+    workers = max(1, min(workers, len(groups)))
+    
+    queued = iter(groups)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque(pool.submit(_candle_group_pages, group, days, page_rows)
+                        for group in islice(queued, 2 * workers))
+        while pending:
+            pages = pending.popleft().result()
+            for group in islice(queued, 1):
+                pending.append(pool.submit(_candle_group_pages, group, days, page_rows))
+            
+            for page in pages:
+                if stats is not None:
+                    stats['round_trips'] = stats.get('round_trips', 0) + 1
+                    stats['rows'] = stats.get('rows', 0) + len(page)
+                    stats['bytes'] = stats.get('bytes', 0) + len(json.dumps(page))
+                yield page
+
+def get_candles_bulk(symbols: List[str], days: int = 100, page_rows: int = BULK_PAGE_ROWS,
+                     stats: Optional[Dict] = None) -> Dict[str, list]:
+    """Get recent candles for many symbols, chronologically ordered per symbol"""
+    if stats is None:
+        stats = {}
+    started = time.perf_counter()
+    
+    candles = {symbol: [] for symbol in symbols}
+    for page in iter_candle_pages(symbols, days=days, page_rows=page_rows, stats=stats):
+        for row in page:
+            candles.setdefault(row['symbol'], []).append(row)
+    
+    stats['elapsed'] = time.perf_counter() - started
+    print(f"Prefetched {stats.get('rows', 0)} candles for {len(symbols)} symbols in "
+          f"{stats.get('round_trips', 0)} round-trips, up to {BULK_WORKERS} at once, instead of {len(symbols)} "
+          f"({stats.get('bytes', 0) / 1024:.0f} KiB, {stats['elapsed']:.2f}s)")
+    return candles
+
+FUNDAMENTALS_COLUMNS = ('symbol', 'company_name', 'market_cap', 'roe', 'pe_ratio', 'pb_ratio', 'eps',
+                        'industry', 'sector', 'updated_at', 'meta')
+
+# Keyset order for fundamentals pages; idx_fundamentals_market_cap_symbol covers it.
+# Rows without a market cap come last (plain market_cap.desc put them first)
+FUNDAMENTALS_ORDER = 'market_cap.desc.nullslast,symbol.asc'
+
+def _postgrest_value(value) -> str:
+    """A filter value quoted for use inside a PostgREST or=(...) list"""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if isinstance(value, (int, float)):
+        return str(value)
+    return '"' + str(value).replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+def get_fundamentals_page(columns: str = '*', after: Optional[Tuple] = None, limit: int = 500,
+                          symbol: Optional[str] = None, sector: Optional[str] = None) -> list:
+    """
+    One page of fundamentals ordered by market cap (largest first, unknown
+    last), then symbol, starting after the (market_cap, symbol) of the last
+    row already seen. postgrest-py has no builders for a composite order or
+    an or=() filter, so both are added as raw query params.
+    """
+    supabase = get_supabase_client()
+    query = supabase.table('fundamentals').select(columns)
+    
+    if symbol:
+        query = query.eq('symbol', symbol)
+    if sector:
+        query = query.eq('sector', sector)
+    if after is not None:
+        market_cap, last_symbol = after
+        if market_cap is None:
+            query = query.is_('market_cap', 'null').gt('symbol', last_symbol)
+        else:
+            cap = _postgrest_value(market_cap)
+            query.params = query.params.add(
+                'or', f"(market_cap.lt.{cap},and(market_cap.eq.{cap},symbol.gt.{_postgrest_value(last_symbol)}),"
+                      f"market_cap.is.null)"
+            )
+    query.params = query.params.add('order', FUNDAMENTALS_ORDER)
+    
+    return query.limit(limit).execute().data
+
+def get_latest_scores(columns: str = 'symbol, date, combined_score') -> list:
+    """The stock_daily_scores rows of the most recent scored date"""
+    supabase = get_supabase_client()
+    latest = supabase.table('stock_daily_scores').select('date').order('date', desc=True).limit(1).execute().data
+    if not latest:
+        return []
+    return get_scores_for_date(latest[0]['date'], columns)
+
+def get_scores_for_date(score_date: str, columns: str = 'symbol, date, combined_score') -> list:
+    """Every stock_daily_scores row of one date"""
+    supabase = get_supabase_client()
+    rows = []
+    offset = 0
+    while True:
+        result = supabase.table('stock_daily_scores')\
+            .select(columns)\
+            .eq('date', score_date)\
+            .order('symbol')\
+            .range(offset, offset + 999)\
+            .execute()
+        rows.extend(result.data)
+        if len(result.data) < 1000:
+            return rows
+        offset += 1000
+
+def count_scores_for_date(score_date: str) -> int:
+    """Number of stock_daily_scores rows of one date that have a combined score"""
+    supabase = get_supabase_client()
+    result = supabase.table('stock_daily_scores')\
+        .select('symbol', count='exact')\
+        .eq('date', score_date)\
+        .not_.is_('combined_score', 'null')\
+        .limit(1)\
+        .execute()
+    return result.count or 0
+
 def insert_insight(insight_data: dict) -> dict:
     """Insert or update an insight"""
     supabase = get_supabase_client()
@@ -84,4 +280,186 @@ def upsert_stock_score(score_data: dict) -> dict:
     """Upsert stock daily score"""
     supabase = get_supabase_client()
     result = supabase.table('stock_daily_scores').upsert(score_data).execute()
+    notify_write('stock_daily_scores', [score_data])
+    return result
+
+def on_write(table: str, hook: Callable[[list], None]):
+    """Call hook(rows) after every successful upsert to table, e.g. to keep an in-process copy in sync"""
+    _write_hooks.setdefault(table, []).append(hook)
+
+def notify_write(table: str, rows: list):
+    for hook in _write_hooks.get(table, ()):
+        try:
+            hook(rows)
+        except Exception as e:
+            print(f"Write hook for {table} failed: {e}")
+
+INSIGHT_KEYS = ('symbol', 'insight_type_id', 'detected_on')
+SCORE_KEYS = ('symbol', 'date')
+CANDLE_KEYS = ('symbol', 'ts')
+
+def upsert_chunk(table: str, chunk: list, conflict_keys: Tuple[str, ...], retries: int = 3,
+                 backoff: float = 0.5, stats: Optional[Dict] = None) -> bool:
+    """
+    Upsert one chunk of rows, retrying with exponential backoff.
+    
+    When a stats dict is passed, rows, chunks, retries, failed_rows and
+    write_time are accumulated in it.
+    """
+    supabase = get_supabase_client()
+    stats = stats if stats is not None else {}
+    started = time.perf_counter()
+    written = False
+    
+    for attempt in range(retries + 1):
+        try:
+            supabase.table(table)\
+                .upsert(chunk, on_conflict=','.join(conflict_keys))\
+                .execute()
+            stats['rows'] = stats.get('rows', 0) + len(chunk)
+            stats['chunks'] = stats.get('chunks', 0) + 1
+            written = True
+            break
+        except Exception as e:
+            if attempt == retries:
+                print(f"Error writing {len(chunk)} rows to {table}: {e}")
+                stats['failed_rows'] = stats.get('failed_rows', 0) + len(chunk)
+                break
+            stats['retries'] = stats.get('retries', 0) + 1
+            time.sleep(backoff * 2 ** attempt)
+    
+    stats['write_time'] = stats.get('write_time', 0.0) + time.perf_counter() - started
+    if written:
+        notify_write(table, chunk)
+    return written
+
+class WriteBuffer:
+    """
+    Collects rows for one table and writes them as bulk upserts.
+    
+    Rows are keyed on the table's unique columns, so a later row for the same
+    key replaces the pending one instead of making the upsert touch a row
+    twice. The buffer flushes once it holds max_rows rows, and on close.
+    It has no timer of its own: the max_age threshold is checked when a row
+    is added and by flush_due(), which a long-running writer calls between
+    units of work so rows don't wait on a quiet stretch. Each chunk is
+    retried with exponential backoff before it is counted as failed.
+    """
+    
+    def __init__(self, table: str, conflict_keys: Tuple[str, ...], max_rows: int = 500,
+                 max_age: float = 5.0, retries: int = 3, backoff: float = 0.5):
+        self.table = table
+        self.conflict_keys = conflict_keys
+        self.max_rows = max_rows
+        self.max_age = max_age
+        self.retries = retries
+        self.backoff = backoff
+        self._pending: Dict[tuple, dict] = {}
+        self._oldest: Optional[float] = None
+        self.stats = {'rows': 0, 'chunks': 0, 'retries': 0, 'failed_rows': 0, 'write_time': 0.0}
+    
+    def add(self, row: dict):
+        if self._oldest is None:
+            self._oldest = time.monotonic()
+        self._pending[tuple(row[k] for k in self.conflict_keys)] = row
+        
+        if len(self._pending) >= self.max_rows:
+            self.flush()
+        else:
+            self.flush_due()
+    
+    def flush_due(self) -> bool:
+        """Flush if the oldest pending row is max_age seconds old; True if it did"""
+        if self._oldest is None or time.monotonic() - self._oldest < self.max_age:
+            return False
+        self.flush()
+        return True
+    
+    def extend(self, rows: list):
+        for row in rows:
+            self.add(row)
+    
+    def flush(self):
+        """Write every pending row, one upsert per max_rows chunk"""
+        rows = list(self._pending.values())
+        self._pending = {}
+        self._oldest = None
+        
+        for i in range(0, len(rows), self.max_rows):
+            self._write_chunk(rows[i:i + self.max_rows])
+    
+    def _write_chunk(self, chunk: list):
+        upsert_chunk(self.table, chunk, self.conflict_keys, self.retries, self.backoff, self.stats)
+    
+    @property
+    def rows_per_sec(self) -> float:
+        return self.stats['rows'] / self.stats['write_time'] if self.stats['write_time'] else 0.0
+    
+    def close(self) -> Dict:
+        self.flush()
+        if self.stats['chunks'] or self.stats['failed_rows']:
+            print(f"Wrote {self.stats['rows']} rows to {self.table} in {self.stats['chunks']} chunks "
+                  f"({self.rows_per_sec:.0f} rows/s, {self.stats['retries']} retries, "
+                  f"{self.stats['failed_rows']} failed)")
+        return self.stats
+    
+    def __enter__(self) -> 'WriteBuffer':
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+
+def insights_buffer(**kwargs) -> WriteBuffer:
+    """Write buffer for the insights table, keyed on (symbol, insight_type_id, detected_on)"""
+    return WriteBuffer('insights', INSIGHT_KEYS, **kwargs)
+
+def scores_buffer(**kwargs) -> WriteBuffer:
+    """Write buffer for stock_daily_scores, keyed on (symbol, date)"""
+    return WriteBuffer('stock_daily_scores', SCORE_KEYS, **kwargs)
+
+def insert_insights(insights: list) -> Dict:
+    """Upsert many insights in bulk, keyed on (symbol, insight_type_id, detected_on)"""
+    with insights_buffer() as buffer:
+        buffer.extend(insights)
+    return buffer.stats
+
+def upsert_stock_scores(scores: list) -> Dict:
+    """Upsert many stock daily scores in bulk, keyed on (symbol, date)"""
+    with scores_buffer() as buffer:
+        buffer.extend(scores)
+    return buffer.stats
+
+def upsert_stock_meta(rows: list) -> Dict:
+    """Upsert screened_stocks meta (e.g. resolved tokens) in bulk, keyed on symbol"""
+    with WriteBuffer('screened_stocks', ('symbol',)) as buffer:
+        buffer.extend(rows)
+    return buffer.stats
+
+def get_indicator_states(symbols: List[str], chunk_size: int = 500) -> Dict[str, dict]:
+    """Get stored indicator state rows for the given symbols"""
+    supabase = get_supabase_client()
+    states = {}
+    
+    for i in range(0, len(symbols), chunk_size):
+        result = supabase.table('indicator_state')\
+            .select('symbol, as_of, version, state')\
+            .in_('symbol', symbols[i:i + chunk_size])\
+            .execute()
+        for row in result.data:
+            states[row['symbol']] = row
+    
+    return states
+
+def upsert_indicator_states(rows: list) -> dict:
+    """Upsert indicator state rows keyed on symbol"""
+    supabase = get_supabase_client()
+    result = supabase.table('indicator_state').upsert(rows, on_conflict='symbol').execute()
+    return result
+
+def delete_indicator_states(symbols: List[str], chunk_size: int = 500) -> dict:
+    """Drop stored indicator state so the next scan recomputes from history"""
+    supabase = get_supabase_client()
+    result = None
+    for i in range(0, len(symbols), chunk_size):
+        result = supabase.table('indicator_state').delete().in_('symbol', symbols[i:i + chunk_size]).execute()
     return result
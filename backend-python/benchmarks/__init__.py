@@ -0,0 +1 @@
+# Offline benchmarks for the scanner and data paths
@@ -0,0 +1,83 @@
+"""
+Row building for a full candle backfill: the old DataFrame -> to_dict ->
+dict-rebuild path vs the chunked loader's column slices (PostgREST rows and
+binary COPY payloads), plus peak memory for one long history. Network time
+excluded.
+
+    python -m benchmarks.candle_loader [n_symbols] [bars]
+"""
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+
+from app.candle_loader import COLUMNS, CANDLE_CHUNK_ROWS, candle_columns, row_chunks, copy_chunks
+from .synthetic import generate_universe
+
+def fetched_frame(candles) -> pd.DataFrame:
+    """A frame shaped like ShoonyaClient.fetch_daily_data output"""
+    df = pd.DataFrame(candles).drop(columns=['symbol']).rename(columns={'ts': 'date'})
+    df['date'] = pd.to_datetime(df['date']).dt.date
+    return df
+
+def dict_rows(symbol: str, df: pd.DataFrame) -> int:
+    """The previous path: records, then a second dict per row for the upsert"""
+    rows = []
+    for candle in df.to_dict('records'):
+        rows.append({
+            'symbol': symbol,
+            'ts': candle['date'],
+            'open': candle['open'],
+            'high': candle['high'],
+            'low': candle['low'],
+            'close': candle['close'],
+            'volume': candle['volume']
+        })
+    return len(rows)
+
+def loader_rows(symbol: str, df: pd.DataFrame) -> int:
+    return sum(len([dict(zip(COLUMNS, row)) for row in chunk])
+               for chunk in row_chunks(symbol, candle_columns(df)))
+
+def copy_rows(symbol: str, df: pd.DataFrame) -> int:
+    return sum(rows for rows, _ in copy_chunks(symbol, candle_columns(df)))
+
+def timed(label: str, call, rows: int):
+    started = time.perf_counter()
+    built = call()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28} {elapsed * 1000:8.1f} ms  {rows / elapsed:10.0f} rows/s")
+    return built
+
+def peak_memory(call) -> float:
+    tracemalloc.start()
+    call()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1e6
+
+def main(n_symbols: int = 2190, bars: int = 500):
+    frames = {s: fetched_frame(c) for s, c in generate_universe(n_symbols, bars=bars).items()}
+    rows = sum(len(df) for df in frames.values())
+    print(f"Synthetic backfill: {n_symbols} symbols x {bars} bars ({rows} candles)")
+
+    old = timed("to_dict + dict rebuild", lambda: sum(dict_rows(s, df) for s, df in frames.items()), rows)
+    new = timed("column chunks -> rows", lambda: sum(loader_rows(s, df) for s, df in frames.items()), rows)
+    copied = timed("column chunks -> binary COPY", lambda: sum(copy_rows(s, df) for s, df in frames.items()), rows)
+
+    # One long history: the old path holds every row at once, the loader one chunk
+    long_bars = 50 * CANDLE_CHUNK_ROWS
+    long_df = pd.concat([next(iter(frames.values()))] * (long_bars // bars + 1)).iloc[:long_bars]
+    old_peak = peak_memory(lambda: dict_rows("LONG", long_df))
+    new_peak = peak_memory(lambda: loader_rows("LONG", long_df))
+    copy_peak = peak_memory(lambda: copy_rows("LONG", long_df))
+    print(f"Peak memory for {long_bars} bars: {old_peak:.1f} MB dict path, {new_peak:.1f} MB chunked rows, "
+          f"{copy_peak:.1f} MB binary COPY ({CANDLE_CHUNK_ROWS} rows per chunk)")
+
+    same = old == new == copied == rows
+    print(f"Row counts agree: {same}")
+    return 0 if same else 1
+
+if __name__ == "__main__":
+    sys.exit(main(*(int(a) for a in sys.argv[1:])))
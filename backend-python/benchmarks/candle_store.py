@@ -0,0 +1,62 @@
+"""
+Cold and warm full-universe reads from the local candle store, vs building
+the same panel from row dicts as the HTTP path does (network time excluded).
+
+    python -m benchmarks.candle_store [n_symbols] [bars]
+"""
+import os
+import sys
+import time
+import tempfile
+
+import numpy as np
+
+from app.candle_store import CandleStore
+from app.insights_engine.panel import CandlePanel, FIELDS
+from .synthetic import generate_universe
+
+def drop_page_cache(store: CandleStore, symbols):
+    """Ask the kernel to evict the store's files so the next read really is cold"""
+    for symbol in symbols:
+        fd = os.open(store.path(symbol), os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+
+def timed(label: str, call):
+    started = time.perf_counter()
+    result = call()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<34} {elapsed * 1000:8.1f} ms")
+    return result, elapsed
+
+def main(n_symbols: int = 2190, bars: int = 500):
+    universe = generate_universe(n_symbols, bars=bars)
+    symbols = list(universe)
+    rows = sum(len(c) for c in universe.values())
+    print(f"Synthetic universe: {n_symbols} symbols x {bars} bars ({rows} candles)")
+
+    with tempfile.TemporaryDirectory() as root:
+        store = CandleStore(root)
+        timed("write store", lambda: [store.merge(s, c) for s, c in universe.items()] and store.save_manifest())
+
+        expected, _ = timed("panel from row dicts", lambda: CandlePanel.from_candles(universe, bars=bars))
+
+        cold_store = CandleStore(root)
+        if hasattr(os, 'posix_fadvise'):
+            drop_page_cache(cold_store, symbols)
+        cold, cold_time = timed("cold panel read (open + map)", lambda: cold_store.panel(symbols, bars=bars))
+        warm, warm_time = timed("warm panel read (mapped)", lambda: cold_store.panel(symbols, bars=bars))
+        timed("warm column views, all symbols", lambda: [cold_store.columns(s) for s in symbols])
+        timed("warm 100-bar scan panel", lambda: cold_store.panel(symbols, bars=100))
+
+        same = all(np.array_equal(getattr(expected, f), getattr(warm, f), equal_nan=True) for f in FIELDS) and \
+            np.array_equal(expected.lengths, warm.lengths) and expected.last_ts == warm.last_ts
+        print(f"Cold/warm: {cold_time / warm_time:.1f}x; panels identical to the row-dict path: {same}")
+        print(f"Store stats: {cold_store.stats}")
+
+    return 0 if same else 1
+
+if __name__ == "__main__":
+    sys.exit(main(*(int(a) for a in sys.argv[1:])))
@@ -0,0 +1,109 @@
+"""
+GET /api/fundamentals over a growing table: the previous single query
+materialized and encoded in one response vs keyset pages streamed as
+NDJSON. Reports time (under tracemalloc) and peak Python memory; the page source decodes JSON
+per page like a PostgREST response, so only database time is left out.
+
+    python -m benchmarks.fundamentals_api [rows ...]
+"""
+import sys
+import json
+import time
+import asyncio
+import bisect
+import tracemalloc
+
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.fundamentals import stream_fundamentals, MAX_PAGE_SIZE
+
+def synthetic_fundamentals(n: int, seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    caps = rng.lognormal(24, 2, n).astype(np.int64)
+    caps[rng.random(n) < 0.05] = caps[0]  # ties on market cap
+    rows = []
+    for i in range(n):
+        rows.append({
+            'symbol': f"SYM{i:06d}",
+            'company_name': f"Synthetic Company {i} Limited",
+            'market_cap': None if i % 40 == 0 else int(caps[i]),
+            'roe': float(rng.normal(0.15, 0.1)),
+            'pe_ratio': float(rng.lognormal(3, 0.5)),
+            'pb_ratio': float(rng.lognormal(1, 0.5)),
+            'eps': float(rng.normal(20, 15)),
+            'industry': 'Industry',
+            'sector': 'Sector',
+            'updated_at': '2024-12-31T00:00:00+00:00',
+            'meta': {'dividend_yield': 0.01, 'book_value': 120.5, 'price_to_sales': 3.2}
+        })
+    return rows
+
+def order_key(market_cap, symbol):
+    """market_cap desc nulls last, symbol asc"""
+    return (market_cap is None, -(market_cap or 0), symbol)
+
+class KeysetTable:
+    """In-memory stand-in for get_fundamentals_page over sorted rows"""
+
+    def __init__(self, rows: list):
+        self.encoded = [json.dumps(row) for row in sorted(rows, key=lambda r: order_key(r['market_cap'], r['symbol']))]
+        self.keys = [order_key(r['market_cap'], r['symbol']) for r in map(json.loads, self.encoded)]
+        self.requests = 0
+
+    def all(self) -> list:
+        self.requests += 1
+        return json.loads('[' + ','.join(self.encoded) + ']')
+
+    def page(self, columns, after, limit, symbol=None, sector=None) -> list:
+        self.requests += 1
+        start = bisect.bisect_right(self.keys, order_key(*after)) if after else 0
+        return json.loads('[' + ','.join(self.encoded[start:start + limit]) + ']')
+
+def measure(call):
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = call()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / 1e6
+
+def previous(table: KeysetTable) -> bytes:
+    return JSONResponse(content=jsonable_encoder(table.all())).body
+
+def streamed(table: KeysetTable) -> bytes:
+    async def consume():
+        size, lines = 0, []
+        async for chunk in stream_fundamentals(fetch_page=table.page):
+            size += len(chunk)
+            lines.append(chunk.count(b'\n'))
+        return size, sum(lines)
+    return asyncio.run(consume())
+
+def paged(table: KeysetTable, limit: int = 500) -> list:
+    symbols, after = [], None
+    while True:
+        rows = table.page('*', after, limit)
+        symbols += [row['symbol'] for row in rows]
+        if len(rows) < limit:
+            return symbols
+        after = (rows[-1]['market_cap'], rows[-1]['symbol'])
+
+def main(*sizes: int):
+    ok = True
+    for n in sizes or (2190, 20000, 100000):
+        table = KeysetTable(synthetic_fundamentals(n))
+        body, old_time, old_peak = measure(lambda: previous(table))
+        (size, lines), new_time, new_peak = measure(lambda: streamed(table))
+        print(f"{n:>7} rows: one response {old_time * 1000:7.0f} ms, peak {old_peak:6.1f} MB | "
+              f"NDJSON stream {new_time * 1000:7.0f} ms, peak {new_peak:5.1f} MB ({size / 1e6:.1f} MB sent, "
+              f"{-(-n // MAX_PAGE_SIZE)} pages)")
+        expected = [row['symbol'] for row in json.loads(body)]
+        ok &= lines == n and paged(table) == expected
+    print(f"Streamed and paged rows match the single response, in order, across ties and NULL caps: {ok}")
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main(*(int(a) for a in sys.argv[1:])))
@@ -0,0 +1,65 @@
+"""
+Thirty days of daily fundamentals refreshes over the EQUITY_L universe,
+simulated offline: the staleness-aware plan vs refetching every symbol.
+Some symbols have empty fields and a few always fail, so the NULL_TTL and
+error backoff paths are exercised.
+
+    python -m benchmarks.fundamentals_refresh [days]
+"""
+import os
+import sys
+import random
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+from app.fundamentals import load_equity_list
+from app.fundamentals_loader import ErrorLedger
+from app.fundamentals_refresh import build_refresh_plan
+
+# Pooled loader throughput against the stub (benchmarks.fundamentals_loader)
+SYMBOLS_PER_MIN = 220
+
+def main(days: int = 30):
+    symbols = load_equity_list(os.path.join(os.path.dirname(os.path.dirname(__file__)), "EQUITY_L.csv"))
+    rng = random.Random(0)
+    no_pe = set(rng.sample(symbols, len(symbols) // 10))
+    failing = set(rng.sample(symbols, len(symbols) // 50))
+    watchlist = symbols[:25]
+    start = datetime(2024, 1, 1, 18, 0, tzinfo=timezone.utc)
+
+    with tempfile.TemporaryDirectory() as root:
+        ledger = ErrorLedger(os.path.join(root, "errors.json"))
+        state = {}
+        fetched_per_day = []
+        for day in range(days):
+            now = start + timedelta(days=day)
+            plan = build_refresh_plan(symbols, state, watchlist=watchlist, ledger=ledger, now=now)
+            assert plan.to_fetch[:len(watchlist)] == watchlist or day > 0
+            for symbol in plan.to_fetch:
+                if symbol in failing:
+                    ledger.record(symbol, "404 Not Found", now)
+                    continue
+                ledger.clear(symbol)
+                state[symbol] = {
+                    'symbol': symbol, 'updated_at': now.isoformat(), 'market_cap': rng.randint(1, 10 ** 6),
+                    'pe_ratio': None if symbol in no_pe else 20.0, 'pb_ratio': 2.0, 'eps': 5.0, 'roe': 0.1,
+                    'meta': {}, 'company_name': symbol, 'industry': 'x', 'sector': 'y'
+                }
+            fetched_per_day.append(len(plan.to_fetch))
+            if day < 3 or day % 5 == 0:
+                summary = plan.summary()
+                print(f"day {day:2d}: fetch {summary['to_fetch']:4d}, fresh {summary['fresh']:4d}, "
+                      f"backing off {summary['backing_off']:3d} ({summary['avoided_pct']:g}% avoided)")
+
+    full = len(symbols) * days
+    staleness = sum(fetched_per_day)
+    steady = fetched_per_day[1:]
+    print(f"{days} daily refreshes of {len(symbols)} symbols: {staleness} fetches vs {full} "
+          f"({100 * (1 - staleness / full):.0f}% avoided)")
+    print(f"After the first load: {sum(steady) / len(steady):.0f} fetches/day, peak {max(steady)} "
+          f"(~{sum(steady) / len(steady) / SYMBOLS_PER_MIN:.1f} min vs ~{len(symbols) / SYMBOLS_PER_MIN:.1f} min "
+          f"for a full refresh)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(*(int(a) for a in sys.argv[1:])))
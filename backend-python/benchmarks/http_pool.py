@@ -0,0 +1,99 @@
+"""
+Per-call connection setup: a fresh connection per request (the old
+requests.post / yf.Ticker pattern) vs the pooled keep-alive sessions,
+against a local HTTPS server with a self-signed certificate. Reports
+requests/s, connections opened and the share of request time spent in
+TCP + TLS handshakes. Over the internet each handshake also costs two to
+three round trips, so the gap widens with distance to the vendor.
+
+    python -m benchmarks.http_pool [requests] [threads]
+"""
+import os
+import ssl
+import sys
+import time
+import tempfile
+import threading
+import subprocess
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from app.http_pool import PooledSession, http_stats, reset_http_stats
+
+BODY = b'{"stat": "Ok", "lp": "2450.35", "v": "1234567"}'
+
+class QuoteHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+class TLSServer(ThreadingHTTPServer):
+    """Handshakes on each connection's own thread, so they do not queue behind accept()"""
+
+    daemon_threads = True
+    context: ssl.SSLContext = None
+
+    def finish_request(self, request, client_address):
+        super().finish_request(self.context.wrap_socket(request, server_side=True), client_address)
+
+def serve_https(root: str) -> ThreadingHTTPServer:
+    cert, key = os.path.join(root, 'cert.pem'), os.path.join(root, 'key.pem')
+    subprocess.run(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1', '-subj', '/CN=localhost',
+                    '-keyout', key, '-out', cert], check=True, capture_output=True)
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+    server = TLSServer(('127.0.0.1', 0), QuoteHandler)
+    server.context = context
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def run(label: str, call, requests_made: int, threads: int):
+    reset_http_stats()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(lambda _: call(), range(requests_made)))
+    elapsed = time.perf_counter() - started
+    stats = http_stats()['127.0.0.1']
+    print(f"{label:<26} {requests_made / elapsed:8.0f} req/s  {stats['connections']:5d} connections  "
+          f"{stats['reuse_pct']:5.1f}% reused  {stats['handshake_ms']:5.2f} ms/handshake  "
+          f"{stats['handshake_share_pct']:5.1f}% of request time in handshakes")
+    return stats
+
+def main(requests_made: int = 2000, threads: int = 8):
+    warnings.filterwarnings('ignore')  # self-signed certificate
+    with tempfile.TemporaryDirectory() as root:
+        server = serve_https(root)
+        url = f"https://127.0.0.1:{server.server_port}/GetQuotes"
+        data = {'uid': 'USER', 'token': '2885', 'exch': 'NSE'}
+
+        def fresh():
+            with PooledSession() as session:
+                return session.post(url, data=data, verify=False).json()
+
+        pooled_session = PooledSession(pool_size=threads)
+
+        def pooled():
+            return pooled_session.post(url, data=data, verify=False).json()
+
+        print(f"{requests_made} quote requests on {threads} threads against a local HTTPS server")
+        old = run("fresh connection per call", fresh, requests_made, threads)
+        new = run("pooled keep-alive session", pooled, requests_made, threads)
+        server.shutdown()
+
+    print(f"Connections opened: {old['connections']} -> {new['connections']} (at most {threads} per host); "
+          f"request time {old['request_ms']:.2f} -> {new['request_ms']:.2f} ms")
+    return 0 if new['connections'] <= threads else 1
+
+if __name__ == "__main__":
+    sys.exit(main(*(int(a) for a in sys.argv[1:])))
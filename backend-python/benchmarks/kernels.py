@@ -0,0 +1,95 @@
+"""
+Fused indicator kernel vs `ta`/pandas per symbol and vs one NumPy pass per indicator.
+
+    python -m benchmarks.kernels [n_symbols] [bars]
+"""
+import sys
+import time
+import warnings
+
+import numpy as np
+import ta
+
+from app.insights_engine import panel as pnl
+from app.insights_engine.kernels import fused_indicators
+from app.insights_engine.panel import CandlePanel
+from app.scanner import candles_to_frame
+from .synthetic import generate_universe
+
+TOLERANCE = 1e-9
+
+def reference(df) -> dict:
+    """The same indicators through `ta` and pandas rolling windows, one Series each"""
+    macd = ta.trend.MACD(df['close'], window_slow=26, window_fast=12, window_sign=9)
+    return {
+        'ema(12)': ta.trend.EMAIndicator(df['close'], window=12).ema_indicator(),
+        'ema(26)': ta.trend.EMAIndicator(df['close'], window=26).ema_indicator(),
+        'macd(12,26)': macd.macd(),
+        'macd_signal(12,26,9)': macd.macd_signal(),
+        'rsi(14)': ta.momentum.RSIIndicator(df['close'], window=14).rsi(),
+        'rolling_max(high,20)': df['high'].rolling(window=20).max(),
+        'rolling_mean(volume,20)': df['volume'].rolling(window=20).mean(),
+        'bollinger_width(20,2)': ta.volatility.BollingerBands(df['close'], window=20,
+                                                               window_dev=2).bollinger_wband(),
+    }
+
+def separate(panel: CandlePanel) -> dict:
+    """One NumPy pass per indicator, as the feature store computed them before the kernel"""
+    macd = pnl.ema(panel.close, 12) - pnl.ema(panel.close, 26)
+    return {
+        'ema(12)': pnl.ema(panel.close, 12),
+        'ema(26)': pnl.ema(panel.close, 26),
+        'macd(12,26)': macd,
+        'macd_signal(12,26,9)': pnl.ewm_mean(macd, pnl.span_to_alpha(9), min_periods=9),
+        'rsi(14)': pnl.rsi(panel.close, 14),
+        'rolling_max(high,20)': pnl.rolling_max(panel.high, 20),
+        'rolling_mean(volume,20)': pnl.rolling_mean(panel.volume, 20),
+    }
+
+def max_error(expected: np.ndarray, actual: np.ndarray) -> float:
+    """Largest relative difference, requiring NaNs in the same places"""
+    if not np.array_equal(np.isnan(expected), np.isnan(actual)):
+        return float('inf')
+    observed = ~np.isnan(expected)
+    if not observed.any():
+        return 0.0
+    scale = np.maximum(np.abs(expected[observed]), 1.0)
+    return float((np.abs(expected[observed] - actual[observed]) / scale).max())
+
+def main(n_symbols: int = 2190, bars: int = 100):
+    warnings.simplefilter('ignore')
+    universe = generate_universe(n_symbols, bars=bars)
+    panel = CandlePanel.from_candles(universe, bars=bars)
+    frames = {symbol: candles_to_frame(candles) for symbol, candles in universe.items()}
+    print(f"Synthetic universe: {n_symbols} symbols x {bars} bars")
+
+    started = time.perf_counter()
+    expected = {symbol: reference(df) for symbol, df in frames.items()}
+    ta_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    separate(panel)
+    separate_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    fused = fused_indicators(panel.close, panel.high, panel.volume)
+    fused_time = time.perf_counter() - started
+
+    print(f"ta/pandas per symbol:   {ta_time:.2f}s")
+    print(f"NumPy per indicator:    {separate_time * 1000:.1f} ms (without Bollinger width)")
+    print(f"Fused kernel:           {fused_time * 1000:.1f} ms ({ta_time / fused_time:.0f}x vs ta)")
+
+    failed = False
+    for key, values in fused.items():
+        error = max(
+            max_error(np.pad(expected[symbol][key].to_numpy(dtype=np.float64),
+                             (bars - len(frames[symbol]), 0), constant_values=np.nan), values[i])
+            for i, symbol in enumerate(panel.symbols)
+        )
+        failed |= error > TOLERANCE
+        print(f"  {key:<26} max relative error vs ta {error:.2e}")
+
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main(*(int(a) for a in sys.argv[1:])))
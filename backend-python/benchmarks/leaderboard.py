@@ -0,0 +1,110 @@
+"""
+Top-50 bullish/bearish lookups from the leaderboard vs the previous way of
+answering them: decoding every stock_daily_scores row of the day (as a
+PostgREST response) and sorting it. Also times the write hook applying a
+scanner run's scores, rescoring, and the snapshot save/restore for
+LEADERBOARD_DAYS dates; results are checked against sorted().
+
+    python -m benchmarks.leaderboard [n_symbols] [days]
+"""
+import os
+import sys
+import json
+import time
+import tempfile
+
+import numpy as np
+
+from app.leaderboard import Leaderboard
+
+SECTORS = ['Technology', 'Financial Services', 'Energy', 'Utilities', 'Healthcare', 'Industrials',
+           'Consumer Cyclical', 'Consumer Defensive', 'Basic Materials', 'Real Estate', 'Communication Services']
+
+def synthetic_scores(symbols, score_date: str, rng) -> list:
+    rows = []
+    for symbol in symbols:
+        insights = [{'type': 'RSI_OVERSOLD', 'score': 0.6, 'weight': 1.0, 'signal_type': 'BUY'}] * int(rng.integers(1, 4))
+        rows.append({'symbol': symbol, 'date': score_date, 'combined_score': round(float(rng.normal(0, 0.4)), 4),
+                     'details': {'insights': insights}})
+    return rows
+
+def percentiles(samples) -> str:
+    ms = np.array(samples) * 1000
+    return f"p50 {np.percentile(ms, 50):8.3f} ms  p99 {np.percentile(ms, 99):8.3f} ms"
+
+def expected(rows, sectors, side: str, sector=None, limit: int = 50) -> list:
+    picked = [r for r in rows if sector is None or sectors[r['symbol']] == sector]
+    if side == 'bullish':
+        picked = sorted((r for r in picked if r['combined_score'] > 0), key=lambda r: (r['combined_score'], r['symbol']),
+                        reverse=True)
+    else:
+        picked = sorted((r for r in picked if r['combined_score'] < 0), key=lambda r: (r['combined_score'], r['symbol']))
+    return [r['symbol'] for r in picked[:limit]]
+
+def main(n_symbols: int = 2190, days: int = 30):
+    rng = np.random.default_rng(0)
+    symbols = [f"SYM{i:05d}" for i in range(n_symbols)]
+    sectors = {symbol: SECTORS[int(rng.integers(0, len(SECTORS)))] for symbol in symbols}
+    dates = [f"2024-{11 + d // 28:02d}-{1 + d % 28:02d}" for d in range(days)]
+    runs = {score_date: synthetic_scores(symbols, score_date, rng) for score_date in dates}
+
+    root = tempfile.mkdtemp()
+    board = Leaderboard(os.path.join(root, 'leaderboard.json'), days=days,
+                        sectors=lambda batch: {s: sectors[s] for s in batch}, save_interval=float('inf'))
+
+    applied = []
+    for score_date in dates:
+        rows = runs[score_date]
+        started = time.perf_counter()
+        for offset in range(0, len(rows), 500):
+            board.update(rows[offset:offset + 500])
+        applied.append(time.perf_counter() - started)
+    print(f"Write hook, {n_symbols} scores per scanner run in chunks of 500: {percentiles(applied)} per run")
+
+    latest = dates[-1]
+    body = json.dumps(runs[latest])
+    print(f"{latest}: {n_symbols} rows, {len(body) / 1024:.0f} KB as a PostgREST response")
+
+    def previous(side, sector):
+        rows = json.loads(body)
+        return expected(rows, sectors, side, sector)
+
+    lookups = [(side, sector) for side in ('bullish', 'bearish') for sector in [None] + SECTORS[:3]] * 25
+    old, new = [], []
+    ok = True
+    for side, sector in lookups:
+        started = time.perf_counter()
+        want = previous(side, sector)
+        old.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        got = board.top(latest, side, sector, 50)
+        new.append(time.perf_counter() - started)
+        ok &= [row['symbol'] for row in got['rows']] == want
+    print(f"Top 50, fetch and sort the day's rows:     {percentiles(old)}")
+    print(f"Top 50 from the leaderboard:               {percentiles(new)}")
+
+    rescored = [dict(row, combined_score=round(float(rng.normal(0, 0.4)), 4)) for row in runs[latest][:200]]
+    started = time.perf_counter()
+    board.update(rescored)
+    elapsed = time.perf_counter() - started
+    current = {row['symbol']: row for row in runs[latest]}
+    current.update({row['symbol']: row for row in rescored})
+    ok &= [row['symbol'] for row in board.top(latest, 'bullish')['rows']] == \
+        expected(list(current.values()), sectors, 'bullish')
+    print(f"Rescoring 200 symbols: {elapsed * 1000:.2f} ms")
+
+    started = time.perf_counter()
+    board.save()
+    saved = time.perf_counter() - started
+    started = time.perf_counter()
+    restored = Leaderboard(board.path, days=days, sectors=lambda batch: {}, counts=lambda score_date: n_symbols)
+    loaded = time.perf_counter() - started
+    ok &= all(restored.top(d, side)['rows'] == board.top(d, side)['rows'] for d in dates for side in ('bullish', 'bearish'))
+    print(f"Snapshot of {days} dates: {os.path.getsize(board.path) / 1024:.0f} KB, "
+          f"saved in {saved * 1000:.0f} ms, restored in {loaded * 1000:.0f} ms")
+
+    print(f"Leaderboard matches sorted(), after rescoring and after a restart: {ok}")
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main(*(int(a) for a in sys.argv[1:])))
@@ -0,0 +1,113 @@
+"""
+Streaming quotes: tick application rate by batch size, end-to-end ticks/s
+and latency through QuoteStream on a synthetic feed (burst and paced), a
+record/replay round trip, and 1/5/15-minute bars checked against a pandas
+resample of the same ticks. Compared with polling GetQuotes one symbol per
+request under the shared Shoonya rate limit.
+
+    python -m benchmarks.market_feed [n_symbols] [ticks] [paced_ticks_per_sec]
+"""
+import os
+import sys
+import time
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from app.market_feed import QuoteStream, SyntheticFeed, ReplayFeed, TickRecorder, BAR_INTERVALS
+
+SHOONYA_REQUESTS_PER_SEC = 5.0
+START = 1735097400.0  # 2024-12-25 03:30 UTC (09:00 IST)
+
+# Feed-time rate of the generated ticks, slow enough for 15-minute bars to close
+FEED_RATE = 250.0
+
+def symbols_for(n: int):
+    return [f"SYM{i:04d}" for i in range(n)]
+
+def generate(symbols, ticks: int):
+    feed = SyntheticFeed(ticks=ticks, ticks_per_sec=FEED_RATE, speed=0, start=START)
+    return [tick for chunk in feed.ticks(symbols) for tick in chunk]
+
+def apply_rate(ticks, batch: int) -> float:
+    stream = QuoteStream(SyntheticFeed(ticks=0))
+    stamped = [tick + (0.0,) for tick in ticks]
+    started = time.perf_counter()
+    for offset in range(0, len(stamped), batch):
+        stream.apply(stamped[offset:offset + batch])
+    return len(stamped) / (time.perf_counter() - started)
+
+def run_stream(symbols, feed):
+    stream = QuoteStream(feed)
+    started = time.perf_counter()
+    stream.start(symbols)
+    stream.drain()
+    elapsed = time.perf_counter() - started
+    stream.stop()
+    return stream, elapsed
+
+def expected_bars(ticks, minutes: int) -> pd.DataFrame:
+    """The same bars from a pandas resample; per-tick quantity from cumulative volume"""
+    df = pd.DataFrame(ticks, columns=['symbol', 'ts', 'price', 'volume'])
+    df['traded'] = df.groupby('symbol')['volume'].diff().fillna(0)
+    df['start'] = (df['ts'] // (minutes * 60)) * minutes * 60
+    return df.groupby(['symbol', 'start']).agg(
+        open=('price', 'first'), high=('price', 'max'), low=('price', 'min'),
+        close=('price', 'last'), volume=('traded', 'sum')
+    )
+
+def bars_match(stream: QuoteStream, ticks, symbols) -> bool:
+    for minutes in BAR_INTERVALS:
+        expected = expected_bars(ticks, minutes)
+        for symbol in symbols[:50]:
+            got = stream.bars(symbol, minutes, limit=10 ** 6)
+            want = expected.loc[symbol]
+            if len(got) != len(want):
+                return False
+            values = np.array([[b['open'], b['high'], b['low'], b['close'], b['volume']] for b in got])
+            if not np.allclose(values, want.to_numpy()):
+                return False
+    return True
+
+def main(n_symbols: int = 500, ticks: int = 500000, paced_rate: int = 20000):
+    symbols = symbols_for(n_symbols)
+    generated = generate(symbols, ticks)
+    print(f"Synthetic feed: {n_symbols} symbols, {ticks} ticks over "
+          f"{(generated[-1][1] - generated[0][1]) / 60:.0f} minutes of feed time")
+
+    for batch in (1, 100, 5000):
+        print(f"apply, batches of {batch:<5}   {apply_rate(generated[:min(ticks, 50000 if batch == 1 else ticks)], batch):12.0f} ticks/s")
+
+    stream, elapsed = run_stream(symbols, SyntheticFeed(ticks=ticks, ticks_per_sec=FEED_RATE, speed=0, start=START))
+    summary = stream.summary()
+    print(f"Burst through QuoteStream:  {ticks / elapsed:12.0f} ticks/s end to end "
+          f"(mean batch {ticks / summary['batches']:.0f}, p99 latency {summary['latency_ms']['p99']:.1f} ms)")
+    correct = bars_match(stream, generated, symbols)
+
+    paced_ticks = paced_rate * 5
+    paced, elapsed = run_stream(symbols, SyntheticFeed(ticks=paced_ticks, ticks_per_sec=paced_rate, speed=1, start=START))
+    latency = paced.summary()['latency_ms']
+    print(f"Paced at {paced_rate} ticks/s:     {paced_ticks / elapsed:12.0f} ticks/s, latency p50 "
+          f"{latency['p50']:.2f} ms, p99 {latency['p99']:.2f} ms, max {latency['max']:.2f} ms")
+
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, 'ticks.csv')
+        recorder = TickRecorder(path)
+        for tick in generated:
+            recorder.write(*tick)
+        recorder.close()
+        replayed, elapsed = run_stream(symbols, ReplayFeed(path, speed=0))
+        replay_same = all(
+            replayed.bars(s, m, 10 ** 6) == stream.bars(s, m, 10 ** 6) for s in symbols[:50] for m in BAR_INTERVALS
+        )
+        print(f"Replay from CSV:            {ticks / elapsed:12.0f} ticks/s, bars identical to live run: {replay_same}")
+
+    cycle = n_symbols / SHOONYA_REQUESTS_PER_SEC
+    print(f"Polling GetQuotes for {n_symbols} symbols at {SHOONYA_REQUESTS_PER_SEC:g} req/s: each quote refreshed every "
+          f"{cycle:.0f} s ({SHOONYA_REQUESTS_PER_SEC:g} quotes/s)")
+    print(f"Bars match pandas resample: {correct}")
+    return 0 if correct and replay_same else 1
+
+if __name__ == "__main__":
+    sys.exit(main(*(int(a) for a in sys.argv[1:])))
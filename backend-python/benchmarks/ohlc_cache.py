@@ -0,0 +1,103 @@
+"""
+Repeat chart loads of /api/ohlc from the candle store: the previous
+per-row dict rebuild and JSON encoding on every request vs the cached
+encoded body (200) and ETag revalidation (304), plus the cost of a cache
+miss for the row and columnar layouts and their payload sizes.
+
+    python -m benchmarks.ohlc_cache [n_symbols] [bars] [requests]
+"""
+import os
+import sys
+import json
+import time
+import tempfile
+
+import numpy as np
+
+def percentiles(samples) -> str:
+    ms = np.array(samples) * 1000
+    return f"p50 {np.percentile(ms, 50):7.3f} ms  p99 {np.percentile(ms, 99):7.3f} ms"
+
+def timed(label: str, call, requests: list):
+    samples = []
+    for request in requests:
+        started = time.perf_counter()
+        call(*request)
+        samples.append(time.perf_counter() - started)
+    print(f"{label:<34} {percentiles(samples)}")
+
+def main(n_symbols: int = 200, bars: int = 750, n_requests: int = 2000):
+    root = tempfile.mkdtemp()
+    os.environ["CANDLE_STORE_DIR"] = root
+
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from app.candle_store import get_candle_store
+    from app.ohlc_cache import cached_ohlc, ohlc_response, get_ohlc_cache
+    from .synthetic import generate_universe
+
+    store = get_candle_store()
+    for symbol, candles in generate_universe(n_symbols, bars=bars).items():
+        store.merge(symbol, candles)
+    symbols = store.symbols()
+    rng = np.random.default_rng(0)
+    requests = [(symbols[i], None, None) for i in rng.integers(0, len(symbols), n_requests)]
+    print(f"{n_requests} chart loads over {n_symbols} symbols x {bars} bars from the candle store")
+
+    def previous(symbol, from_date, to_date):
+        rows = store.candles(symbol, from_date, to_date)
+        data = []
+        for row in rows:
+            data.append({
+                'time': row['ts'],
+                'open': row['open'],
+                'high': row['high'],
+                'low': row['low'],
+                'close': row['close'],
+                'volume': row['volume']
+            })
+        return JSONResponse(content=jsonable_encoder(data))
+
+    def miss(layout):
+        def call(symbol, from_date, to_date):
+            get_ohlc_cache().invalidate(symbol)
+            return ohlc_response(cached_ohlc(symbol, from_date, to_date, 'store', layout))
+        return call
+
+    def hit(symbol, from_date, to_date):
+        return ohlc_response(cached_ohlc(symbol, from_date, to_date, 'store', 'rows'))
+
+    def revalidate(symbol, from_date, to_date):
+        etag = cached_ohlc(symbol, from_date, to_date, 'store', 'rows').etag
+        return ohlc_response(cached_ohlc(symbol, from_date, to_date, 'store', 'rows'), etag)
+
+    timed("previous: rows rebuilt per request", previous, requests)
+    timed("cache miss, rows layout", miss('rows'), requests[:500])
+    timed("cache miss, columns layout", miss('columns'), requests[:500])
+    for symbol in symbols:
+        cached_ohlc(symbol, None, None, 'store', 'rows')
+    timed("repeat load, cached body (200)", hit, requests)
+    timed("repeat load, If-None-Match (304)", revalidate, requests)
+
+    symbol = symbols[0]
+    old = json.loads(previous(symbol, None, None).body)
+    rows = json.loads(cached_ohlc(symbol, None, None, 'store', 'rows').body)
+    columns_body = cached_ohlc(symbol, None, None, 'store', 'columns').body
+    columns = json.loads(columns_body)
+    same = rows == old and [dict(zip(columns, values)) for values in zip(*columns.values())] == old
+
+    # A write to the symbol's file must change the response and its ETag
+    etag = cached_ohlc(symbol, None, None, 'store', 'rows').etag
+    last = store.candles(symbol)[-1]
+    store.merge(symbol, [{**last, 'close': last['close'] + 1}])
+    fresh = cached_ohlc(symbol, None, None, 'store', 'rows')
+    invalidated = fresh.etag != etag and json.loads(fresh.body)[-1]['close'] == last['close'] + 1
+
+    rows_size = len(json.dumps(old, separators=(',', ':')))
+    print(f"Payload for {len(old)} bars: {rows_size / 1024:.0f} KB rows, {len(columns_body) / 1024:.0f} KB columns")
+    print(f"Cache: {get_ohlc_cache().summary()}")
+    print(f"Rows and columns match the previous response: {same}; a store write changes the ETag: {invalidated}")
+    return 0 if same and invalidated else 1
+
+if __name__ == "__main__":
+    sys.exit(main(*(int(a) for a in sys.argv[1:])))
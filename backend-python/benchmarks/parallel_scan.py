@@ -0,0 +1,39 @@
+"""
+Process-pool scan scaling over a synthetic universe.
+
+    python -m benchmarks.parallel_scan [n_symbols] [chunk_size]
+"""
+import asyncio
+import os
+import sys
+import time
+import warnings
+
+from app.parallel_scanner import scan_chunk, scan_parallel
+from .synthetic import generate_universe
+
+async def main(n_symbols: int = 2190, chunk_size: int = 100):
+    warnings.simplefilter('ignore')
+    universe = generate_universe(n_symbols)
+    symbols = list(universe)
+    cpus = os.cpu_count() or 1
+    print(f"Synthetic universe: {n_symbols} symbols x 100 bars, {cpus} CPUs, chunk_size={chunk_size}")
+    
+    started = time.perf_counter()
+    baseline = scan_chunk(symbols, universe)
+    single = time.perf_counter() - started
+    print(f"In-process:  {single:.2f}s")
+    
+    workers = 1
+    while True:
+        scan = await scan_parallel(symbols, workers=workers, chunk_size=chunk_size,
+                                   candles_by_symbol=universe)
+        assert len(scan['results']) == len(baseline['results'])
+        print(f"{workers:>2} workers: {scan['elapsed']:.2f}s, speed-up {single / scan['elapsed']:.2f}x, "
+              f"efficiency {single / scan['elapsed'] / workers:.0%}")
+        if workers >= cpus:
+            break
+        workers = min(workers * 2, cpus)
+
+if __name__ == "__main__":
+    asyncio.run(main(*(int(a) for a in sys.argv[1:])))
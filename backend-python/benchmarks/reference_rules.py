@@ -0,0 +1,148 @@
+"""
+The insight rules as first written, one symbol at a time with pandas and ta.
+Production evaluates them through the panel path (run_panel); these are
+kept as the reference the panel scan is checked against.
+"""
+import numpy as np
+import pandas as pd
+import ta
+from typing import Optional, Dict
+
+from app.insights_engine.indicators import rsi as rsi_rules
+from app.insights_engine.indicators import ema_cross as ema_cross_rules
+from app.insights_engine.indicators import macd as macd_rules
+from app.insights_engine.patterns import breakout as breakout_rules
+from app.insights_engine.patterns import bollinger_squeeze as bollinger_squeeze_rules
+from app.insights_engine.patterns import cup_handle as cup_handle_rules
+
+def rsi(df: pd.DataFrame, symbol: str, meta: dict) -> Optional[Dict]:
+    """
+    RSI Oversold/Overbought indicator
+    Returns BUY signal when RSI < 30 (oversold)
+    Returns SELL signal when RSI > 70 (overbought)
+    """
+    if len(df) < 14:  # Need at least 14 periods for RSI
+        return None
+    
+    # Calculate RSI
+    rsi = ta.momentum.RSIIndicator(df['close'], window=14).rsi()
+    
+    latest_rsi = rsi.iloc[-1]
+    latest_close = df['close'].iloc[-1]
+    
+    if pd.isna(latest_rsi):
+        return None
+    
+    return rsi_rules.signal(latest_rsi, latest_close)
+
+def ema_cross(df: pd.DataFrame, symbol: str, meta: dict) -> Optional[Dict]:
+    """
+    EMA Crossover indicator
+    Returns BUY signal when short EMA crosses above long EMA
+    Returns SELL signal when short EMA crosses below long EMA
+    """
+    if len(df) < 50:  # Need enough data for 50-period EMA
+        return None
+    
+    # Calculate EMAs
+    ema_12 = ta.trend.EMAIndicator(df['close'], window=12).ema_indicator()
+    ema_26 = ta.trend.EMAIndicator(df['close'], window=26).ema_indicator()
+    
+    # Check for crossover
+    current_12 = ema_12.iloc[-1]
+    current_26 = ema_26.iloc[-1]
+    prev_12 = ema_12.iloc[-2]
+    prev_26 = ema_26.iloc[-2]
+    
+    if pd.isna(current_12) or pd.isna(current_26) or pd.isna(prev_12) or pd.isna(prev_26):
+        return None
+    
+    latest_close = df['close'].iloc[-1]
+    
+    return ema_cross_rules.signal(prev_12, prev_26, current_12, current_26, latest_close)
+
+def macd(df: pd.DataFrame, symbol: str, meta: dict) -> Optional[Dict]:
+    """
+    MACD Bullish indicator
+    Returns BUY signal when the MACD line crosses above its signal line
+    """
+    if len(df) < 35:  # Need 26 bars for MACD plus 9 for its signal line
+        return None
+
+    # Calculate MACD and signal line
+    macd = ta.trend.MACD(df['close'], window_slow=26, window_fast=12, window_sign=9)
+    macd_line = macd.macd()
+    signal_line = macd.macd_signal()
+
+    current_macd = macd_line.iloc[-1]
+    current_signal = signal_line.iloc[-1]
+    prev_macd = macd_line.iloc[-2]
+    prev_signal = signal_line.iloc[-2]
+
+    if pd.isna(current_macd) or pd.isna(current_signal) or pd.isna(prev_macd) or pd.isna(prev_signal):
+        return None
+
+    latest_close = df['close'].iloc[-1]
+
+    return macd_rules.signal(prev_macd, prev_signal, current_macd, current_signal, latest_close)
+
+def breakout(df: pd.DataFrame, symbol: str, meta: dict) -> Optional[Dict]:
+    """
+    Breakout pattern detection
+    Identifies when price breaks above resistance with volume confirmation
+    """
+    if len(df) < 20:
+        return None
+    
+    # Calculate 20-period high (resistance)
+    resistance = df['high'].rolling(window=20).max()
+    avg_volume = df['volume'].rolling(window=20).mean()
+    
+    latest = df.iloc[-1]
+    
+    if pd.isna(resistance.iloc[-1]) or pd.isna(avg_volume.iloc[-1]):
+        return None
+    
+    resistance_level = resistance.iloc[-2]  # Use previous resistance
+    
+    return breakout_rules.signal(resistance_level, latest['high'], latest['close'],
+                                 latest['volume'], avg_volume.iloc[-1])
+
+def bollinger_squeeze(df: pd.DataFrame, symbol: str, meta: dict) -> Optional[Dict]:
+    """
+    Bollinger Squeeze pattern detection
+    Flags low volatility when band width is at its narrowest of the last 50 bars
+    """
+    if len(df) < bollinger_squeeze_rules.MIN_BARS:
+        return None
+
+    # Calculate Bollinger band width (% of the middle band)
+    width = ta.volatility.BollingerBands(df['close'], window=20, window_dev=2).bollinger_wband()
+    narrowest = width.rolling(window=bollinger_squeeze_rules.SQUEEZE_LOOKBACK).min()
+    widest = width.rolling(window=bollinger_squeeze_rules.SQUEEZE_LOOKBACK).max()
+
+    if pd.isna(narrowest.iloc[-1]):
+        return None
+
+    return bollinger_squeeze_rules.signal(width.iloc[-1], narrowest.iloc[-1], widest.iloc[-1],
+                                          df['close'].iloc[-1])
+
+def cup_handle(df: pd.DataFrame, symbol: str, meta: dict) -> Optional[Dict]:
+    """
+    Cup and handle pattern detection
+    Returns BUY signal when the best formation's handle runs up to the latest bar
+    """
+    close = df['close'].to_numpy(dtype=np.float64).reshape(1, -1)
+    formations = cup_handle_rules.scan(close)
+    return cup_handle_rules._latest_signal(formations, np.arange(len(formations['row'])), close.shape[1], 0,
+                                           close[0, -1])
+
+# Insight module path -> reference implementation
+REFERENCE_RULES = {
+    'insights_engine.indicators.rsi': rsi,
+    'insights_engine.indicators.ema_cross': ema_cross,
+    'insights_engine.indicators.macd': macd,
+    'insights_engine.patterns.breakout': breakout,
+    'insights_engine.patterns.cup_handle': cup_handle,
+    'insights_engine.patterns.bollinger_squeeze': bollinger_squeeze
+}
@@ -0,0 +1,105 @@
+"""
+Screen latency over the whole universe with the in-memory ScreenerTable
+(sorted and bitmap indexes) vs filtering and sorting a pandas DataFrame of
+the same rows, results checked against pandas, plus the cost of the first
+screen after a write hook updates rows (index rebuild).
+
+    python -m benchmarks.screener [n_symbols ...]
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.screener import ScreenerTable
+
+SECTORS = ['Technology', 'Financial Services', 'Energy', 'Utilities', 'Healthcare', 'Industrials',
+           'Consumer Cyclical', 'Consumer Defensive', 'Basic Materials', 'Real Estate', 'Communication Services']
+
+# (filter, sort, the same filter as a DataFrame mask)
+SCREENS = [
+    ("pe_ratio < 20 and roe > 0.15 and sector == 'Technology'", '-combined_score',
+     lambda df: (df.pe_ratio < 20) & (df.roe > 0.15) & (df.sector == 'Technology')),
+    ("market_cap > 1e11 or combined_score >= 0.5", '-market_cap',
+     lambda df: (df.market_cap > 1e11) | (df.combined_score >= 0.5)),
+    ("sector in ('Energy', 'Utilities') and 1 < pb_ratio <= 3", 'pe_ratio',
+     lambda df: df.sector.isin(['Energy', 'Utilities']) & (df.pb_ratio > 1) & (df.pb_ratio <= 3)),
+    ("industry == 'Industry 7' and eps != None", '-eps',
+     lambda df: (df.industry == 'Industry 7') & df.eps.notna()),
+    ("", '-market_cap', lambda df: pd.Series(True, index=df.index)),
+]
+
+def synthetic_universe(n: int, seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    rows = []
+    for i in range(n):
+        rows.append({
+            'symbol': f"SYM{i:05d}",
+            'company_name': f"Synthetic Company {i}",
+            'market_cap': None if i % 50 == 0 else int(rng.lognormal(24, 2)),
+            'roe': None if i % 30 == 0 else round(float(rng.normal(0.14, 0.1)), 4),
+            'pe_ratio': round(float(rng.lognormal(3, 0.5)), 2),
+            'pb_ratio': round(float(rng.lognormal(1, 0.5)), 2),
+            'eps': None if i % 25 == 0 else round(float(rng.normal(20, 15)), 2),
+            'sector': SECTORS[int(rng.integers(0, len(SECTORS)))],
+            'industry': f"Industry {int(rng.integers(0, 120))}",
+            'combined_score': round(float(rng.uniform(-1, 1)), 3) if i % 4 else None,
+        })
+    return rows
+
+def percentiles(samples) -> str:
+    ms = np.array(samples) * 1000
+    return f"p50 {np.percentile(ms, 50):7.3f} ms  p99 {np.percentile(ms, 99):7.3f} ms"
+
+def pandas_screen(df: pd.DataFrame, mask, sort: str, limit: int):
+    column = sort.lstrip('-')
+    matched = df[mask(df)]
+    ordered = matched.sort_values([column, 'symbol'], ascending=[not sort.startswith('-'), True], na_position='last')
+    return len(matched), ordered.head(limit).to_dict('records')
+
+def main(*sizes: int):
+    ok = True
+    for n in sizes or (2190, 20000):
+        rows = synthetic_universe(n)
+        started = time.perf_counter()
+        table = ScreenerTable(rows)
+        table.screen()
+        built = time.perf_counter() - started
+        df = pd.DataFrame(rows)
+        print(f"{n} symbols (table and indexes built in {built * 1000:.0f} ms)")
+
+        ours, theirs = [], []
+        for expression, sort, mask in SCREENS:
+            for _ in range(200):
+                started = time.perf_counter()
+                result = table.screen(expression, sort, 50)
+                ours.append(time.perf_counter() - started)
+                started = time.perf_counter()
+                count, expected = pandas_screen(df, mask, sort, 50)
+                theirs.append(time.perf_counter() - started)
+            ok &= result['count'] == count and [r['symbol'] for r in result['rows']] == [r['symbol'] for r in expected]
+        print(f"  indexed screen, top 50        {percentiles(ours)}")
+        print(f"  pandas filter and sort        {percentiles(theirs)}")
+
+        rng = np.random.default_rng(1)
+        after_update = []
+        for _ in range(50):
+            changed = [dict(rows[i], pe_ratio=round(float(rng.lognormal(3, 0.5)), 2)) for i in rng.integers(0, n, 50)]
+            table.upsert(changed)
+            started = time.perf_counter()
+            table.screen(*SCREENS[0][:2], 50)
+            after_update.append(time.perf_counter() - started)
+            for row in changed:
+                rows[table.positions[row['symbol']]] = row
+        df = pd.DataFrame(rows)
+        result = table.screen(*SCREENS[0][:2], 50)
+        count, expected = pandas_screen(df, SCREENS[0][2], SCREENS[0][1], 50)
+        ok &= result['count'] == count and [r['symbol'] for r in result['rows']] == [r['symbol'] for r in expected]
+        print(f"  first screen after 50 updates {percentiles(after_update)}")
+
+    print(f"Screens match pandas, before and after updates: {ok}")
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main(*(int(a) for a in sys.argv[1:])))
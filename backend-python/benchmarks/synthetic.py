@@ -0,0 +1,50 @@
+import numpy as np
+from datetime import date, timedelta
+from typing import Dict, List
+
+def trading_days(count: int, end: date = date(2024, 12, 31)) -> List[str]:
+    """Weekday dates ending at `end`, oldest first"""
+    days = []
+    day = end
+    while len(days) < count:
+        if day.weekday() < 5:
+            days.append(day.isoformat())
+        day -= timedelta(days=1)
+    return list(reversed(days))
+
+def generate_universe(n_symbols: int = 2190, bars: int = 100, seed: int = 0) -> Dict[str, List[dict]]:
+    """
+    Random-walk daily candles for a synthetic universe, in the row shape
+    returned by `get_candles_for_symbol`.
+    
+    Histories vary in length and include volume spikes so every insight
+    module fires for a share of the symbols.
+    """
+    rng = np.random.default_rng(seed)
+    dates = trading_days(bars)
+    universe = {}
+    
+    for i in range(n_symbols):
+        length = bars if rng.random() > 0.05 else int(rng.integers(10, bars))
+        returns = rng.normal(0.0005, 0.02, length)
+        close = 100 * np.exp(np.cumsum(returns)) * rng.uniform(0.2, 20)
+        open_ = close * (1 + rng.normal(0, 0.005, length))
+        high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.01, length)))
+        low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.01, length)))
+        volume = np.round(rng.lognormal(12, 0.4, length))
+        volume[-1] *= rng.choice([1, 3])
+        
+        universe[f"SYM{i:04d}"] = [
+            {
+                'symbol': f"SYM{i:04d}",
+                'ts': dates[bars - length + j],
+                'open': float(open_[j]),
+                'high': float(high[j]),
+                'low': float(low[j]),
+                'close': float(close[j]),
+                'volume': float(volume[j])
+            }
+            for j in range(length)
+        ]
+    
+    return universe
@@ -8,6 +8,8 @@ import json
 import yfinance as yf
 from datetime import datetime, timedelta
 
+from app.http_pool import get_http_session
+
 app = FastAPI(title="Trading Scanner API")
 
 app.add_middleware(
@@ -49,7 +51,7 @@ async def load_fundamentals():
         for symbol in symbols:
             try:
                 fixed_symbol = fix_symbol(symbol)
-                ticker = yf.Ticker(fixed_symbol)
+                ticker = yf.Ticker(fixed_symbol, session=get_http_session("yfinance"))
                 info = ticker.info
                 
                 # Check if we got valid data
@@ -114,7 +116,7 @@ def fix_symbol(symbol: str) -> str:
 async def get_ohlc(symbol: str, days: int = 30):
     try:
         fixed_symbol = fix_symbol(symbol)
-        ticker = yf.Ticker(fixed_symbol)
+        ticker = yf.Ticker(fixed_symbol, session=get_http_session("yfinance"))
         
         # Get historical data
         end_date = datetime.now()
@@ -146,7 +148,7 @@ async def get_ohlc(symbol: str, days: int = 30):
 async def get_quote(symbol: str):
     try:
         fixed_symbol = fix_symbol(symbol)
-        ticker = yf.Ticker(fixed_symbol)
+        ticker = yf.Ticker(fixed_symbol, session=get_http_session("yfinance"))
         info = ticker.info
         
         return {
@@ -165,7 +167,7 @@ async def get_quote(symbol: str):
 async def test_supabase():
     try:
         # Test yfinance
-        ticker = yf.Ticker("AAPL")
+        ticker = yf.Ticker("AAPL", session=get_http_session("yfinance"))
         info = ticker.info
         
         return {
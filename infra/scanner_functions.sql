@@ -0,0 +1,61 @@
+-- Scanner helper functions
+-- Run this after the main supabase_init.sql
+
+-- Last n candles for each of the given symbols.
+-- The lateral subquery walks idx_daily_candles_symbol_ts backwards once per
+-- symbol, so a whole-universe prefetch never sorts the full table.
+create or replace function get_recent_candles(symbols text[], n integer default 100)
+returns table (
+  symbol text,
+  ts date,
+  open double precision,
+  high double precision,
+  low double precision,
+  close double precision,
+  volume double precision
+)
+language sql stable
+as $$
+  select c.symbol, c.ts, c.open, c.high, c.low, c.close, c.volume
+  from unnest(symbols) as s(symbol)
+  cross join lateral (
+    select d.symbol, d.ts, d.open, d.high, d.low, d.close, d.volume
+    from daily_candles d
+    where d.symbol = s.symbol
+    order by d.ts desc
+    limit n
+  ) c
+  order by c.symbol, c.ts;
+$$;
+
+-- Latest stored candle date per symbol, as one {symbol: date} object so the
+-- whole universe comes back in a single row regardless of PostgREST max-rows.
+-- Symbols without candles are left out.
+create or replace function get_last_candle_dates(symbols text[])
+returns jsonb
+language sql stable
+as $$
+  select coalesce(jsonb_object_agg(s.symbol, l.ts), '{}'::jsonb)
+  from unnest(symbols) as s(symbol)
+  cross join lateral (
+    select d.ts
+    from daily_candles d
+    where d.symbol = s.symbol
+    order by d.ts desc
+    limit 1
+  ) l;
+$$;
+
+-- Incremental indicator state, one row per symbol as of its latest scanned bar
+create table if not exists indicator_state (
+  symbol text primary key references screened_stocks(symbol) on delete cascade,
+  as_of date not null,
+  version integer not null,
+  state jsonb not null,
+  updated_at timestamptz default now()
+);
+
+-- Insight types added after the initial schema
+insert into insight_types (code, name, category, description) values
+('CUP_HANDLE', 'Cup and Handle', 'PATTERN', 'Rounded base followed by a shallow handle')
+on conflict (code) do nothing;
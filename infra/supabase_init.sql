@@ -108,6 +108,7 @@ insert into insight_types (code, name, category, description) values
 ('MACD_BULLISH', 'MACD Bullish', 'FORMULA', 'MACD line crossing above signal line'),
 ('BOLLINGER_SQUEEZE', 'Bollinger Squeeze', 'PATTERN', 'Low volatility squeeze pattern'),
 ('BREAKOUT', 'Breakout Pattern', 'PATTERN', 'Price breaking above resistance'),
+('CUP_HANDLE', 'Cup and Handle', 'PATTERN', 'Rounded base followed by a shallow handle'),
 ('TWITTER_SENTIMENT', 'Twitter Sentiment', 'SENTIMENT', 'Aggregated Twitter sentiment analysis'),
 ('NEWS_SENTIMENT', 'News Sentiment', 'SENTIMENT', 'News sentiment analysis');
 
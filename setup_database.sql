@@ -118,6 +118,8 @@ create table fundamentals (
 create index idx_fundamentals_sector on fundamentals(sector);
 create index idx_fundamentals_industry on fundamentals(industry);
 create index idx_fundamentals_market_cap on fundamentals(market_cap desc);
+-- Keyset pages of /api/fundamentals walk this in order
+create index idx_fundamentals_market_cap_symbol on fundamentals(market_cap desc nulls last, symbol);
 
 -- Insert default insight types
 insert into insight_types (code, name, category, description) values
@@ -2,12 +2,21 @@
 """
 Shoonya API integration for real market data
 """
-import requests
 import hashlib
 import os
+import sys
 import json
 from datetime import datetime
 
+# Share the backend's pooled HTTP sessions and connection stats
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend-python'))
+from app.http_pool import get_http_session, CachedToken, http_stats
+
+SHOONYA_URL = "https://api.shoonya.com/NorenWClientTP"
+
+# Shoonya sessions last the trading day; the token is reused until this many hours old
+SHOONYA_TOKEN_TTL_HOURS = float(os.getenv('SHOONYA_TOKEN_TTL_HOURS', '8'))
+
 def load_env():
     """Load Shoonya credentials from .env"""
     env_path = '/Users/singhxss/Desktop/Personal/trading-scanner/backend-python/.env'
@@ -17,8 +26,8 @@ def load_env():
                 key, value = line.strip().split('=', 1)
                 os.environ[key] = value
 
-def shoonya_login():
-    """Login to Shoonya API"""
+def _login():
+    """Login to Shoonya API; returns (token, lifetime in seconds)"""
     userid = os.getenv('SHOONYA_USERID')
     password = os.getenv('SHOONYA_PASSWORD')
     twofa = os.getenv('SHOONYA_2FA')
@@ -45,12 +54,12 @@ def shoonya_login():
     }
     
     try:
-        response = requests.post("https://api.shoonya.com/NorenWClientTP/QuickAuth", data=login_data)
+        response = get_http_session("shoonya").post(f"{SHOONYA_URL}/QuickAuth", data=login_data)
         result = response.json()
         
         if result.get('stat') == 'Ok':
             print(f"✅ Shoonya login successful")
-            return result.get('susertoken')
+            return result.get('susertoken'), SHOONYA_TOKEN_TTL_HOURS * 3600
         else:
             print(f"❌ Login failed: {result.get('emsg', 'Unknown error')}")
             return None
@@ -59,7 +68,13 @@ def shoonya_login():
         print(f"❌ Login error: {e}")
         return None
 
-def get_stock_data(token, symbol="RELIANCE-EQ"):
+_token = CachedToken(_login)
+
+def shoonya_login():
+    """Shoonya session token, logging in only when the cached one has expired"""
+    return _token.get()
+
+def get_stock_data(token, symbol="RELIANCE-EQ", retry=True):
     """Get real-time stock data"""
     if not token:
         return None
@@ -75,8 +90,7 @@ def get_stock_data(token, symbol="RELIANCE-EQ"):
     }
     
     try:
-        response = requests.post("https://api.shoonya.com/NorenWClientTP/GetQuotes", 
-                               data=data, headers=headers)
+        response = get_http_session("shoonya").post(f"{SHOONYA_URL}/GetQuotes", data=data, headers=headers)
         result = response.json()
         
         if result.get('stat') == 'Ok':
@@ -90,6 +104,9 @@ def get_stock_data(token, symbol="RELIANCE-EQ"):
                 "volume": int(result.get('v', 0)),
                 "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             }
+        elif retry and 'Session Expired' in result.get('emsg', ''):
+            _token.invalidate()
+            return get_stock_data(shoonya_login(), symbol, retry=False)
         else:
             print(f"❌ Quote error: {result.get('emsg', 'Unknown error')}")
             return None
@@ -121,6 +138,10 @@ def main():
             print(f"{data['symbol']:<12} LTP: ₹{data['ltp']:<8} O: ₹{data['open']:<8} H: ₹{data['high']:<8} L: ₹{data['low']}")
         else:
             print(f"{stock:<12} ❌ Failed to fetch")
+    
+    for host, stats in http_stats().items():
+        print(f"\n🔌 {host}: {stats['requests']} requests over {stats['connections']} connections "
+              f"({stats['reuse_pct']}% reused, {stats['handshake_ms']} ms per handshake)")
 
 if __name__ == "__main__":
     main()